@@ -13,4 +13,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "CompeteHub.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from competition.live import websocket_application  # noqa: E402  (needs the apps loaded)
+from competition.standings_index import warm_running  # noqa: E402
+
+warm_running()
+
+
+async def application(scope, receive, send):
+    """Django for HTTP, the contest live streams for WebSockets"""
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -10,6 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import shutil
+import sys
 from pathlib import Path
 from datetime import timedelta
 
@@ -189,3 +192,80 @@ CORS_ALLOW_HEADERS = [
 #         }
 #     }
 # }
+
+
+# Submission evaluation queue (see problem/evaluation_queue.py)
+EVALUATION_WORKERS = 16  # Evaluator threads started by `manage.py run_evaluators`; keep above EVALUATION_BATCH_MAX_SIZE
+EVALUATION_POLL_INTERVAL = 1.0  # Seconds an idle worker waits before polling the queue again
+EVALUATION_LEASE_SECONDS = 120  # A task whose worker holds it longer than this is retried
+EVALUATION_MAX_ATTEMPTS = 3
+EVALUATION_RETRY_DELAY = 30  # Seconds, multiplied by the number of attempts so far
+EVALUATION_PASS_SCORE = 80  # Minimum score for a submission to count as correct
+EVALUATION_CACHE_SIZE = 10000  # Entries kept in the in-process tier of the evaluation result cache
+EVALUATION_BATCH_WINDOW = 0.2  # Seconds to wait for more answers to the same problem before calling the model
+EVALUATION_BATCH_MAX_SIZE = 8  # Answers scored per model call; 1 disables batching
+EVALUATION_SINGLE_FLIGHT_LEASE = 60  # Seconds another process waits for an identical evaluation before taking it over
+EVALUATION_SINGLE_FLIGHT_POLL = 0.1  # Seconds between checks for an identical evaluation running in another process
+
+# Submission throttling and load shedding (see problem/throttling.py)
+SUBMISSION_RATE_LIMIT = 10  # Submissions per user per minute over a contest (or over all practice problems); per-contest override
+SUBMISSION_PROBLEM_RATE_LIMIT = 4  # Submissions per user per minute on one problem; per-problem and per-contest-problem overrides
+SUBMISSION_SHED_BACKLOG = 2000  # Waiting evaluations from which new submissions shed load; 0 never sheds
+SUBMISSION_SHED_MODE = 'reject'  # 'reject' with 429 and Retry-After, or 'defer' to accept and evaluate later
+SUBMISSION_SHED_RETRY_AFTER = 30  # Retry-After seconds sent when rejecting
+SUBMISSION_SHED_DEFER_SECONDS = 60  # Minimum delay of deferred evaluations, plus up to 50% jitter
+SUBMISSION_BACKLOG_CHECK_SECONDS = 2  # How long the backlog count is cached between checks
+
+# LLM evaluation (see problem/llm_evaluation.py)
+LLM_BACKEND = 'gemini'  # 'gemini', or 'fake' to evaluate offline with problem/llm_fake.py
+LLM_EVALUATION_MODE = 'structured'  # 'structured' (one JSON request) or 'legacy' (three-message chat)
+LLM_BASE_URL = None  # Override the provider endpoint, e.g. for a local stub server
+LLM_REQUESTS_PER_SECOND = 5  # Token bucket refill rate, per process
+LLM_BURST = 10  # Token bucket capacity
+LLM_MAX_CONCURRENCY = 8  # Model requests in flight at once, per process
+LLM_MAX_RETRIES = 3
+LLM_RETRY_BASE_DELAY = 0.5  # Seconds; doubled on every retry, with full jitter
+LLM_RETRY_MAX_DELAY = 8
+LLM_BREAKER_THRESHOLD = 5  # Consecutive failures before evaluations are deferred
+LLM_BREAKER_RESET_SECONDS = 60  # How long the breaker stays open before a trial request
+EVALUATION_TIERS = ['exact', 'numeric', 'similarity', 'llm']  # Default tier order, see problem/evaluation_tiers.py
+
+# Code judge (see problem/judge.py)
+JUDGE_WORKERS = os.cpu_count() or 1  # Test cases run in parallel per submission
+JUDGE_WALL_TIME_FACTOR = 3  # Wall-clock timeout as a multiple of the problem's CPU time limit
+JUDGE_OUTPUT_LIMIT = 64 * 1024 * 1024  # Bytes a program may write
+JUDGE_DATA_ROOT = BASE_DIR / 'judge_data'  # Test case files and the compiled artifact cache
+JUDGE_ARTIFACT_CACHE_BYTES = 256 * 1024 * 1024  # Least recently used artifacts are evicted beyond this size
+JUDGE_SANDBOX_USER = 'nobody'  # Account submissions run as when the judge runs as root; must be able to run JUDGE_PYTHON
+# Interpreter submissions run with. It must be the judge's Python version, which compiles them, and
+# runnable by JUDGE_SANDBOX_USER, so the system one is preferred over a virtualenv or pyenv under a home directory.
+JUDGE_PYTHON = shutil.which(
+    f'python{sys.version_info.major}.{sys.version_info.minor}', path='/usr/local/bin:/usr/bin:/bin'
+) or sys.executable
+JUDGE_PROCESS_LIMIT = 128  # Processes and threads the submissions' account may have at once (RLIMIT_NPROC)
+# Directories covered by an empty file system while a submission runs, so it cannot read the
+# expected outputs, the code, the settings or the database. Must not contain the Python interpreter.
+# Set to [] where mount namespaces are unavailable and protect the files with permissions instead.
+JUDGE_HIDDEN_PATHS = [BASE_DIR, JUDGE_DATA_ROOT]
+
+STANDINGS_INDEX_MAX_CONTESTS = 32  # Contests whose standings index is kept in memory, per process
+STANDINGS_INDEX_SYNC_SECONDS = 1.0  # How often an index pulls in changes made by other processes
+STANDINGS_INDEX_SYNC_OVERLAP_SECONDS = 5  # Changes re-read on every sync, for transactions that commit late
+STANDINGS_INDEX_REBUILD_SECONDS = 300  # Full rebuild interval, which also drops unregistered participants
+
+# Live contest streams (see competition/live.py)
+LIVE_BACKEND = 'database'  # 'database' to reach every process, 'memory' for a single process, or a dotted class path
+LIVE_POLL_INTERVAL = 0.5  # Seconds between checks for new events published by other processes
+LIVE_EVENT_TTL = 300  # Seconds published events are kept in the database
+LIVE_QUEUE_SIZE = 256  # Events buffered per connected client before it is marked as lagged
+LIVE_STANDINGS_INTERVAL = 2.0  # Seconds over which standings changes are coalesced into one diff
+LIVE_STANDINGS_TOP = 100  # Ranks whose changes are pushed
+LIVE_KEEPALIVE_SECONDS = 15  # Idle seconds before a keepalive comment is sent to event stream clients
+
+CONTEST_CONTEXT_CACHE_SECONDS = 300  # Contest and problem manifest kept in the Django cache, see competition/context.py
+CONTEST_PARTICIPANT_SETS_MAX = 32  # Contests whose participant map is kept in memory, per process
+CONTEST_PARTICIPANTS_REFRESH_SECONDS = 60  # How often a participant map is reloaded to drop unregistrations made elsewhere
+CONTEST_PREWARM_LEAD_SECONDS = 120  # How long before a contest starts `manage.py prewarm_contests` renders its problem set
+CONTEST_PREWARM_POLL_SECONDS = 15  # How often `manage.py prewarm_contests` looks for contests about to start
+REGISTRATION_BATCH_SIZE = 1000  # Rows per INSERT of a bulk contest registration, see competition/registration.py
+PAGINATION_COUNT_CACHE_SECONDS = 60  # How long the optional approximate totals of keyset-paginated lists are cached
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "CompeteHub.settings")
 
 application = get_wsgi_application()
+
+from competition.standings_index import warm_running  # noqa: E402  (needs the apps loaded)
+
+warm_running()
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CompetitionConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "competition"
+
+    def ready(self):
+        from . import context, signals, standings  # noqa: F401
@@ -0,0 +1,239 @@
+"""
+Contest state shared by the contest endpoints.
+
+``get_contest_context`` resolves, once per request, everything the contest
+endpoints check before doing their work: the contest with its timing, the
+ordered problem manifest (ContestProblem rows with their problems) and
+whether the caller is registered.
+
+The contest and its manifest change rarely, so they are kept in the Django
+cache for CONTEST_CONTEXT_CACHE_SECONDS and dropped whenever a contest, one
+of its problems, their genres or its problem list is saved or deleted. With
+the default per-process cache other processes notice edits only when their
+copy expires; configure a shared cache backend to invalidate everywhere at
+once.
+
+Whether the caller is registered is answered from an in-process map of the
+contest's participants (``ParticipantDirectory``), loaded once per contest
+and reloaded every CONTEST_PARTICIPANTS_REFRESH_SECONDS. Users missing from
+it are looked up in the database, so a registration made in another process
+is never refused; registrations and unregistrations in this process update
+the map directly.
+
+A request costs no query when the contest and its participants are loaded,
+and five when neither is.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404
+from django.utils import timezone
+
+from problem.models import Problem
+
+from .models import Contest, ContestProblem, Participation
+
+
+def _cache_key(contest_id):
+    return f"competition:contest-context:{contest_id}"
+
+
+def bundle_cache_key(contest_id):
+    """Key of the pre-rendered problem set of a contest, see competition/prewarm.py"""
+    return f"competition:problem-bundle:{contest_id}"
+
+
+class ContestContext:
+    """A contest, its problem manifest and the requesting user's participation"""
+
+    def __init__(self, contest, manifest, participation_id):
+        self.contest = contest
+        self.manifest = manifest
+        self.participation_id = participation_id
+        self._by_order = {contest_problem.order: contest_problem for contest_problem in manifest}
+
+    @property
+    def end_time(self):
+        return self.contest.starting_time + self.contest.duration
+
+    @property
+    def has_started(self):
+        return self.contest.starting_time <= timezone.now()
+
+    @property
+    def has_ended(self):
+        return self.end_time < timezone.now()
+
+    @property
+    def is_active(self):
+        return self.has_started and not self.has_ended
+
+    @property
+    def is_registered(self):
+        return self.participation_id is not None
+
+    def problem(self, order):
+        """The ContestProblem with the given order, or None"""
+        return self._by_order.get(order)
+
+    def problems(self):
+        """The contest's problems in contest order"""
+        return [contest_problem.problem for contest_problem in self.manifest]
+
+
+def _load(contest_id):
+    contest = (
+        Contest.objects.select_related('creator').prefetch_related('genres').filter(pk=contest_id).first()
+    )
+    if contest is None:
+        return None
+    manifest = list(
+        ContestProblem.objects.filter(contest_id=contest_id)
+        .select_related('problem')
+        .prefetch_related('problem__genre')
+        .order_by('order')
+    )
+    return contest, manifest
+
+
+def load_contest(contest_id):
+    """(contest, manifest) of a contest from the cache, loading and caching it on a miss; None if it doesn't exist"""
+    cached = cache.get(_cache_key(contest_id))
+    if cached is None:
+        cached = _load(contest_id)
+        if cached is not None:
+            cache.set(_cache_key(contest_id), cached, settings.CONTEST_CONTEXT_CACHE_SECONDS)
+    return cached
+
+
+class ParticipantDirectory:
+    """Per-process maps of user id to participation id, for the most recently used contests"""
+
+    def __init__(self):
+        self._contests = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, contest_id):
+        """(Re)load the participants of a contest"""
+        participants = dict(Participation.objects.filter(contest_id=contest_id).values_list('user_id', 'id'))
+        with self._lock:
+            self._contests[contest_id] = (time.monotonic(), participants)
+            self._contests.move_to_end(contest_id)
+            while len(self._contests) > settings.CONTEST_PARTICIPANT_SETS_MAX:
+                self._contests.popitem(last=False)
+        return participants
+
+    def _participants(self, contest_id):
+        with self._lock:
+            entry = self._contests.get(contest_id)
+            if entry is not None:
+                self._contests.move_to_end(contest_id)
+        if entry is None or time.monotonic() - entry[0] > settings.CONTEST_PARTICIPANTS_REFRESH_SECONDS:
+            return self.load(contest_id)
+        return entry[1]
+
+    def participation_id(self, contest_id, user_id):
+        """The user's participation in a contest, or None if not registered"""
+        participants = self._participants(contest_id)
+        participation_id = participants.get(user_id)
+        if participation_id is None:
+            # Possibly registered through another process since the last load
+            participation_id = Participation.objects.filter(
+                contest_id=contest_id, user_id=user_id
+            ).values_list('id', flat=True).first()
+            if participation_id is not None:
+                self.add(contest_id, user_id, participation_id)
+        return participation_id
+
+    def add(self, contest_id, user_id, participation_id):
+        with self._lock:
+            entry = self._contests.get(contest_id)
+            if entry is not None:
+                entry[1][user_id] = participation_id
+
+    def forget(self, contest_id):
+        with self._lock:
+            self._contests.pop(contest_id, None)
+
+    def remove(self, contest_id, user_id):
+        with self._lock:
+            entry = self._contests.get(contest_id)
+            if entry is not None:
+                entry[1].pop(user_id, None)
+
+
+participants = ParticipantDirectory()
+
+
+def get_contest_context(request, contest_id):
+    """The ContestContext of a contest for the request's user; raises Http404 if the contest doesn't exist"""
+    contexts = request.__dict__.setdefault('_contest_contexts', {})
+    if contest_id in contexts:
+        return contexts[contest_id]
+
+    cached = load_contest(contest_id)
+    if cached is None:
+        raise Http404("No Contest matches the given query.")
+    contest, manifest = cached
+
+    participation_id = participants.participation_id(contest_id, request.user.pk)
+    contexts[contest_id] = ContestContext(contest, manifest, participation_id)
+    return contexts[contest_id]
+
+
+def invalidate_contest(*contest_ids):
+    """Drop the cached state of contests, e.g. after bulk changes that send no signals"""
+    cache.delete_many(
+        [_cache_key(contest_id) for contest_id in contest_ids]
+        + [bundle_cache_key(contest_id) for contest_id in contest_ids]
+    )
+
+
+@receiver(post_save, sender=Contest)
+@receiver(post_delete, sender=Contest)
+def _contest_changed(sender, instance, **kwargs):
+    invalidate_contest(instance.pk)
+    participants.forget(instance.pk)
+
+
+@receiver(m2m_changed, sender=Contest.genres.through)
+def _contest_genres_changed(sender, instance, **kwargs):
+    if isinstance(instance, Contest):
+        invalidate_contest(instance.pk)
+
+
+@receiver(m2m_changed, sender=Problem.genre.through)
+def _problem_genres_changed(sender, instance, **kwargs):
+    if isinstance(instance, Problem):
+        _problem_changed(Problem, instance)
+
+
+@receiver(post_save, sender=ContestProblem)
+@receiver(post_delete, sender=ContestProblem)
+def _contest_problem_changed(sender, instance, **kwargs):
+    invalidate_contest(instance.contest_id)
+
+
+@receiver(post_save, sender=Problem)
+@receiver(post_delete, sender=Problem)
+def _problem_changed(sender, instance, **kwargs):
+    contest_ids = list(ContestProblem.objects.filter(problem_id=instance.pk).values_list('contest_id', flat=True))
+    if contest_ids:
+        invalidate_contest(*contest_ids)
+
+
+@receiver(post_save, sender=Participation)
+def _participant_registered(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: participants.add(instance.contest_id, instance.user_id, instance.pk))
+
+
+@receiver(post_delete, sender=Participation)
+def _participant_unregistered(sender, instance, **kwargs):
+    participants.remove(instance.contest_id, instance.user_id)
@@ -0,0 +1,59 @@
+"""
+Read path for contest listings.
+
+Like problem/listing.py: rows are built from ``values()`` projections, with
+one extra query for the genres of the whole page, in the shape
+ContestSerializer produces.
+"""
+from collections import defaultdict
+
+from django.db.models import F
+from rest_framework import serializers
+
+from .models import Contest
+
+datetime_field = serializers.DateTimeField()
+duration_field = serializers.DurationField()
+
+CONTEST_FIELDS = ('id', 'name', 'starting_time', 'duration', 'description', 'creator', 'submission_rate_limit')
+
+
+def contest_values(contests):
+    """Project a Contest queryset onto the fields of a listing row"""
+    # end_time is not shown but is the pagination key of some listings
+    return contests.values(*CONTEST_FIELDS, 'end_time', creator_username=F('creator__username'))
+
+
+def contest_rows(values):
+    """Listing rows, with their genres, for rows of contest_values()"""
+    values = list(values)
+    genres = defaultdict(list)
+    if values:
+        for contest_id, genre_id, name in (
+            Contest.genres.through.objects.filter(contest_id__in=[row['id'] for row in values])
+            .order_by('contestgenre_id')
+            .values_list('contest_id', 'contestgenre_id', 'contestgenre__name')
+        ):
+            genres[contest_id].append({'id': genre_id, 'name': name})
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'starting_time': datetime_field.to_representation(row['starting_time']),
+            'duration': duration_field.to_representation(row['duration']),
+            'genres': genres[row['id']],
+            'description': row['description'],
+            'creator': row['creator'],
+            'creator_username': row['creator_username'],
+            'submission_rate_limit': row['submission_rate_limit'],
+        }
+        for row in values
+    ]
+
+
+class ContestListMixin:
+    """list() for contest ListAPIViews through the projected read path"""
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(contest_values(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(contest_rows(page))
@@ -0,0 +1,409 @@
+"""
+Live contest updates pushed to clients.
+
+Events are published to named channels: ``user:<id>`` carries the verdicts
+of a user's submissions and ``contest:<id>`` the standings changes of a
+contest. Each process has one BroadcastHub that hands events to the
+streams connected to it (see ContestLiveView).
+
+How events reach the hubs is up to the backend, selected by LIVE_BACKEND:
+
+- ``'memory'`` delivers to the hub of the publishing process only, for a
+  single process serving both the API and the evaluation.
+- ``'database'`` stores events as LiveEvent rows that every process with
+  listeners polls, so verdicts from the evaluator workers reach the web
+  processes.
+- A dotted path to a class with the same interface as the two above.
+
+Standings are not pushed per scoring event. A ticker thread compares the
+top LIVE_STANDINGS_TOP rows of every watched contest's standings index
+every LIVE_STANDINGS_INTERVAL seconds and publishes only the rows that
+changed, so a burst of submissions becomes one small diff.
+
+Clients connect to ``/contest/<id>/live/`` either as a WebSocket (see
+websocket_application, routed by CompeteHub/asgi.py) or as server-sent
+events (see ContestLiveView). Browsers cannot set headers on either, so
+the JWT access token may also be passed as the ``token`` query parameter.
+"""
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import Contest, LiveEvent, Participation
+from .standings_index import get_index
+
+logger = logging.getLogger(__name__)
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def contest_channel(contest_id):
+    return f"contest:{contest_id}"
+
+
+class Subscription:
+    """Events of some channels, queued for one stream. Created and read on the stream's event loop."""
+
+    def __init__(self, channels, maxsize):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        # Set when events had to be dropped; the client should refetch
+        self.lagged = False
+
+    def _offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    def deliver(self, event):
+        """Queue an event from any thread"""
+        self.loop.call_soon_threadsafe(self._offer, event)
+
+    async def get(self, timeout):
+        """The next event, or None if none arrived within ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class BroadcastHub:
+    """Fans events out to the subscriptions of this process"""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, settings.LIVE_QUEUE_SIZE)
+        with self._lock:
+            for channel in channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def dispatch(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def channels(self):
+        """Channels with at least one subscriber"""
+        with self._lock:
+            return list(self._subscriptions)
+
+
+class InProcessBackend:
+    """Delivers events to the hub of the publishing process"""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def start(self):
+        pass
+
+    def publish(self, channel, event):
+        self.hub.dispatch(channel, event)
+
+
+class DatabaseBackend:
+    """Delivers events to every process through LiveEvent rows"""
+
+    def __init__(self, hub):
+        self.hub = hub
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start polling; called by the processes that serve streams"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._poll, name="live-events", daemon=True)
+                self._thread.start()
+
+    def publish(self, channel, event):
+        LiveEvent.objects.create(channel=channel, payload=event)
+
+    def _poll(self):
+        last_id = None
+        last_prune = 0.0
+        while True:
+            time.sleep(settings.LIVE_POLL_INTERVAL)
+            close_old_connections()
+            try:
+                if last_id is None:
+                    # Only events published after this process started listening
+                    last_id = LiveEvent.objects.aggregate(last=Max('id'))['last'] or 0
+                channels = set(self.hub.channels())
+                for event_id, channel, payload in (
+                    LiveEvent.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'channel', 'payload')[:1000]
+                ):
+                    last_id = event_id
+                    if channel in channels:
+                        self.hub.dispatch(channel, payload)
+                if time.monotonic() - last_prune > 60:
+                    last_prune = time.monotonic()
+                    cutoff = timezone.now() - timedelta(seconds=settings.LIVE_EVENT_TTL)
+                    LiveEvent.objects.filter(created_at__lt=cutoff).delete()
+            except Exception:
+                logger.exception("Polling live events failed")
+
+
+BACKENDS = {
+    'memory': InProcessBackend,
+    'database': DatabaseBackend,
+}
+
+_hub = BroadcastHub()
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_hub():
+    return _hub
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = BACKENDS.get(settings.LIVE_BACKEND) or import_string(settings.LIVE_BACKEND)
+                _backend = backend_class(_hub)
+    return _backend
+
+
+def publish(channel, event):
+    """Publish an event once the current transaction (if any) commits"""
+    transaction.on_commit(lambda: get_backend().publish(channel, event))
+
+
+class StandingsTicker:
+    """Publishes coalesced changes of the top of the standings of watched contests"""
+
+    def __init__(self, hub):
+        self.hub = hub
+        self._boards = {}
+        self._users = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-standings", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(settings.LIVE_STANDINGS_INTERVAL)
+            close_old_connections()
+            watched = {
+                int(channel.split(':', 1)[1]) for channel in self.hub.channels() if channel.startswith('contest:')
+            }
+            for contest_id in list(self._boards):
+                if contest_id not in watched:
+                    del self._boards[contest_id]
+                    self._users.pop(contest_id, None)
+            for contest_id in watched:
+                try:
+                    self.tick(contest_id)
+                except Exception:
+                    logger.exception("Computing standings changes of contest %s failed", contest_id)
+
+    def tick(self, contest_id):
+        """Publish the rows of the top of the standings that changed since the last tick"""
+        index = get_index(contest_id)
+        if index is None:
+            # Still being built; the next tick compares against it
+            return
+        board = {
+            participation_id: (rank, index.score(participation_id))
+            for rank, participation_id in enumerate(index.slice(1, settings.LIVE_STANDINGS_TOP), 1)
+        }
+        previous = self._boards.get(contest_id)
+        self._boards[contest_id] = board
+        if previous is None:
+            return
+
+        changed = [pk for pk, row in board.items() if previous.get(pk) != row]
+        left = [pk for pk in previous if pk not in board]
+        if not changed and not left:
+            return
+        # (user id, username) of the rows shown in the previous tick, loaded as they are needed
+        users = self._users.get(contest_id, {})
+        missing = [pk for pk in changed + left if pk not in users]
+        if missing:
+            users.update(
+                (pk, (user_id, username))
+                for pk, user_id, username in Participation.objects.filter(id__in=missing).values_list(
+                    'id', 'user_id', 'user__username'
+                )
+            )
+        rows = []
+        for pk in changed:
+            user_id, username = users.get(pk, (None, None))
+            rank, score = board[pk]
+            rows.append({"rank": rank, "user_id": user_id, "username": username, "score": score})
+        self.hub.dispatch(contest_channel(contest_id), {
+            "type": "standings",
+            "changed": sorted(rows, key=lambda row: row["rank"]),
+            "left_top": [users.get(pk, (None,))[0] for pk in left],
+        })
+        # Only the rows still shown can appear in the next tick's changes
+        self._users[contest_id] = {pk: users[pk] for pk in board if pk in users}
+
+
+_ticker = StandingsTicker(_hub)
+
+
+def start_listening():
+    """Start delivering events and standings changes to this process's streams"""
+    get_backend().start()
+    _ticker.start()
+
+
+def authenticate_token(raw_token):
+    """The user of a JWT access token, or None if the token is missing or invalid"""
+    if not raw_token:
+        return None
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except APIException:
+        return None
+
+
+def _open_stream(raw_token, contest_id):
+    """
+    The user allowed to open the live stream of a contest, or the HTTP status
+    of the refusal: 401 for a bad token, 404 for an unknown contest
+    """
+    try:
+        user = authenticate_token(raw_token)
+        if user is None:
+            return None, 401
+        if not Contest.objects.filter(pk=contest_id).exists():
+            return None, 404
+        return user, None
+    finally:
+        close_old_connections()
+
+
+open_stream = sync_to_async(_open_stream)
+
+
+async def contest_events(contest_id, user_id):
+    """
+    Events of a contest's live stream for one user: standings changes and the
+    user's own verdicts in the contest. Yields None when nothing happened for
+    LIVE_KEEPALIVE_SECONDS, so the caller can keep the connection alive, and
+    a ``lagged`` event when events were dropped because the client reads too
+    slowly; it should then refetch the leaderboard.
+    """
+    start_listening()
+    subscription = _hub.subscribe([contest_channel(contest_id), user_channel(user_id)])
+    try:
+        while True:
+            event = await subscription.get(settings.LIVE_KEEPALIVE_SECONDS)
+            if subscription.lagged:
+                subscription.lagged = False
+                yield {"type": "lagged"}
+            if event is None:
+                yield None
+            elif event.get("type") != "verdict" or event.get("contest_id") == contest_id:
+                yield event
+    finally:
+        _hub.unsubscribe(subscription)
+
+
+async def sse_stream(contest_id, user_id):
+    """contest_events encoded as a text/event-stream body"""
+    yield "retry: 3000\n\n"
+    async for event in contest_events(contest_id, user_id):
+        if event is None:
+            yield ": keepalive\n\n"
+        else:
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+WEBSOCKET_PATH = re.compile(r'^/contest/(?P<contest_id>\d+)/live/$')
+
+
+def _bearer_token(scope):
+    query = dict(
+        pair.split('=', 1) for pair in scope.get('query_string', b'').decode().split('&') if '=' in pair
+    )
+    if query.get('token'):
+        return query['token']
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization' and value.startswith(b'Bearer '):
+            return value[len(b'Bearer '):].decode()
+    return None
+
+
+async def websocket_application(scope, receive, send):
+    """
+    ASGI application for the WebSocket form of the contest live streams.
+    Messages are the JSON encoded events; the client sends nothing. The
+    connection is closed with code 4401 for a bad token and 4404 for an
+    unknown contest or path.
+    """
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    match = WEBSOCKET_PATH.match(scope['path'])
+    if match is None:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    contest_id = int(match['contest_id'])
+    user, refusal = await open_stream(_bearer_token(scope), contest_id)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': 4000 + refusal})
+        return
+    await send({'type': 'websocket.accept'})
+
+    async def push():
+        async for event in contest_events(contest_id, user.id):
+            if event is not None:
+                await send({'type': 'websocket.send', 'text': json.dumps(event)})
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+
+    pusher = asyncio.ensure_future(push())
+    reader = asyncio.ensure_future(wait_for_disconnect())
+    try:
+        await asyncio.wait([pusher, reader], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        pusher.cancel()
+        reader.cancel()
+        # Let the stream unsubscribe before the connection is considered closed
+        await asyncio.gather(pusher, reader, return_exceptions=True)
@@ -0,0 +1,88 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from competition.models import Contest, Participation
+from competition.registration import register, register_users
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _check_then_create(contest_id, user_ids):
+    """Registration as ContestRegistrationView did it before: an exists() check, then a create()"""
+    for user_id in user_ids:
+        if not Participation.objects.filter(user_id=user_id, contest_id=contest_id).exists():
+            Participation.objects.create(user_id=user_id, contest_id=contest_id)
+
+
+def _single_inserts(contest_id, user_ids):
+    for user_id in user_ids:
+        register(contest_id, user_id)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare contest registration throughput: per-user check and create, per-user conflict-tolerant "
+        "insert, and batched bulk registration. All rows are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help="Users registered by each method")
+        parser.add_argument('--batch-sizes', default='100,1000,5000',
+                            help="Comma-separated bulk registration batch sizes (default: 100,1000,5000)")
+
+    def handle(self, *args, **options):
+        size = options['users']
+        methods = [
+            ("check then create", _check_then_create),
+            ("single insert", _single_inserts),
+        ] + [
+            (f"bulk, batches of {batch_size}", lambda contest_id, user_ids, batch_size=batch_size: register_users(
+                contest_id, user_ids, batch_size=batch_size
+            ))
+            for batch_size in (int(value) for value in options['batch_sizes'].split(','))
+        ]
+        self.stdout.write(f"{'method':<28} {'seconds':>10} {'users/s':>12}")
+        try:
+            with transaction.atomic():
+                user_ids = self._populate(size)
+                for name, method in methods:
+                    contest = self._contest(name)
+                    started = time.perf_counter()
+                    method(contest.id, user_ids)
+                    elapsed = time.perf_counter() - started
+                    if Participation.objects.filter(contest=contest).count() != size:
+                        raise CommandError(f"{name} did not register every user")
+                    self.stdout.write(f"{name:<28} {elapsed:>10.3f} {size / elapsed:>12.0f}")
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _populate(self, size):
+        User = get_user_model()
+        self.owner = User.objects.create(username="bench-registration-owner")
+        user_ids = []
+        for start in range(0, size, 10000):
+            users = User.objects.bulk_create(
+                [User(username=f"bench-registration-{i}") for i in range(start, min(start + 10000, size))]
+            )
+            user_ids.extend(user.id for user in users)
+        if None in user_ids:
+            # Backends that cannot return ids from bulk inserts
+            user_ids = list(
+                User.objects.filter(username__startswith="bench-registration-").exclude(pk=self.owner.pk)
+                .values_list('id', flat=True)
+            )
+        return user_ids
+
+    def _contest(self, name):
+        return Contest.objects.create(
+            name=f"Registration benchmark: {name}", description="", creator=self.owner,
+            starting_time=timezone.now() + timedelta(days=1), duration=timedelta(hours=1),
+        )
@@ -0,0 +1,125 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from competition.models import Contest, Participation
+from competition.standings import ahead_of
+from competition.standings_index import StandingsIndex
+
+PAGE_SIZE = 50
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _timed(fn, items):
+    """Average seconds per call of fn over the items"""
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - started) / len(items)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the in-memory standings index with SQL standings queries on a synthetic contest. "
+        "All rows are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help="Comma-separated participant counts (default: 10000,100000,1000000)")
+        parser.add_argument('--queries', type=int, default=50, help="Queries timed per operation")
+        parser.add_argument('--max-score', type=int, default=1000, help="Scores are drawn from 0..max-score in steps of 10")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(
+            f"{'participants':>12} {'operation':<34} {'SQL ms':>10} {'index ms':>10} {'speedup':>9}"
+        )
+        for size in (int(value) for value in options['sizes'].split(',')):
+            try:
+                with transaction.atomic():
+                    self._bench(size, options['queries'], options['max_score'], rng)
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _populate(self, size, max_score, rng):
+        User = get_user_model()
+        now = timezone.now()
+        owner = User.objects.create(username=f"bench-owner-{size}")
+        contest = Contest.objects.create(
+            name="Standings benchmark", starting_time=now, description="", creator=owner,
+            duration=timedelta(days=1),
+        )
+        prefix = f"bench-{size}-"
+        for start in range(0, size, 10000):
+            users = User.objects.bulk_create(
+                [User(username=f"{prefix}{i}") for i in range(start, min(start + 10000, size))]
+            )
+            Participation.objects.bulk_create([
+                Participation(
+                    user=user,
+                    contest=contest,
+                    score=rng.randrange(0, max_score + 1, 10),
+                    last_submission_time=now - timedelta(seconds=rng.randrange(86400)),
+                )
+                for user in users
+            ])
+        return contest
+
+    def _bench(self, size, queries, max_score, rng):
+        started = time.perf_counter()
+        contest = self._populate(size, max_score, rng)
+        self.stdout.write(f"{size:>12} {'populate':<34} {1000 * (time.perf_counter() - started):>10.0f}")
+
+        participations = Participation.objects.filter(contest=contest)
+        ordered = participations.order_by('-score', 'last_submission_time', 'id')
+
+        started = time.perf_counter()
+        index = StandingsIndex(participations.values_list('id', 'score', 'last_submission_time'))
+        self._row(size, "build index from rows", None, time.perf_counter() - started)
+
+        top = min(size, 1000)
+        if index.slice(1, top) != list(ordered.values_list('id', flat=True)[:top]):
+            raise CommandError("The index and the SQL ordering disagree")
+
+        ids = list(participations.values_list('id', flat=True))
+        sample = [participations.get(pk=pk) for pk in rng.sample(ids, min(queries, len(ids)))]
+        ranks = [rng.randrange(1, size + 1) for _ in range(queries)]
+
+        for first in (1, size // 2, size - PAGE_SIZE + 1):
+            self._row(
+                size, f"page of {PAGE_SIZE} at rank {first}",
+                _timed(lambda _: list(ordered.values_list('id', flat=True)[first - 1:first - 1 + PAGE_SIZE]), ranks),
+                _timed(lambda _: index.slice(first, first + PAGE_SIZE - 1), ranks),
+            )
+        self._row(
+            size, "rank of a participant",
+            _timed(lambda participation: ahead_of(participation).count() + 1, sample),
+            _timed(lambda participation: index.rank(participation.id), sample),
+        )
+        self._row(
+            size, "k-th participant",
+            _timed(lambda k: ordered.values_list('id', flat=True)[k - 1], ranks),
+            _timed(index.kth, ranks),
+        )
+
+        def index_update(participation):
+            participation.score += 10
+            index.update(participation.id, participation.score, timezone.now())
+
+        self._row(size, "score update", None, _timed(index_update, sample))
+
+    def _row(self, size, operation, sql_seconds, index_seconds):
+        sql = f"{1000 * sql_seconds:>10.3f}" if sql_seconds is not None else f"{'-':>10}"
+        speedup = f"{sql_seconds / index_seconds:>8.0f}x" if sql_seconds and index_seconds else f"{'':>9}"
+        self.stdout.write(f"{size:>12} {operation:<34} {sql} {1000 * index_seconds:>10.3f} {speedup}")
@@ -0,0 +1,29 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from competition.prewarm import ContestPrewarmer
+
+
+class Command(BaseCommand):
+    help = "Render the problem sets of contests shortly before they start into the shared cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Pre-warm the contests starting soon and exit")
+
+    def handle(self, *args, **options):
+        prewarmer = ContestPrewarmer()
+        if options['once']:
+            contest_ids = prewarmer.run_once()
+            self.stdout.write(self.style.SUCCESS(f"Pre-warmed {len(contest_ids)} contests"))
+            return
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping contest pre-warming...")
+            prewarmer.stop()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write(self.style.SUCCESS("Pre-warming contests about to start"))
+        prewarmer.run()
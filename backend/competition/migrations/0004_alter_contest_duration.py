@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-16 20:51
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0003_remove_contest_difficulty_remove_contest_is_public_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contest',
+            name='duration',
+            field=models.DurationField(default=datetime.timedelta(seconds=3600)),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-16 21:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def rank_participants(apps, schema_editor):
+    Participation = apps.get_model('competition', 'Participation')
+    participations = Participation.objects.order_by(
+        'contest_id', '-score', F('last_submission_time').asc(nulls_last=True), 'id'
+    ).only('id', 'contest_id', 'rank')
+    changed = []
+    contest_id, rank = None, 0
+    for participation in participations.iterator():
+        if participation.contest_id != contest_id:
+            contest_id, rank = participation.contest_id, 0
+        rank += 1
+        if participation.rank != rank:
+            participation.rank = rank
+            changed.append(participation)
+    Participation.objects.bulk_update(changed, ['rank'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0004_alter_contest_duration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='participation',
+            index=models.Index(fields=['contest', 'rank'], name='competition_contest_02322a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participation',
+            index=models.Index(fields=['contest', '-score', 'last_submission_time', 'id'], name='competition_contest_9e09ae_idx'),
+        ),
+        migrations.RunPython(rank_participants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0005_participation_ranks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Lets standings indexes pick up changes made by other processes'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='participation',
+            index=models.Index(fields=['contest', 'updated_at'], name='competition_contest_8fc3d3_idx'),
+        ),
+    ]
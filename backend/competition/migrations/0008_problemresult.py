@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0007_liveevent'),
+        ('problem', '0012_evaluationlease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProblemResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Evaluated submissions for the problem')),
+                ('best_score', models.FloatField(default=0)),
+                ('points', models.PositiveIntegerField(default=0, help_text='Points awarded for the problem')),
+                ('solved_at', models.DateTimeField(blank=True, help_text='Time of the first correct submission', null=True)),
+                ('participation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='problem_results', to='competition.participation')),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contest_results', to='problem.problem')),
+            ],
+            options={
+                'unique_together': {('participation', 'problem')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+def resequence_problems(apps, schema_editor):
+    ContestProblem = apps.get_model('competition', 'ContestProblem')
+    changed = []
+    contest_id, order = None, 0
+    for contest_problem in ContestProblem.objects.order_by('contest_id', 'order', 'id').only('id', 'contest_id', 'order').iterator():
+        if contest_problem.contest_id != contest_id:
+            contest_id, order = contest_problem.contest_id, 0
+        order += 1
+        if contest_problem.order != order:
+            contest_problem.order = order
+            changed.append(contest_problem)
+    ContestProblem.objects.bulk_update(changed, ['order'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0008_problemresult'),
+    ]
+
+    operations = [
+        migrations.RunPython(resequence_problems, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='contestproblem',
+            name='order',
+            field=models.PositiveIntegerField(default=0, help_text='Position of the problem in the contest, 1..n without gaps'),
+        ),
+        migrations.AddConstraint(
+            model_name='contestproblem',
+            constraint=models.UniqueConstraint(fields=('contest', 'order'), name='unique_contest_problem_order'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.db.models import DateTimeField, ExpressionWrapper, F
+
+
+def fill_end_time(apps, schema_editor):
+    Contest = apps.get_model('competition', 'Contest')
+    Contest.objects.update(
+        end_time=ExpressionWrapper(F('starting_time') + F('duration'), output_field=DateTimeField())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0009_contestproblem_dense_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contest',
+            name='end_time',
+            field=models.DateTimeField(editable=False, null=True, help_text='starting_time + duration, kept up to date by save()'),
+        ),
+        migrations.RunPython(fill_end_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='contest',
+            name='end_time',
+            field=models.DateTimeField(editable=False, help_text='starting_time + duration, kept up to date by save()'),
+        ),
+        migrations.AddIndex(
+            model_name='contest',
+            index=models.Index(fields=['starting_time'], name='competition_startin_c62810_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contest',
+            index=models.Index(fields=['end_time', 'starting_time'], name='competition_end_tim_58a133_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0010_contest_end_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Version stamp for ETags, see problem/conditional.py'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='contestproblem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Version stamp for ETags, see problem/conditional.py'),
+            preserve_default=False,
+        ),
+    ]
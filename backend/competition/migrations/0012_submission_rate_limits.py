@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0011_version_stamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contest',
+            name='submission_rate_limit',
+            field=models.PositiveIntegerField(blank=True, help_text='Submissions per participant per minute over all problems; empty for SUBMISSION_RATE_LIMIT, 0 for no limit', null=True),
+        ),
+        migrations.AddField(
+            model_name='contestproblem',
+            name='submission_rate_limit',
+            field=models.PositiveIntegerField(blank=True, help_text="Submissions per participant per minute on this problem; empty for the problem's own limit", null=True),
+        ),
+    ]
@@ -20,6 +20,28 @@ class Contest(models.Model):
     creator = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='created_contests')
     participants = models.ManyToManyField(settings.AUTH_USER_MODEL, through='Participation', related_name='participated_contests')
     problems = models.ManyToManyField(Problem, through='ContestProblem', related_name='contests')
+    end_time = models.DateTimeField(editable=False, help_text="starting_time + duration, kept up to date by save()")
+    updated_at = models.DateTimeField(auto_now=True, help_text="Version stamp for ETags, see problem/conditional.py")
+    submission_rate_limit = models.PositiveIntegerField(null=True, blank=True, help_text="Submissions per participant per minute over all problems; empty for SUBMISSION_RATE_LIMIT, 0 for no limit")
+    
+    class Meta:
+        indexes = [
+            # Future contests (starting_time > now, latest first)
+            models.Index(fields=['starting_time']),
+            # Active (end_time >= now and starting_time <= now) and completed
+            # (end_time < now) contests, both sorted by end time
+            models.Index(fields=['end_time', 'starting_time']),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.end_time = self.starting_time + self.duration
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields) | {'updated_at'}
+            if {'starting_time', 'duration'} & update_fields:
+                update_fields.add('end_time')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return self.name
@@ -32,11 +54,17 @@ class ContestProblem(models.Model):
     contest = models.ForeignKey(Contest, on_delete=models.CASCADE)
     problem = models.ForeignKey(Problem, on_delete=models.CASCADE)
     points = models.PositiveIntegerField(default=100, help_text="Points awarded for solving this problem")
-    order = models.PositiveIntegerField(default=0, help_text="Order of the problem in the contest")
+    order = models.PositiveIntegerField(default=0, help_text="Position of the problem in the contest, 1..n without gaps")
+    updated_at = models.DateTimeField(auto_now=True, help_text="Version stamp for ETags, see problem/conditional.py")
+    submission_rate_limit = models.PositiveIntegerField(null=True, blank=True, help_text="Submissions per participant per minute on this problem; empty for the problem's own limit")
     
     class Meta:
         unique_together = ['contest', 'problem']
         ordering = ['order']
+        constraints = [
+            # Also serves lookups of a contest's problem by order
+            models.UniqueConstraint(fields=['contest', 'order'], name='unique_contest_problem_order'),
+        ]
     
     def __str__(self):
         return f"{self.problem.title} in {self.contest.name} ({self.points} points)"
@@ -55,10 +83,51 @@ class Participation(models.Model):
     # Additional fields to track participant activity
     last_submission_time = models.DateTimeField(null=True, blank=True)
     submissions_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Lets standings indexes pick up changes made by other processes")
     
     class Meta:
         unique_together = ['user', 'contest']
         ordering = ['-score', 'last_submission_time']
+        indexes = [
+            # Leaderboard pages and "around me" windows (see competition/standings.py)
+            models.Index(fields=['contest', 'rank']),
+            # Counting the participants ahead of a new score
+            models.Index(fields=['contest', '-score', 'last_submission_time', 'id']),
+            # Delta sync of the in-memory standings index (competition/standings_index.py)
+            models.Index(fields=['contest', 'updated_at']),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} in {self.contest.name}"
\ No newline at end of file
+        return f"{self.user.username} in {self.contest.name}"
+
+class LiveEvent(models.Model):
+    """
+    Event published to the live contest streams through the database, so
+    that web processes see events from other processes such as the
+    evaluator workers (see competition/live.py)
+    """
+    channel = models.CharField(max_length=100)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.channel}: {self.payload.get('type')}"
+
+
+class ProblemResult(models.Model):
+    """
+    Best result of a participant on one contest problem. Points are awarded
+    once, by the first correct submission (see competition/scoring.py)
+    """
+    participation = models.ForeignKey(Participation, on_delete=models.CASCADE, related_name='problem_results')
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='contest_results')
+    attempts = models.PositiveIntegerField(default=0, help_text="Evaluated submissions for the problem")
+    best_score = models.FloatField(default=0)
+    points = models.PositiveIntegerField(default=0, help_text="Points awarded for the problem")
+    solved_at = models.DateTimeField(null=True, blank=True, help_text="Time of the first correct submission")
+
+    class Meta:
+        unique_together = ['participation', 'problem']
+
+    def __str__(self):
+        return f"{self.participation} on problem {self.problem_id}: {self.points} points"
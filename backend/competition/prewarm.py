@@ -0,0 +1,142 @@
+"""
+Pre-rendered problem sets for the start of a contest.
+
+When a contest starts, every registered user asks for its problems within a
+few seconds. ``get_bundle`` renders the whole ordered problem set once, as
+the JSON the problem endpoints return, gzips it and keeps it in the Django
+cache until the contest ends, so the rush is answered with cached bytes
+(see ContestProblemBundleView). Edits to the contest or its problems drop
+the bundle together with the contest context (``invalidate_contest``).
+
+``manage.py prewarm_contests`` runs ``ContestPrewarmer``, which renders the
+bundles and contest contexts of contests starting within
+CONTEST_PREWARM_LEAD_SECONDS, so even the first request of the rush is a
+cache hit. That needs a cache shared with the web processes; with the
+default per-process cache a bundle is rendered by the first request of
+each process instead.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils import timezone
+
+from problem.serializers import ProblemSerializer
+
+from .context import bundle_cache_key, load_contest
+from .models import Contest
+
+logger = logging.getLogger(__name__)
+
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+class ProblemBundle:
+    """The gzipped JSON of a contest's problem set and a tag of the rows it was rendered from"""
+
+    def __init__(self, version, compressed):
+        self.version = version
+        self.compressed = compressed
+
+    @property
+    def content(self):
+        return gzip.decompress(self.compressed)
+
+
+def render_bundle(contest, manifest):
+    """Render the problem set of a contest, as listed by ContestProblemByOrderView, into a ProblemBundle"""
+    problems = []
+    for contest_problem in manifest:
+        data = ProblemSerializer(contest_problem.problem).data
+        data['order'] = contest_problem.order
+        data['points'] = contest_problem.points
+        problems.append(data)
+    content = json.dumps(
+        {"contest_id": contest.id, "problems": problems}, cls=DjangoJSONEncoder, separators=(',', ':')
+    ).encode()
+    stamps = repr([(contest_problem.updated_at, contest_problem.problem.updated_at) for contest_problem in manifest])
+    version = hashlib.sha256(stamps.encode()).hexdigest()[:32]
+    return ProblemBundle(version, gzip.compress(content, compresslevel=6))
+
+
+def _timeout(contest):
+    # Kept until the contest is over, then left to expire
+    remaining = (contest.starting_time + contest.duration - timezone.now()).total_seconds()
+    return max(int(remaining), 0) + settings.CONTEST_CONTEXT_CACHE_SECONDS
+
+
+def _build_lock(contest_id):
+    with _build_locks_guard:
+        return _build_locks.setdefault(contest_id, threading.Lock())
+
+
+def get_bundle(contest_id):
+    """The ProblemBundle of a contest, rendered and cached on a miss; None if the contest doesn't exist"""
+    bundle = cache.get(bundle_cache_key(contest_id))
+    if bundle is not None:
+        return bundle
+    # Concurrent misses in this process wait for one render instead of each rendering
+    with _build_lock(contest_id):
+        bundle = cache.get(bundle_cache_key(contest_id))
+        if bundle is not None:
+            return bundle
+        cached = load_contest(contest_id)
+        if cached is None:
+            return None
+        contest, manifest = cached
+        bundle = render_bundle(contest, manifest)
+        cache.set(bundle_cache_key(contest_id), bundle, _timeout(contest))
+        return bundle
+
+
+def prewarm_contest(contest_id):
+    """Load the context and render the problem bundle of a contest into the cache"""
+    load_contest(contest_id)
+    get_bundle(contest_id)
+
+
+def upcoming_contests(lead=None):
+    """Ids of contests starting within ``lead`` seconds (CONTEST_PREWARM_LEAD_SECONDS by default)"""
+    lead = settings.CONTEST_PREWARM_LEAD_SECONDS if lead is None else lead
+    now = timezone.now()
+    return list(
+        Contest.objects.filter(starting_time__gte=now, starting_time__lte=now + timedelta(seconds=lead))
+        .values_list('id', flat=True)
+    )
+
+
+class ContestPrewarmer:
+    """Pre-warms the caches of contests about to start, every CONTEST_PREWARM_POLL_SECONDS"""
+
+    def __init__(self, poll_interval=None):
+        self.poll_interval = poll_interval if poll_interval is not None else settings.CONTEST_PREWARM_POLL_SECONDS
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        """Pre-warm every contest starting soon; returns their ids"""
+        close_old_connections()
+        contest_ids = upcoming_contests()
+        for contest_id in contest_ids:
+            try:
+                prewarm_contest(contest_id)
+            except Exception:
+                logger.exception("Pre-warming contest %s failed", contest_id)
+        return contest_ids
+
+    def run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.run_once()
+            self._stop.wait(max(self.poll_interval - (time.monotonic() - started), 0))
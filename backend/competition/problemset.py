@@ -0,0 +1,164 @@
+"""
+Problem sets of contests.
+
+The problems of a contest are numbered 1..n by ``ContestProblem.order``,
+without gaps, and the (contest, order) pair is unique, so the n-th problem
+is a single lookup on that index. Changes to the numbering lock the
+contest row, like rank changes do (see competition/standings.py).
+
+Rows are renumbered in two steps: first moved past the current highest
+order, then to their final place, so no intermediate state of an UPDATE
+ever holds two rows at the same position.
+
+Attaching and reordering write all rows with bulk queries, which send no
+model signals and skip auto_now, so they drop the cached contest context
+and set the ``updated_at`` version stamps themselves.
+"""
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from problem.models import Problem
+
+from .context import invalidate_contest
+from .models import ContestProblem
+from .standings import _lock_contest
+
+DEFAULT_POINTS = 100
+
+
+class ProblemSetError(ValueError):
+    """A problem set change that cannot be applied; the message is meant for the client"""
+
+
+def _renumber(contest_id, contest_problems):
+    """Give the contest's ContestProblem rows the orders 1..n in the given sequence"""
+    rows = ContestProblem.objects.filter(contest_id=contest_id)
+    top = rows.aggregate(top=Max('order'))['top'] or 0
+    now = timezone.now()
+    rows.update(order=F('order') + top, updated_at=now)
+    for order, contest_problem in enumerate(contest_problems, 1):
+        contest_problem.order = order
+        contest_problem.updated_at = now
+    ContestProblem.objects.bulk_update(contest_problems, ['order', 'updated_at'], batch_size=1000)
+
+
+def parse_problem_entries(data):
+    """
+    Normalize the body of an attach request into (problem id, points, order)
+    tuples. Accepts {"problem_ids": [1, 2]} or {"problems": [{"problem_id": 1,
+    "points": 200, "order": 1}, ...]}; points and order are optional.
+    """
+    if 'problems' in data:
+        problems = data['problems']
+        if not isinstance(problems, list) or not problems or not all(isinstance(item, dict) for item in problems):
+            raise ProblemSetError("problems must be a non-empty list of objects.")
+    else:
+        problem_ids = data.get('problem_ids', [])
+        if not isinstance(problem_ids, list) or not problem_ids:
+            raise ProblemSetError("A list of problem IDs is required.")
+        problems = [{'problem_id': problem_id} for problem_id in problem_ids]
+
+    entries = []
+    for item in problems:
+        try:
+            problem_id = int(item['problem_id'])
+            points = None if item.get('points') is None else int(item['points'])
+            order = None if item.get('order') is None else int(item['order'])
+        except (KeyError, TypeError, ValueError):
+            raise ProblemSetError("Every problem needs an integer problem_id; points and order must be integers.")
+        if (points is not None and points < 0) or (order is not None and order < 1):
+            raise ProblemSetError("points must not be negative and order must be positive.")
+        entries.append((problem_id, points, order))
+    if len({problem_id for problem_id, _, _ in entries}) != len(entries):
+        raise ProblemSetError("Each problem may only be listed once.")
+    return entries
+
+
+def attach_problems(contest_id, entries):
+    """
+    Add problems to a contest, or change the points and position of ones it
+    already has, in one transaction. ``entries`` are (problem id, points,
+    order) tuples as returned by parse_problem_entries. New problems without
+    an order are appended in the given sequence; problems with an order are
+    then moved to that position. Returns the problem ids in contest order.
+    """
+    problem_ids = [problem_id for problem_id, _, _ in entries]
+    with transaction.atomic():
+        found = set(Problem.objects.filter(id__in=problem_ids).values_list('id', flat=True))
+        missing = [problem_id for problem_id in problem_ids if problem_id not in found]
+        if missing:
+            raise ProblemSetError(f"Problem with ID {missing[0]} does not exist.")
+
+        _lock_contest(contest_id)
+        current = list(ContestProblem.objects.filter(contest_id=contest_id).order_by('order'))
+        by_problem = {contest_problem.problem_id: contest_problem for contest_problem in current}
+        top = current[-1].order if current else 0
+
+        new, repointed = [], []
+        for problem_id, points, _ in entries:
+            contest_problem = by_problem.get(problem_id)
+            if contest_problem is None:
+                top += 1
+                contest_problem = ContestProblem(
+                    contest_id=contest_id, problem_id=problem_id,
+                    points=DEFAULT_POINTS if points is None else points, order=top,
+                )
+                new.append(contest_problem)
+                by_problem[problem_id] = contest_problem
+            elif points is not None and points != contest_problem.points:
+                contest_problem.points = points
+                contest_problem.updated_at = timezone.now()
+                repointed.append(contest_problem)
+        ContestProblem.objects.bulk_create(new)
+        ContestProblem.objects.bulk_update(repointed, ['points', 'updated_at'])
+
+        placed = sorted(
+            ((order, by_problem[problem_id]) for problem_id, _, order in entries if order is not None),
+            key=lambda item: item[0],
+        )
+        sequence = current + new
+        if placed:
+            moved = {contest_problem.problem_id for _, contest_problem in placed}
+            sequence = [contest_problem for contest_problem in sequence if contest_problem.problem_id not in moved]
+            for order, contest_problem in placed:
+                sequence.insert(min(order, len(sequence) + 1) - 1, contest_problem)
+            _renumber(contest_id, sequence)
+
+        transaction.on_commit(lambda: invalidate_contest(contest_id))
+    return [contest_problem.problem_id for contest_problem in sequence]
+
+
+def reorder_problems(contest_id, problem_ids):
+    """Renumber a contest's problems in the given sequence, which must list every one of them once"""
+    with transaction.atomic():
+        _lock_contest(contest_id)
+        by_problem = {
+            contest_problem.problem_id: contest_problem
+            for contest_problem in ContestProblem.objects.filter(contest_id=contest_id)
+        }
+        if len(problem_ids) != len(by_problem) or set(problem_ids) != set(by_problem):
+            raise ProblemSetError("problem_ids must list every problem of the contest exactly once.")
+        _renumber(contest_id, [by_problem[problem_id] for problem_id in problem_ids])
+        transaction.on_commit(lambda: invalidate_contest(contest_id))
+
+
+def remove_problem(contest_problem):
+    """Remove a problem from its contest and move the problems after it up by one place"""
+    contest_id = contest_problem.contest_id
+    with transaction.atomic():
+        _lock_contest(contest_id)
+        removed_order = ContestProblem.objects.filter(pk=contest_problem.pk).values_list('order', flat=True).first()
+        if removed_order is None:
+            return
+        ContestProblem.objects.filter(pk=contest_problem.pk).delete()
+
+        after = ContestProblem.objects.filter(contest_id=contest_id, order__gt=removed_order)
+        top = after.aggregate(top=Max('order'))['top']
+        if top is not None:
+            after.update(order=F('order') + top)
+            ContestProblem.objects.filter(contest_id=contest_id, order__gt=top).update(
+                order=F('order') - top - 1, updated_at=timezone.now()
+            )
+        # Readers may have cached the old numbering while this transaction ran
+        transaction.on_commit(lambda: invalidate_contest(contest_id))
@@ -0,0 +1,77 @@
+"""
+Contest registrations.
+
+A registration is a single INSERT that ignores the (user, contest) unique
+conflict, so concurrent or repeated requests all end with the user
+registered and none of them fails. Organizers register many users at once
+with ``register_users``, which inserts them in batches of
+REGISTRATION_BATCH_SIZE the same way.
+
+Bulk inserts send no model signals and do not report which rows already
+existed. Nothing depends on that: registrants get a stored rank with their
+first scored submission (see competition/standings.py) and are listed
+after the ranked participants until then, standings indexes pick up new
+rows on their next sync, and the participant sets of contest contexts fall
+back to the database for users they have not seen.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .context import participants
+from .models import Participation
+
+
+class RegistrationError(ValueError):
+    """A bulk registration that cannot be applied; the message is meant for the client"""
+
+
+def register(contest_id, user_id):
+    """Register a user for a contest; does nothing if already registered"""
+    Participation.objects.bulk_create([Participation(contest_id=contest_id, user_id=user_id)], ignore_conflicts=True)
+
+
+def parse_registrants(data):
+    """
+    Resolve the body of a bulk registration request into (user ids, unknown
+    entries). Accepts {"user_ids": [1, 2]} or {"usernames": ["alice", "bob"]}.
+    """
+    User = get_user_model()
+    if 'usernames' in data:
+        usernames = data['usernames']
+        if not isinstance(usernames, list) or not usernames or not all(isinstance(name, str) for name in usernames):
+            raise RegistrationError("usernames must be a non-empty list of usernames.")
+        usernames = list(dict.fromkeys(usernames))
+        found = {}
+        for start in range(0, len(usernames), settings.REGISTRATION_BATCH_SIZE):
+            batch = usernames[start:start + settings.REGISTRATION_BATCH_SIZE]
+            found.update(User.objects.filter(username__in=batch).values_list('username', 'id'))
+        return [found[name] for name in usernames if name in found], [name for name in usernames if name not in found]
+
+    user_ids = data.get('user_ids')
+    if not isinstance(user_ids, list) or not user_ids or not all(
+        isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in user_ids
+    ):
+        raise RegistrationError("A non-empty list of user_ids or usernames is required.")
+    user_ids = list(dict.fromkeys(user_ids))
+    found = set()
+    for start in range(0, len(user_ids), settings.REGISTRATION_BATCH_SIZE):
+        batch = user_ids[start:start + settings.REGISTRATION_BATCH_SIZE]
+        found.update(User.objects.filter(id__in=batch).values_list('id', flat=True))
+    return [user_id for user_id in user_ids if user_id in found], [user_id for user_id in user_ids if user_id not in found]
+
+
+def register_users(contest_id, user_ids, batch_size=None):
+    """Register users for a contest in batches; returns how many were not registered before"""
+    batch_size = batch_size or settings.REGISTRATION_BATCH_SIZE
+    with transaction.atomic():
+        before = Participation.objects.filter(contest_id=contest_id).count()
+        for start in range(0, len(user_ids), batch_size):
+            Participation.objects.bulk_create(
+                [Participation(contest_id=contest_id, user_id=user_id) for user_id in user_ids[start:start + batch_size]],
+                ignore_conflicts=True,
+            )
+        added = Participation.objects.filter(contest_id=contest_id).count() - before
+    # Reload the contest's participant set rather than looking up every new user on their first request
+    transaction.on_commit(lambda: participants.forget(contest_id))
+    return added
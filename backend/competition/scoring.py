@@ -0,0 +1,158 @@
+"""
+Score accounting for contest submissions.
+
+Every (participant, problem) pair has one ProblemResult row holding the
+best score so far and whether, and when, the problem was solved. All
+changes are single UPDATE statements computed by the database (F()
+expressions, conditional WHERE clauses), so concurrent evaluations never
+read a value and write back a stale one:
+
+- ``record_submission`` counts a submission when it is made.
+- ``record_result`` folds an evaluated submission into the result. Only
+  the UPDATE that moves ``solved_at`` from NULL awards the problem's
+  points, so resubmitting a solved problem, or evaluating the same
+  submission twice, awards nothing. Likewise only the UPDATE that sets
+  ``Submission.result_recorded`` counts an attempt, so re-evaluations
+  (retries, requeued rejudges) are not counted again.
+- ``rescore_contest`` recomputes results from the submissions themselves,
+  for changes ``record_result`` cannot express, such as a rejudge turning
+  a correct answer wrong.
+
+``Participation.last_submission_time`` is the time of the submission that
+last raised the score, which is what the standings use to break ties.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from problem.models import Submission
+
+from . import standings_index
+from .models import ContestProblem, Participation, ProblemResult
+from .standings import _lock_contest, rebuild_ranks, update_rank
+
+
+def record_submission(participation_id):
+    """Count a new submission of a participant"""
+    Participation.objects.filter(pk=participation_id).update(submissions_count=F('submissions_count') + 1)
+
+
+def record_result(submission):
+    """
+    Account the result of an evaluated contest submission. Returns the
+    points newly awarded, 0 if the answer is wrong or the problem was
+    already solved.
+    """
+    points = ContestProblem.objects.filter(
+        contest_id=submission.contest_id, problem_id=submission.problem_id
+    ).values_list('points', flat=True).first()
+    participation_id = Participation.objects.filter(
+        user_id=submission.user_id, contest_id=submission.contest_id
+    ).values_list('id', flat=True).first()
+    if points is None or participation_id is None:
+        return 0
+
+    with transaction.atomic():
+        ProblemResult.objects.get_or_create(participation_id=participation_id, problem_id=submission.problem_id)
+        result = ProblemResult.objects.filter(participation_id=participation_id, problem_id=submission.problem_id)
+        first = Submission.objects.filter(pk=submission.pk, result_recorded=False).update(result_recorded=True)
+        result.update(attempts=F('attempts') + first, best_score=Greatest(F('best_score'), Value(submission.score)))
+        if submission.evaluation_status != 'Correct':
+            return 0
+        if not result.filter(solved_at__isnull=True).update(solved_at=submission.created_at, points=points):
+            return 0
+
+        # Lock the contest before the participant row, in the order update_rank does
+        _lock_contest(submission.contest_id)
+        submitted = Value(submission.created_at)
+        Participation.objects.filter(pk=participation_id).update(
+            score=F('score') + points,
+            last_submission_time=Greatest(Coalesce(F('last_submission_time'), submitted), submitted),
+            # update() skips auto_now; standings indexes of other processes sync on it
+            updated_at=timezone.now(),
+        )
+        update_rank(participation_id)
+    return points
+
+
+def rescore_contest(contest_id, user_ids=None):
+    """
+    Recompute the problem results, scores and ranks of a contest's
+    participants (all of them, or those of ``user_ids``) from their
+    evaluated submissions, which all count as attempts from then on.
+    Returns the number of participants whose score changed.
+    """
+    with transaction.atomic():
+        _lock_contest(contest_id)
+        points = dict(ContestProblem.objects.filter(contest_id=contest_id).values_list('problem_id', 'points'))
+        participations = Participation.objects.filter(contest_id=contest_id)
+        submissions = Submission.objects.filter(contest_id=contest_id, problem_id__in=list(points)).exclude(
+            evaluation_task__status__in=['Pending', 'Running']
+        )
+        if user_ids is not None:
+            participations = participations.filter(user_id__in=user_ids)
+            submissions = submissions.filter(user_id__in=user_ids)
+        submissions.filter(result_recorded=False).update(result_recorded=True)
+        participations = {
+            participation.user_id: participation
+            for participation in participations.only('id', 'user_id', 'score', 'last_submission_time')
+        }
+        results = {
+            (result.participation_id, result.problem_id): result
+            for result in ProblemResult.objects.filter(participation__in=list(participations.values()))
+        }
+
+        changed, created, seen = [], [], set()
+        for row in submissions.values('user_id', 'problem_id').annotate(
+            evaluated=Count('id'), best_score=Max('score'), solved_at=Min('created_at', filter=Q(evaluation_status='Correct'))
+        ):
+            participation = participations.get(row['user_id'])
+            if participation is None:
+                continue
+            key = (participation.id, row['problem_id'])
+            seen.add(key)
+            values = {
+                'attempts': row['evaluated'],
+                'best_score': row['best_score'],
+                'solved_at': row['solved_at'],
+                'points': points[row['problem_id']] if row['solved_at'] else 0,
+            }
+            result = results.get(key)
+            if result is None:
+                result = results[key] = ProblemResult(
+                    participation_id=participation.id, problem_id=row['problem_id'], **values
+                )
+                created.append(result)
+            elif any(getattr(result, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(result, field, value)
+                changed.append(result)
+        for key, result in results.items():
+            # No evaluated submissions left, e.g. their problem left the contest
+            if key not in seen and (result.attempts or result.best_score or result.solved_at):
+                result.attempts, result.best_score, result.solved_at, result.points = 0, 0, None, 0
+                changed.append(result)
+        ProblemResult.objects.bulk_create(created)
+        ProblemResult.objects.bulk_update(changed, ['attempts', 'best_score', 'solved_at', 'points'])
+
+        totals = {participation.id: (0, None) for participation in participations.values()}
+        for (participation_id, _), result in results.items():
+            score, submitted = totals[participation_id]
+            if result.solved_at is not None:
+                totals[participation_id] = (
+                    score + result.points, result.solved_at if submitted is None else max(submitted, result.solved_at)
+                )
+        now = timezone.now()
+        rescored = []
+        for participation in participations.values():
+            score, submitted = totals[participation.id]
+            if (participation.score, participation.last_submission_time) != (score, submitted):
+                participation.score, participation.last_submission_time = score, submitted
+                participation.updated_at = now
+                rescored.append(participation)
+                standings_index.notify(contest_id, participation.id, score, submitted)
+        if rescored:
+            Participation.objects.bulk_update(rescored, ['score', 'last_submission_time', 'updated_at'])
+            rebuild_ranks(contest_id)
+    return len(rescored)
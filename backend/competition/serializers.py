@@ -24,5 +24,5 @@ class ContestSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contest
         fields = ['id', 'name', 'starting_time', 'duration', 'genres', 'genre_ids', 
-                  'description', 'creator', 'creator_username']
+                  'description', 'creator', 'creator_username', 'submission_rate_limit']
         read_only_fields = ['id', 'creator', 'creator_username']
\ No newline at end of file
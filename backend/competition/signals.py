@@ -0,0 +1,50 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from problem.models import Submission
+from problem.signals import submission_evaluated, submissions_rejudged
+
+from . import live
+from .models import Contest
+from .scoring import record_result, rescore_contest
+
+
+@receiver(submission_evaluated, sender=Submission)
+def award_contest_points(sender, submission, **kwargs):
+    """Account the result of a contest submission, see competition/scoring.py"""
+    if submission.contest_id is not None:
+        record_result(submission)
+
+
+@receiver(submissions_rejudged, sender=Submission)
+def rescore_rejudged(sender, submissions, **kwargs):
+    """Recompute the contest results of participants whose submissions were rejudged"""
+    users = {}
+    for submission in submissions:
+        if submission.contest_id is not None:
+            users.setdefault(submission.contest_id, set()).add(submission.user_id)
+    for contest_id, user_ids in users.items():
+        rescore_contest(contest_id, user_ids)
+
+
+@receiver(submission_evaluated, sender=Submission)
+def push_verdict(sender, submission, **kwargs):
+    """Send the verdict to the live streams of the submitter once the result is committed"""
+    live.publish(live.user_channel(submission.user_id), {
+        "type": "verdict",
+        "submission_id": submission.id,
+        "problem_id": submission.problem_id,
+        "contest_id": submission.contest_id,
+        "evaluation_status": submission.evaluation_status,
+        "score": submission.score,
+    })
+
+
+@receiver(m2m_changed, sender=Contest.genres.through)
+def touch_contest(sender, instance, action, pk_set, **kwargs):
+    """Bump the version stamps of contests whose genres changed, which save() does not see"""
+    if not action.startswith('post_'):
+        return
+    contest_ids = [instance.pk] if isinstance(instance, Contest) else list(pk_set or ())
+    Contest.objects.filter(pk__in=contest_ids).update(updated_at=timezone.now())
@@ -0,0 +1,168 @@
+"""
+Incrementally maintained contest ranks.
+
+Every participant of a contest who has scored holds a distinct
+``Participation.rank`` (1 = first) in the order of
+``Participation.Meta.ordering``: higher score first, then earlier last
+submission, then earlier registration (id). Participants who have not
+scored yet come after everyone who has; registrations are plain inserts
+(see competition/registration.py), so they get a stored rank with their
+first points. Until then their stored rank is NULL, and the leaderboard
+and ``rank_of`` place them after all ranked participants, in registration
+order.
+
+Ranks are never recomputed by sorting the whole table. When a participant's
+score changes, only the participants between its old and new position are
+shifted by one, with a single UPDATE; unregistrations close the gap.
+Changes of one contest are serialized by locking its Contest row.
+
+Leaderboard reads go through the in-memory order-statistic index in
+competition/standings_index.py, which is kept in sync from here. Until a
+process has built the index of a contest, reads use the stored ranks.
+"""
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+
+from . import standings_index
+from .models import Contest, Participation
+
+
+def ahead_of(participation):
+    """Participants of the same contest ranked before the given one"""
+    score = participation.score
+    submitted = participation.last_submission_time
+    same_score = Q(score=score)
+    if submitted is None:
+        ahead = Q(score__gt=score) | (same_score & Q(last_submission_time__isnull=False)) | (
+            same_score & Q(last_submission_time__isnull=True, id__lt=participation.id)
+        )
+    else:
+        ahead = Q(score__gt=score) | (same_score & Q(last_submission_time__lt=submitted)) | (
+            same_score & Q(last_submission_time=submitted, id__lt=participation.id)
+        )
+    return Participation.objects.filter(ahead, contest_id=participation.contest_id).exclude(pk=participation.pk)
+
+
+def _lock_contest(contest_id):
+    list(Contest.objects.select_for_update().filter(pk=contest_id).values_list('pk', flat=True))
+
+
+def update_rank(participation_id):
+    """
+    Move a participant to the position matching its current score and last
+    submission time. Returns (old rank, new rank).
+    """
+    with transaction.atomic():
+        contest_id = Participation.objects.values_list('contest_id', flat=True).get(pk=participation_id)
+        _lock_contest(contest_id)
+        participation = Participation.objects.get(pk=participation_id)
+        standings_index.notify(contest_id, participation.id, participation.score, participation.last_submission_time)
+        old_rank = participation.rank
+        new_rank = ahead_of(participation).count() + 1
+        if old_rank == new_rank:
+            return old_rank, new_rank
+
+        others = Participation.objects.filter(contest_id=contest_id).exclude(pk=participation_id)
+        if old_rank is None:
+            others.filter(rank__gte=new_rank).update(rank=F('rank') + 1)
+        elif new_rank < old_rank:
+            others.filter(rank__gte=new_rank, rank__lt=old_rank).update(rank=F('rank') + 1)
+        else:
+            others.filter(rank__gt=old_rank, rank__lte=new_rank).update(rank=F('rank') - 1)
+        Participation.objects.filter(pk=participation_id).update(rank=new_rank)
+        return old_rank, new_rank
+
+
+def rebuild_ranks(contest_id):
+    """Recompute every rank of a contest from scratch, e.g. after bulk changes that bypass update_rank"""
+    with transaction.atomic():
+        _lock_contest(contest_id)
+        participations = list(
+            Participation.objects.filter(contest_id=contest_id)
+            .order_by('-score', F('last_submission_time').asc(nulls_last=True), 'id')
+            .only('id', 'rank')
+        )
+        changed = []
+        for rank, participation in enumerate(participations, 1):
+            if participation.rank != rank:
+                participation.rank = rank
+                changed.append(participation)
+        Participation.objects.bulk_update(changed, ['rank'], batch_size=1000)
+    return len(changed)
+
+
+def _deleting_contest(origin):
+    return isinstance(origin, Contest) or getattr(origin, 'model', None) is Contest
+
+
+@receiver(pre_delete, sender=Participation)
+def lock_rank(sender, instance, origin=None, **kwargs):
+    """Lock the contest and read the current rank; deletions run in a transaction until post_delete"""
+    if _deleting_contest(origin):
+        return
+    _lock_contest(instance.contest_id)
+    instance.rank = Participation.objects.filter(pk=instance.pk).values_list('rank', flat=True).first()
+
+
+@receiver(post_delete, sender=Participation)
+def close_rank_gap(sender, instance, origin=None, **kwargs):
+    """Move up everyone ranked after an unregistered participant"""
+    standings_index.notify(instance.contest_id, instance.pk, removed=True)
+    if instance.rank is None or _deleting_contest(origin):
+        # Nothing to close, or the whole contest is being deleted
+        return
+    Participation.objects.filter(contest_id=instance.contest_id, rank__gt=instance.rank).update(
+        rank=F('rank') - 1
+    )
+
+
+ROW_FIELDS = ['user_id', 'score', 'last_submission_time', 'submissions_count']
+
+
+def leaderboard(contest_id, first_rank, last_rank):
+    """Rows of the standings between two ranks, inclusive, with ranks from the standings index"""
+    index = standings_index.get_index(contest_id)
+    if index is None:
+        participations = Participation.objects.filter(contest_id=contest_id)
+        rows = list(
+            participations.filter(rank__gte=first_rank, rank__lte=last_rank)
+            .order_by('rank').values('rank', *ROW_FIELDS, username=F('user__username'))
+        )
+        if len(rows) < last_rank - first_rank + 1:
+            # Registrants who have not scored yet follow, in registration order
+            ranked = participations.filter(rank__isnull=False).count()
+            start = max(first_rank, ranked + 1)
+            unranked = participations.filter(rank__isnull=True).order_by('id').values(
+                *ROW_FIELDS, username=F('user__username')
+            )[start - ranked - 1:last_rank - ranked]
+            rows += [dict(rank=start + i, **row) for i, row in enumerate(unranked)]
+        return rows
+    ids = index.slice(first_rank, last_rank)
+    rows = {
+        row.pop('id'): row
+        for row in Participation.objects.filter(id__in=ids).values('id', *ROW_FIELDS, username=F('user__username'))
+    }
+    # Rows deleted since the index was last synced are skipped
+    return [dict(rank=first_rank + i, **rows[pk]) for i, pk in enumerate(ids) if pk in rows]
+
+
+def participant_count(contest_id):
+    index = standings_index.get_index(contest_id)
+    if index is None:
+        return Participation.objects.filter(contest_id=contest_id).count()
+    return len(index)
+
+
+def rank_of(contest_id, user):
+    """The user's rank in a contest, or None if not registered"""
+    participation = Participation.objects.filter(contest_id=contest_id, user=user).only(
+        'id', 'contest_id', 'score', 'last_submission_time'
+    ).first()
+    if participation is None:
+        return None
+    index = standings_index.get_index(contest_id)
+    if index is None or participation.id not in index:
+        return ahead_of(participation).count() + 1
+    return index.rank(participation.id)
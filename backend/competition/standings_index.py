@@ -0,0 +1,353 @@
+"""
+In-process order-statistic index of contest standings.
+
+Each contest's standings are held in memory as a Fenwick tree over score
+values, counting participants per score, plus one sorted bucket of
+(last submission time, id) per score. Rank lookups, updates and k-th
+element queries cost O(log S) in the number of distinct score values plus
+a bisect in one bucket, independent of how deep in the standings the
+participant is. The order matches ``Participation.Meta.ordering`` and
+competition/standings.py: higher score first, then earlier last
+submission (participants who never submitted last), then id.
+
+Indexes are built from the Participation rows of a contest by a background
+thread, never by the request that needs them: the first scoring event of a
+contest in a process queues the build (see ``notify``), as does the first
+read, which gets None and is answered from the stored ranks meanwhile
+(see competition/standings.py). Web processes also queue the builds of the
+running contests when they start (``warm_running``, called from
+CompeteHub/asgi.py and wsgi.py), so after a deploy the first reads find
+the indexes built. Scoring events of this process then update
+the index directly. Changes made by other processes, such as the evaluator
+workers, are pulled in at most every STANDINGS_INDEX_SYNC_SECONDS from the
+rows whose ``updated_at`` moved. A full rebuild every
+STANDINGS_INDEX_REBUILD_SECONDS, also in the background, picks up anything
+the delta sync cannot see, such as deleted rows.
+"""
+import bisect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Contest, Participation
+
+logger = logging.getLogger(__name__)
+
+_NEVER = float('inf')
+
+
+class FenwickTree:
+    """Prefix sums over positions 1..size with O(log size) updates and searches"""
+
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, i, delta):
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        """Sum of positions 1..i"""
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def lower_bound(self, k):
+        """Smallest position whose prefix sum is at least k (k >= 1)"""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] < k:
+                position = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return position + 1
+
+
+def _time_key(submitted):
+    if submitted is None:
+        return _NEVER
+    return submitted.timestamp()
+
+
+class StandingsIndex:
+    """
+    Order-statistic index of one contest. Ranks are 1-based. Methods are
+    thread-safe.
+    """
+
+    def __init__(self, rows=()):
+        """``rows`` are (participation id, score, last submission time) tuples"""
+        self._entries = {}
+        self._buckets = {}
+        self._lock = threading.RLock()
+        rows = list(rows)
+        scores = [score for _, score, _ in rows]
+        self._resize(min(scores, default=0), max(scores, default=0))
+        for participation_id, score, submitted in rows:
+            key = (_time_key(submitted), participation_id)
+            self._entries[participation_id] = (score, key)
+            self._buckets.setdefault(score, []).append(key)
+        for score, bucket in self._buckets.items():
+            bucket.sort()
+            self._tree.add(self._position(score), len(bucket))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, participation_id):
+        return participation_id in self._entries
+
+    def score(self, participation_id):
+        """Score of a participant, or None if it is not in the index"""
+        entry = self._entries.get(participation_id)
+        return None if entry is None else entry[0]
+
+    def _position(self, score):
+        return score - self._base + 1
+
+    def _resize(self, low, high):
+        """Cover scores low..high, with headroom so that growing scores rarely trigger a resize"""
+        self._base = min(low, 0)
+        size = 64
+        while size < high - self._base + 1:
+            size *= 2
+        self._tree = FenwickTree(size * 2)
+        for score, bucket in self._buckets.items():
+            self._tree.add(self._position(score), len(bucket))
+
+    def _ensure_range(self, score):
+        if score < self._base or self._position(score) > self._tree.size:
+            scores = list(self._buckets) + [score]
+            self._resize(min(scores), max(scores))
+
+    def update(self, participation_id, score, submitted):
+        """Insert a participant or move it to its new score and last submission time"""
+        with self._lock:
+            self._remove(participation_id)
+            self._ensure_range(score)
+            key = (_time_key(submitted), participation_id)
+            self._entries[participation_id] = (score, key)
+            bisect.insort(self._buckets.setdefault(score, []), key)
+            self._tree.add(self._position(score), 1)
+
+    def remove(self, participation_id):
+        with self._lock:
+            self._remove(participation_id)
+
+    def _remove(self, participation_id):
+        entry = self._entries.pop(participation_id, None)
+        if entry is None:
+            return
+        score, key = entry
+        bucket = self._buckets[score]
+        del bucket[bisect.bisect_left(bucket, key)]
+        if not bucket:
+            del self._buckets[score]
+        self._tree.add(self._position(score), -1)
+
+    def _above(self, score):
+        """Number of participants with a higher score"""
+        return len(self._entries) - self._tree.prefix(self._position(score))
+
+    def rank(self, participation_id):
+        """Rank of a participant, or None if it is not in the index"""
+        with self._lock:
+            entry = self._entries.get(participation_id)
+            if entry is None:
+                return None
+            score, key = entry
+            return self._above(score) + bisect.bisect_left(self._buckets[score], key) + 1
+
+    def _locate(self, rank):
+        """(score, offset in its bucket) of the participant at a rank"""
+        position = self._tree.lower_bound(len(self._entries) - rank + 1)
+        score = position + self._base - 1
+        return score, rank - self._above(score) - 1
+
+    def kth(self, rank):
+        """Participation id at a rank, or None if out of range"""
+        with self._lock:
+            if not 1 <= rank <= len(self._entries):
+                return None
+            score, offset = self._locate(rank)
+            return self._buckets[score][offset][1]
+
+    def slice(self, first_rank, last_rank):
+        """Participation ids ranked first_rank..last_rank, inclusive"""
+        with self._lock:
+            first_rank = max(first_rank, 1)
+            last_rank = min(last_rank, len(self._entries))
+            if first_rank > last_rank:
+                return []
+            ids = []
+            score, offset = self._locate(first_rank)
+            wanted = last_rank - first_rank + 1
+            while True:
+                bucket = self._buckets[score]
+                ids.extend(participation_id for _, participation_id in bucket[offset:offset + wanted - len(ids)])
+                if len(ids) >= wanted:
+                    return ids
+                # Next lower score that has participants
+                below = self._tree.prefix(self._position(score) - 1)
+                score = self._tree.lower_bound(below) + self._base - 1
+                offset = 0
+
+
+class _Slot:
+    def __init__(self):
+        self.index = None
+        self.watermark = None
+        self.built_at = self.synced_at = float('-inf')
+        self.building = False
+        self.lock = threading.Lock()
+
+
+_slots = OrderedDict()
+_slots_lock = threading.Lock()
+# One thread builds the indexes of all contests, one after the other
+_builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="standings-index")
+
+
+def _rows(queryset):
+    """(id, score, last submission time) rows and the latest ``updated_at`` among them"""
+    rows, watermark = [], None
+    for participation_id, score, submitted, updated_at in queryset.values_list(
+        'id', 'score', 'last_submission_time', 'updated_at'
+    ):
+        rows.append((participation_id, score, submitted))
+        if watermark is None or updated_at > watermark:
+            watermark = updated_at
+    return rows, watermark
+
+
+def _build(slot, contest_id):
+    """Build a slot's index and swap it in; the old one keeps serving reads until then"""
+    close_old_connections()
+    try:
+        rows, watermark = _rows(Participation.objects.filter(contest_id=contest_id))
+        index = StandingsIndex(rows)
+        with slot.lock:
+            slot.index, slot.watermark = index, watermark
+            slot.built_at = slot.synced_at = time.monotonic()
+    except Exception:
+        logger.exception("Building the standings index of contest %s failed", contest_id)
+    finally:
+        with slot.lock:
+            slot.building = False
+        close_old_connections()
+
+
+def _queue_build(slot, contest_id):
+    """Queue a build of a slot unless one is queued already; called with the slot's lock held"""
+    if not slot.building:
+        slot.building = True
+        _builder.submit(_build, slot, contest_id)
+
+
+def _sync(slot, contest_id):
+    """Apply rows changed since the last sync, re-reading a few seconds back for late commits"""
+    queryset = Participation.objects.filter(contest_id=contest_id)
+    if slot.watermark is not None:
+        queryset = queryset.filter(
+            updated_at__gte=slot.watermark - timedelta(seconds=settings.STANDINGS_INDEX_SYNC_OVERLAP_SECONDS)
+        )
+    rows, watermark = _rows(queryset)
+    for participation_id, score, submitted in rows:
+        slot.index.update(participation_id, score, submitted)
+    if watermark is not None and (slot.watermark is None or watermark > slot.watermark):
+        slot.watermark = watermark
+    slot.synced_at = time.monotonic()
+
+
+def _slot(contest_id):
+    with _slots_lock:
+        slot = _slots.get(contest_id)
+        if slot is None:
+            slot = _slots[contest_id] = _Slot()
+        _slots.move_to_end(contest_id)
+        while len(_slots) > settings.STANDINGS_INDEX_MAX_CONTESTS:
+            _slots.popitem(last=False)
+        return slot
+
+
+def get_index(contest_id):
+    """
+    The standings index of a contest, brought up to date as needed, or None
+    while its first build is still queued
+    """
+    slot = _slot(contest_id)
+    with slot.lock:
+        now = time.monotonic()
+        if now - slot.built_at > settings.STANDINGS_INDEX_REBUILD_SECONDS:
+            _queue_build(slot, contest_id)
+        if slot.index is not None and now - slot.synced_at > settings.STANDINGS_INDEX_SYNC_SECONDS:
+            _sync(slot, contest_id)
+        return slot.index
+
+
+def warm(contest_id):
+    """Queue the build of a contest's index if this process has none yet"""
+    slot = _slot(contest_id)
+    with slot.lock:
+        if slot.index is None:
+            _queue_build(slot, contest_id)
+
+
+def warm_running():
+    """Queue the builds of the indexes of running contests, up to STANDINGS_INDEX_MAX_CONTESTS of them"""
+    _builder.submit(_warm_running)
+
+
+def _warm_running():
+    close_old_connections()
+    try:
+        now = timezone.now()
+        contest_ids = list(
+            Contest.objects.filter(starting_time__lte=now, end_time__gte=now)
+            .order_by('end_time').values_list('id', flat=True)[:settings.STANDINGS_INDEX_MAX_CONTESTS]
+        )
+    except Exception:
+        logger.exception("Listing the running contests failed")
+        return
+    finally:
+        close_old_connections()
+    for contest_id in contest_ids:
+        warm(contest_id)
+
+
+def notify(contest_id, participation_id, score=None, submitted=None, removed=False):
+    """
+    Apply a scoring event, registration or unregistration of this process to
+    the contest's index once the surrounding transaction commits, queueing
+    the build of the index if there is none yet.
+    """
+    def apply():
+        slot = _slot(contest_id)
+        with slot.lock:
+            if slot.index is None:
+                # The build reads the committed change
+                _queue_build(slot, contest_id)
+                return
+        if removed:
+            slot.index.remove(participation_id)
+        else:
+            slot.index.update(participation_id, score, submitted)
+    transaction.on_commit(apply)
+
+
+def clear():
+    with _slots_lock:
+        _slots.clear()
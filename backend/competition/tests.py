@@ -1,3 +1,697 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from problem.models import Problem, RejudgeJob, Submission
+from problem.evaluation_queue import claim_next, enqueue, run_task
+from problem.rejudge import Rejudge
+
+from . import live, standings_index
+from .models import Contest, ContestGenre, ContestProblem, Participation, ProblemResult
+from .prewarm import ContestPrewarmer, get_bundle
+from .problemset import ProblemSetError, attach_problems, remove_problem, reorder_problems
+from .registration import register, register_users
+from .scoring import record_result, record_submission
+from .standings import leaderboard, rank_of
+
+
+class ScoringFixture:
+    """A running contest with two problems worth 100 and 50 points"""
+
+    def create_contest(self, users=1):
+        User = get_user_model()
+        self.creator = User.objects.create_user(username='creator', password='x')
+        self.contest = Contest.objects.create(
+            name="Scoring", description="", creator=self.creator,
+            starting_time=timezone.now() - timedelta(minutes=5), duration=timedelta(hours=1),
+        )
+        self.problems = []
+        for order, points in enumerate([100, 50], 1):
+            problem = Problem.objects.create(title=f"P{order}", question="?", answer="42", eval_type=1, creator=self.creator)
+            ContestProblem.objects.create(contest=self.contest, problem=problem, points=points, order=order)
+            self.problems.append(problem)
+        self.users = [User.objects.create_user(username=f"user{i}", password='x') for i in range(users)]
+        for user in self.users:
+            Participation.objects.create(user=user, contest=self.contest)
+
+    def evaluate(self, user, problem, status, score):
+        submission = Submission.objects.create(
+            user=user, problem=problem, contest=self.contest, content="42", score=score, evaluation_status=status
+        )
+        return record_result(submission)
+
+    def participation(self, user):
+        return Participation.objects.get(user=user, contest=self.contest)
+
+
+class ScoringTests(ScoringFixture, TestCase):
+    def setUp(self):
+        self.create_contest(users=2)
+
+    def test_awards_points_once_per_problem(self):
+        alice = self.users[0]
+        self.assertEqual(self.evaluate(alice, self.problems[0], 'Wrong', 30), 0)
+        self.assertEqual(self.evaluate(alice, self.problems[0], 'Correct', 85), 100)
+        self.assertEqual(self.evaluate(alice, self.problems[0], 'Correct', 95), 0)
+        self.assertEqual(self.participation(alice).score, 100)
+
+        result = ProblemResult.objects.get(participation__user=alice, problem=self.problems[0])
+        self.assertEqual((result.attempts, result.best_score, result.points), (3, 95, 100))
+        self.assertIsNotNone(result.solved_at)
+
+    def test_reevaluating_a_submission_awards_nothing(self):
+        alice = self.users[0]
+        submission = Submission.objects.create(
+            user=alice, problem=self.problems[1], contest=self.contest, content="42", score=90, evaluation_status='Correct'
+        )
+        self.assertEqual(record_result(submission), 50)
+        self.assertEqual(record_result(submission), 0)
+        self.assertEqual(self.participation(alice).score, 50)
+        result = ProblemResult.objects.get(participation__user=alice, problem=self.problems[1])
+        self.assertEqual(result.attempts, 1)
+
+    def test_any_order_of_evaluations_gives_the_same_totals(self):
+        """
+        Concurrent evaluations are serialized by the database; every order in
+        which they can commit, re-evaluations included, must give the same
+        result. Runs on every backend, unlike ScoringStressTests.
+        """
+        alice = self.users[0]
+        wrong, right = [
+            Submission.objects.create(
+                user=alice, problem=self.problems[0], contest=self.contest, content="42", score=score,
+                evaluation_status=status,
+            )
+            for score, status in [(30, 'Wrong'), (95, 'Correct')]
+        ]
+        for order in itertools.permutations([wrong, right, wrong, right]):
+            with transaction.atomic():
+                for submission in order:
+                    record_result(submission)
+                participation = self.participation(alice)
+                result = ProblemResult.objects.get(participation=participation, problem=self.problems[0])
+                self.assertEqual((participation.score, participation.rank), (100, 1))
+                self.assertEqual((result.attempts, result.best_score, result.points), (2, 95, 100))
+                self.assertEqual(result.solved_at, right.created_at)
+                transaction.set_rollback(True)
+
+    def test_tracks_submissions_and_ranks(self):
+        alice, bob = self.users
+        record_submission(self.participation(bob).id)
+        self.evaluate(bob, self.problems[1], 'Correct', 90)
+        self.assertEqual(self.participation(bob).rank, 1)
+
+        self.evaluate(alice, self.problems[0], 'Correct', 90)
+        alice_row, bob_row = self.participation(alice), self.participation(bob)
+        self.assertEqual((alice_row.rank, bob_row.rank), (1, 2))
+        self.assertEqual(bob_row.submissions_count, 1)
+        self.assertIsNotNone(alice_row.last_submission_time)
+
+
+class RejudgeScoringTests(ScoringFixture, TestCase):
+    def setUp(self):
+        self.create_contest(users=2)
+
+    def test_rejudge_updates_scores_and_ranks(self):
+        alice, bob = self.users
+        self.evaluate(alice, self.problems[0], 'Correct', 90)
+        self.evaluate(bob, self.problems[1], 'Correct', 90)
+        self.assertEqual((self.participation(alice).rank, self.participation(bob).rank), (1, 2))
+
+        # The corrected answer turns alice's solution wrong
+        verdicts = {alice.id: (10, "Wrong.", 'Wrong'), bob.id: (90, "Right.", 'Correct')}
+        job = RejudgeJob.objects.create(filters={'contest': self.contest.id})
+        with mock.patch('problem.rejudge.evaluate_submission', side_effect=lambda s: verdicts[s.user_id]):
+            Rejudge(job, concurrency=2, chunk_size=10, stop=threading.Event()).run()
+
+        alice_row, bob_row = self.participation(alice), self.participation(bob)
+        self.assertEqual((alice_row.score, alice_row.last_submission_time), (0, None))
+        self.assertEqual((bob_row.score, bob_row.rank, alice_row.rank), (50, 1, 2))
+        result = ProblemResult.objects.get(participation=alice_row, problem=self.problems[0])
+        self.assertEqual((result.attempts, result.best_score, result.points, result.solved_at), (1, 10, 0, None))
+
+
+class StandingsTests(ScoringFixture, TransactionTestCase):
+    def setUp(self):
+        standings_index.clear()
+        self.create_contest(users=4)
+        self.client = APIClient()
+
+    def tearDown(self):
+        standings_index.clear()
+
+    def solve(self, user, problem, submitted):
+        submission = Submission.objects.create(
+            user=user, problem=problem, contest=self.contest, content="42", score=90, evaluation_status='Correct'
+        )
+        Submission.objects.filter(pk=submission.pk).update(created_at=submitted)
+        submission.refresh_from_db()
+        record_result(submission)
+
+    def wait_for_index(self):
+        standings_index.warm(self.contest.id)
+        # Builds run one after the other on the builder thread
+        standings_index._builder.submit(int).result()
+
+    def standings(self):
+        self.wait_for_index()
+        return [(row['rank'], row['username'], row['score']) for row in leaderboard(self.contest.id, 1, 10)]
+
+    def test_ranks_follow_score_updates(self):
+        a, b, c, d = self.users
+        start = self.contest.starting_time
+        self.solve(b, self.problems[1], start + timedelta(minutes=1))
+        self.solve(a, self.problems[1], start + timedelta(minutes=2))
+        # Equal scores: the earlier last submission ranks first
+        self.assertEqual(self.standings()[:2], [(1, 'user1', 50), (2, 'user0', 50)])
+
+        self.solve(c, self.problems[0], start + timedelta(minutes=3))
+        self.solve(a, self.problems[0], start + timedelta(minutes=4))
+        self.assertEqual(self.standings(), [
+            (1, 'user0', 150), (2, 'user2', 100), (3, 'user1', 50), (4, 'user3', 0),
+        ])
+        stored = dict(Participation.objects.filter(contest=self.contest, rank__isnull=False).values_list('user__username', 'rank'))
+        self.assertEqual(stored, {'user0': 1, 'user2': 2, 'user1': 3})
+        self.assertEqual([rank_of(self.contest.id, user) for user in self.users], [1, 3, 2, 4])
+
+    def test_full_ties_rank_by_registration(self):
+        a, b, c, d = self.users
+        submitted = self.contest.starting_time + timedelta(minutes=1)
+        for user in (d, b):
+            self.solve(user, self.problems[0], submitted)
+        self.assertEqual(self.standings()[:2], [(1, 'user1', 100), (2, 'user3', 100)])
+        self.assertEqual([rank_of(self.contest.id, user) for user in (b, d)], [1, 2])
+
+    def test_around_me_window(self):
+        a, b, c, d = self.users
+        start = self.contest.starting_time
+        self.solve(c, self.problems[0], start + timedelta(minutes=1))
+        self.solve(b, self.problems[1], start + timedelta(minutes=2))
+        self.solve(a, self.problems[1], start + timedelta(minutes=3))
+
+        self.client.force_authenticate(b)
+        self.wait_for_index()
+        data = self.client.get(f"/contest/{self.contest.id}/leaderboard/me/?radius=1").json()
+        self.assertEqual((data['rank'], data['count']), (2, 4))
+        self.assertEqual([(row['rank'], row['username']) for row in data['results']], [(1, 'user2'), (2, 'user1'), (3, 'user0')])
+
+        # b moves to the top; the window follows
+        self.solve(b, self.problems[0], start + timedelta(minutes=4))
+        self.wait_for_index()
+        data = self.client.get(f"/contest/{self.contest.id}/leaderboard/me/?radius=1").json()
+        self.assertEqual(data['rank'], 1)
+        self.assertEqual([(row['rank'], row['username']) for row in data['results']], [(1, 'user1'), (2, 'user2')])
+
+    @override_settings(LIVE_STANDINGS_TOP=2)
+    def test_ticker_publishes_rows_leaving_the_top(self):
+        a, b, c, d = self.users
+        start = self.contest.starting_time
+        self.solve(a, self.problems[1], start + timedelta(minutes=1))
+        self.solve(b, self.problems[1], start + timedelta(minutes=2))
+        self.wait_for_index()
+        hub = mock.Mock()
+        ticker = live.StandingsTicker(hub)
+        ticker.tick(self.contest.id)
+        hub.dispatch.assert_not_called()
+
+        # c takes the lead and pushes b, listed since the first tick, out of the top two
+        self.solve(c, self.problems[0], start + timedelta(minutes=3))
+        self.wait_for_index()
+        ticker.tick(self.contest.id)
+        channel, event = hub.dispatch.call_args.args
+        self.assertEqual(channel, live.contest_channel(self.contest.id))
+        self.assertEqual(event['left_top'], [b.id])
+        self.assertEqual([(row['rank'], row['username']) for row in event['changed']], [(1, 'user2'), (2, 'user0')])
+        self.assertEqual(set(ticker._users[self.contest.id]), {self.participation(a).id, self.participation(c).id})
+
+    def test_registrants_rank_last_until_they_score(self):
+        a = self.users[0]
+        self.solve(a, self.problems[0], self.contest.starting_time + timedelta(minutes=1))
+        late = get_user_model().objects.create_user(username='late', password='x')
+        register(self.contest.id, late.id)
+        self.assertIsNone(self.participation(late).rank)
+
+        def check_endpoints():
+            self.client.force_authenticate(late)
+            data = self.client.get(f"/contest/{self.contest.id}/leaderboard/").json()
+            self.assertEqual(data['count'], 5)
+            self.assertEqual(
+                [(row['rank'], row['username']) for row in data['results']],
+                [(1, 'user0'), (2, 'user1'), (3, 'user2'), (4, 'user3'), (5, 'late')],
+            )
+            data = self.client.get(f"/contest/{self.contest.id}/leaderboard/me/?radius=1").json()
+            self.assertEqual((data['rank'], data['count']), (5, 5))
+            self.assertEqual([row['username'] for row in data['results']], ['user3', 'late'])
+
+        # From the stored ranks, before this process has built the index
+        standings_index.clear()
+        with mock.patch.object(standings_index._builder, 'submit'):
+            check_endpoints()
+        standings_index.clear()
+        self.wait_for_index()
+        check_endpoints()
+
+        # Scoring gives the registrant a stored rank
+        self.solve(late, self.problems[1], self.contest.starting_time + timedelta(minutes=2))
+        self.assertEqual((self.participation(late).rank, rank_of(self.contest.id, late)), (2, 2))
+
+
+class StandingsIndexBuildTests(ScoringFixture, TransactionTestCase):
+    def setUp(self):
+        standings_index.clear()
+        self.create_contest(users=3)
+
+    def tearDown(self):
+        standings_index.clear()
+
+    def test_reads_do_not_build_the_index(self):
+        a, b, c = self.users
+        self.evaluate(b, self.problems[0], 'Correct', 90)
+        standings_index.clear()
+        with mock.patch.object(standings_index._builder, 'submit') as submit:
+            # Answered from the stored ranks while the build is queued
+            self.assertIsNone(standings_index.get_index(self.contest.id))
+            self.assertEqual([row['username'] for row in leaderboard(self.contest.id, 1, 1)], ['user1'])
+            self.assertEqual(rank_of(self.contest.id, c), 3)
+        submit.assert_called_once()
+
+    def test_score_change_builds_the_index(self):
+        self.evaluate(self.users[1], self.problems[0], 'Correct', 90)
+        standings_index._builder.submit(int).result()
+        index = standings_index.get_index(self.contest.id)
+        self.assertEqual((len(index), index.kth(1)), (3, self.participation(self.users[1]).id))
+
+    def test_rebuild_keeps_serving_the_current_index(self):
+        self.evaluate(self.users[1], self.problems[0], 'Correct', 90)
+        standings_index._builder.submit(int).result()
+        index = standings_index.get_index(self.contest.id)
+        with self.settings(STANDINGS_INDEX_REBUILD_SECONDS=0), \
+                mock.patch.object(standings_index._builder, 'submit') as submit:
+            self.assertIs(standings_index.get_index(self.contest.id), index)
+        submit.assert_called_once()
+
+    def test_startup_builds_running_contests(self):
+        finished = Contest.objects.create(
+            name="Finished", description="", creator=self.creator,
+            starting_time=timezone.now() - timedelta(days=2), duration=timedelta(hours=1),
+        )
+        standings_index.warm_running()
+        # The first task lists the running contests and queues their builds
+        standings_index._builder.submit(int).result()
+        standings_index._builder.submit(int).result()
+        with mock.patch.object(standings_index._builder, 'submit'):
+            self.assertEqual(len(standings_index.get_index(self.contest.id)), 3)
+            self.assertIsNone(standings_index.get_index(finished.id))
+
+
+@override_settings(LIVE_BACKEND='memory')
+class LiveStreamTests(ScoringFixture, TransactionTestCase):
+    def setUp(self):
+        self.create_contest()
+        backend = mock.patch.object(live, '_backend', None)
+        backend.start()
+        self.addCleanup(backend.stop)
+
+    def submit_and_evaluate(self):
+        submission = Submission.objects.create(
+            user=self.users[0], problem=self.problems[0], contest=self.contest, content="42"
+        )
+        enqueue(submission)
+        run_task(claim_next('worker-1'))
+        return submission
+
+    async def test_websocket_receives_the_verdict(self):
+        user = self.users[0]
+        scope = {
+            'type': 'websocket', 'path': f"/contest/{self.contest.id}/live/",
+            'query_string': f"token={AccessToken.for_user(user)}".encode(), 'headers': [],
+        }
+        received, sent = asyncio.Queue(), asyncio.Queue()
+        await received.put({'type': 'websocket.connect'})
+        connection = asyncio.ensure_future(live.websocket_application(scope, received.get, sent.put))
+        self.assertEqual((await asyncio.wait_for(sent.get(), 5))['type'], 'websocket.accept')
+        while live.user_channel(user.id) not in live.get_hub().channels():
+            await asyncio.sleep(0.01)
+
+        submission = await sync_to_async(self.submit_and_evaluate)()
+        event = json.loads((await asyncio.wait_for(sent.get(), 5))['text'])
+        self.assertEqual(event, {
+            "type": "verdict", "submission_id": submission.id, "problem_id": self.problems[0].id,
+            "contest_id": self.contest.id, "evaluation_status": "Correct", "score": 100,
+        })
+
+        await received.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(connection, 5)
+        self.assertNotIn(live.user_channel(user.id), live.get_hub().channels())
+
+
+class ScoringStressTests(ScoringFixture, TransactionTestCase):
+    """
+    Concurrent evaluations. SQLite refuses a write to a table another
+    connection is using rather than waiting for it, so every step runs in a
+    transaction that is retried when the table is locked; databases with
+    row locking, such as PostgreSQL, wait instead and never retry.
+    """
+    threads = 8
+    rounds = 5
+
+    def setUp(self):
+        self.create_contest(users=4)
+
+    def atomic_step(self, step, *args):
+        for attempt in itertools.count():
+            try:
+                with transaction.atomic():
+                    return step(*args)
+            except OperationalError as e:
+                if 'locked' not in str(e) or attempt >= 500:
+                    raise
+            time.sleep(random.uniform(0, 0.005))
+
+    def test_concurrent_submissions_keep_exact_totals(self):
+        barrier = threading.Barrier(self.threads)
+        errors = []
+
+        def submit(worker):
+            try:
+                barrier.wait()
+                for i in range(self.rounds):
+                    user = self.users[(worker + i) % len(self.users)]
+                    self.atomic_step(lambda: record_submission(self.participation(user).id))
+                    self.atomic_step(
+                        self.evaluate, user, self.problems[i % 2], 'Correct' if (worker + i) % 3 else 'Wrong', 90
+                    )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                close_old_connections()
+
+        workers = [threading.Thread(target=submit, args=(n,)) for n in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+
+        for participation in Participation.objects.filter(contest=self.contest):
+            awarded = sum(ProblemResult.objects.filter(participation=participation).values_list('points', flat=True))
+            self.assertEqual(participation.score, awarded)
+        self.assertEqual(
+            sum(Participation.objects.filter(contest=self.contest).values_list('submissions_count', flat=True)),
+            self.threads * self.rounds,
+        )
+        self.assertEqual(
+            sorted(Participation.objects.filter(contest=self.contest).values_list('rank', flat=True)),
+            list(range(1, len(self.users) + 1)),
+        )
+
+
+class ContestContextTests(ScoringFixture, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_contest()
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def test_cached_problem_fetch_costs_no_query(self):
+        url = f"/contest/{self.contest.id}/problems/2/"
+        self.assertEqual(self.client.get(url).json()['title'], "P2")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_unchanged_problem_answers_not_modified(self):
+        url = f"/contest/{self.contest.id}/problems/1/"
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.problems[0].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_contest_list_etag_follows_rows(self):
+        url = "/contest/list/active/"
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.contest.name = "Renamed"
+        self.contest.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_problem_edit_invalidates_manifest(self):
+        url = f"/contest/{self.contest.id}/problems/1/"
+        self.client.get(url)
+        self.problems[0].title = "Renamed"
+        self.problems[0].save()
+        self.assertEqual(self.client.get(url).json()['title'], "Renamed")
+
+
+    def test_participant_set_follows_registrations(self):
+        url = f"/contest/{self.contest.id}/problems/1/"
+        self.assertEqual(self.client.get(url).status_code, 200)
+        Participation.objects.filter(user=self.users[0], contest=self.contest).delete()
+        self.assertEqual(self.client.get(url).status_code, 403)
+        Participation.objects.create(user=self.users[0], contest=self.contest)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_problem_bundle(self):
+        url = f"/contest/{self.contest.id}/problems/bundle/"
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        problems = json.loads(gzip.decompress(response.content))['problems']
+        self.assertEqual([(p['order'], p['title'], p['points']) for p in problems], [(1, "P1", 100), (2, "P2", 50)])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertNotEqual(plain['ETag'], response['ETag'])
+        self.assertEqual(len(json.loads(plain.content)['problems']), 2)
+
+        self.problems[1].title = "Renamed"
+        self.problems[1].save()
+        self.assertEqual(json.loads(self.client.get(url).content)['problems'][1]['title'], "Renamed")
+
+    def test_problem_bundle_requires_registration(self):
+        outsider = get_user_model().objects.create_user(username='outsider', password='x')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(f"/contest/{self.contest.id}/problems/bundle/").status_code, 403)
+
+    def test_prewarm_renders_contests_about_to_start(self):
+        upcoming = Contest.objects.create(
+            name="Soon", description="", creator=self.creator,
+            starting_time=timezone.now() + timedelta(seconds=30), duration=timedelta(hours=1),
+        )
+        self.assertEqual(ContestPrewarmer().run_once(), [upcoming.id])
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(get_bundle(upcoming.id))
+
+
+class RegistrationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.creator = User.objects.create_user(username='creator', password='x')
+        self.users = [User.objects.create_user(username=f"user{i}", password='x') for i in range(3)]
+        self.contest = Contest.objects.create(
+            name="Upcoming", description="", creator=self.creator,
+            starting_time=timezone.now() + timedelta(days=1), duration=timedelta(hours=1),
+        )
+        self.client = APIClient()
+
+    def test_registration_is_idempotent(self):
+        self.client.force_authenticate(self.users[0])
+        url = f"/contest/register/{self.contest.id}/"
+        self.assertEqual(self.client.post(url).status_code, 201)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(Participation.objects.filter(contest=self.contest, user=self.users[0]).count(), 1)
+
+    def test_bulk_registration(self):
+        Participation.objects.create(user=self.users[0], contest=self.contest)
+        self.client.force_authenticate(self.creator)
+        url = f"/contest/register/bulk/{self.contest.id}/"
+        response = self.client.post(url, {"usernames": ["user0", "user1", "user2", "user1", "nobody"]}, format='json')
+        self.assertEqual(response.json(), {"registered": 2, "already_registered": 1, "unknown": ["nobody"]})
+        self.assertEqual(Participation.objects.filter(contest=self.contest).count(), 3)
+
+        self.assertEqual(register_users(self.contest.id, [user.id for user in self.users], batch_size=2), 0)
+
+    def test_bulk_registration_is_for_the_creator(self):
+        self.client.force_authenticate(self.users[0])
+        response = self.client.post(
+            f"/contest/register/bulk/{self.contest.id}/", {"user_ids": [self.users[1].id]}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class ProblemSetTests(ScoringFixture, TestCase):
+    def setUp(self):
+        self.create_contest()
+
+    def test_removal_keeps_order_dense(self):
+        problem = Problem.objects.create(title="P3", question="?", answer="42", eval_type=1, creator=self.creator)
+        ContestProblem.objects.create(contest=self.contest, problem=problem, order=3)
+        remove_problem(ContestProblem.objects.get(contest=self.contest, order=1))
+        self.assertEqual(
+            list(ContestProblem.objects.filter(contest=self.contest).values_list('problem__title', 'order')),
+            [("P2", 1), ("P3", 2)],
+        )
+
+    def test_attach_appends_and_places_problems(self):
+        extra = [
+            Problem.objects.create(title=f"X{i}", question="?", answer="42", eval_type=1, creator=self.creator)
+            for i in range(2)
+        ]
+        order = attach_problems(self.contest.id, [
+            (extra[0].id, 10, None),
+            (extra[1].id, None, 1),
+            (self.problems[0].id, 300, None),
+        ])
+        self.assertEqual(order, [extra[1].id, self.problems[0].id, self.problems[1].id, extra[0].id])
+        rows = {row.problem_id: row for row in ContestProblem.objects.filter(contest=self.contest)}
+        self.assertEqual([rows[problem_id].order for problem_id in order], [1, 2, 3, 4])
+        self.assertEqual((rows[extra[0].id].points, rows[extra[1].id].points, rows[self.problems[0].id].points), (10, 100, 300))
+
+    def test_attach_rejects_unknown_problems(self):
+        with self.assertRaises(ProblemSetError):
+            attach_problems(self.contest.id, [(self.problems[0].id, 1, None), (10 ** 6, None, None)])
+        self.assertEqual(ContestProblem.objects.get(contest=self.contest, problem=self.problems[0]).points, 100)
+
+    def test_reorder_requires_every_problem(self):
+        with self.assertRaises(ProblemSetError):
+            reorder_problems(self.contest.id, [self.problems[1].id])
+        reorder_problems(self.contest.id, [self.problems[1].id, self.problems[0].id])
+        self.assertEqual(
+            list(ContestProblem.objects.filter(contest=self.contest).values_list('problem_id', flat=True)),
+            [self.problems[1].id, self.problems[0].id],
+        )
+
+
+class ContestStatusTests(TestCase):
+    def test_end_time_follows_start_and_duration(self):
+        creator = get_user_model().objects.create_user(username='creator', password='x')
+        now = timezone.now()
+        contests = {
+            name: Contest.objects.create(name=name, description="", creator=creator, starting_time=now + offset, duration=timedelta(hours=1))
+            for name, offset in [('future', timedelta(hours=1)), ('active', timedelta(minutes=-30)), ('completed', timedelta(hours=-2))]
+        }
+        contest = contests['active']
+        contest.duration = timedelta(minutes=10)
+        contest.save(update_fields=['duration'])
+        contest.refresh_from_db()
+        self.assertEqual(contest.end_time, contest.starting_time + timedelta(minutes=10))
+
+        client = APIClient()
+        client.force_authenticate(creator)
+        data = client.get('/contest/list/status/').json()
+        self.assertEqual(
+            {name: [row['name'] for row in rows] for name, rows in data.items()},
+            {'future': ['future'], 'active': [], 'completed': ['active', 'completed']},
+        )
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints must cost the same number of queries however many rows they return"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='creator', password='x')
+        self.genres = [ContestGenre.objects.create(name=name) for name in ("graphs", "math")]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_contests(self, count):
+        now = timezone.now()
+        for offset in [timedelta(hours=1), timedelta(minutes=-30), timedelta(hours=-2)]:
+            for _ in range(count):
+                contest = Contest.objects.create(
+                    name="C", description="", creator=self.user, starting_time=now + offset, duration=timedelta(hours=1)
+                )
+                contest.genres.set(self.genres)
+
+    def query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, url, add_rows):
+        add_rows(2)
+        few = self.query_count(url)
+        add_rows(5)
+        self.assertEqual(self.query_count(url), few)
+
+    def test_future_contests(self):
+        self.assert_constant_queries("/contest/list/future/", self.add_contests)
+
+    def test_active_contests(self):
+        self.assert_constant_queries("/contest/list/active/", self.add_contests)
+
+    def test_completed_contests(self):
+        self.assert_constant_queries("/contest/list/completed/", self.add_contests)
+
+    def test_contests_by_status(self):
+        self.assert_constant_queries("/contest/list/status/", self.add_contests)
+
+    def test_contest_problems(self):
+        contest = Contest.objects.create(
+            name="C", description="", creator=self.user,
+            starting_time=timezone.now() - timedelta(minutes=5), duration=timedelta(hours=1),
+        )
+        Participation.objects.create(user=self.user, contest=contest)
+
+        def add_problems(count):
+            for _ in range(count):
+                problem = Problem.objects.create(title="P", question="?", answer="42", eval_type=1, creator=self.user)
+                with self.captureOnCommitCallbacks(execute=True):
+                    attach_problems(contest.id, [(problem.id, None, None)])
+
+        url = f"/contest/problems/list/{contest.id}/"
+        # Loads the contest's participant set, which later requests reuse
+        self.client.get(url)
+        self.assert_constant_queries(url, add_problems)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='creator', password='x')
+        start = timezone.now() + timedelta(days=1)
+        # Pairs of contests share a starting time, so pages must break ties on id
+        self.contests = [
+            Contest.objects.create(name=f"C{i}", description="", creator=self.user, starting_time=start + timedelta(hours=i // 2))
+            for i in range(7)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursors_walk_every_row_once(self):
+        seen, url = [], "/contest/list/future/?page_size=3"
+        while url:
+            data = self.client.get(url).json()
+            self.assertNotIn('count', data)
+            seen += [row['id'] for row in data['results']]
+            last, url = data, data['next']
+        expected = [contest.id for contest in sorted(self.contests, key=lambda c: (c.starting_time, c.id), reverse=True)]
+        self.assertEqual(seen, expected)
+
+        previous = self.client.get(last['previous']).json()
+        self.assertEqual([row['id'] for row in previous['results']], expected[3:6])
+
+    def test_page_numbers_and_counts_still_work(self):
+        data = self.client.get("/contest/list/future/?page=2&page_size=5").json()
+        self.assertEqual((data['count'], len(data['results'])), (7, 2))
+        self.assertEqual(self.client.get("/contest/list/future/?count=true").json()['count'], 7)
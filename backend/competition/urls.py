@@ -5,14 +5,21 @@ from .views import (
     ContestCreateView, 
     ContestDeleteView, 
     ContestRegistrationView,
+    ContestBulkRegistrationView,
     ContestUnregisterView,
     FutureContestsView, 
+    ContestStatusView,
     ContestProblemsView, 
     AddProblemsToContestView, 
     RemoveProblemFromContestView, 
+    ReorderContestProblemsView,
     ContestDetailView,
     ContestProblemByOrderView,
+    ContestProblemBundleView,
     ContestProblemSubmitView,
+    ContestLeaderboardView,
+    ContestLeaderboardAroundMeView,
+    ContestLiveView,
     # ContestProblemSubmissionsView
 )
 
@@ -24,14 +31,22 @@ urlpatterns = [
     path('list/future/', FutureContestsView.as_view(), name='future-contests'),
     path('list/completed/', CompletedContestsView.as_view(), name='past-contests'),
     path('list/active/', ActiveContestsView.as_view(), name='ongoing-contests'),
+    path('list/status/', ContestStatusView.as_view(), name='contests-by-status'),
 
     path('problems/list/<int:pk>/',ContestProblemsView.as_view(), name='contest-problems'),
     path('problems/add/<int:pk>/',AddProblemsToContestView.as_view(), name='add-problems'),
+    path('problems/reorder/<int:pk>/',ReorderContestProblemsView.as_view(), name='reorder-problems'),
     path('problems/remove/<int:contest_id>/<int:problem_id>/',RemoveProblemFromContestView.as_view(), name='remove-problems'),
+    path('<int:pk>/problems/bundle/', ContestProblemBundleView.as_view(), name='contest-problem-bundle'),
     path('<int:contest_id>/problems/<int:order>/', ContestProblemByOrderView.as_view(), name='contest-problem-by-order'),
     path('<int:contest_id>/problems/<int:order>/submit/', ContestProblemSubmitView.as_view(), name='contest-problem-submit'),
 
+    path('<int:pk>/leaderboard/', ContestLeaderboardView.as_view(), name='contest-leaderboard'),
+    path('<int:pk>/leaderboard/me/', ContestLeaderboardAroundMeView.as_view(), name='contest-leaderboard-me'),
+    path('<int:pk>/live/', ContestLiveView.as_view(), name='contest-live'),
+
     path('register/<int:pk>/', ContestRegistrationView.as_view(), name='register-contest'),
+    path('register/bulk/<int:pk>/', ContestBulkRegistrationView.as_view(), name='bulk-register-contest'),
     path('unregister/<int:pk>/', ContestUnregisterView.as_view(), name='unregister-contest'),
     # path('problems/submissions/<int:problem_id>/', ContestProblemSubmissionsView.as_view(), name='contest-problem-submissions'),
 ]
\ No newline at end of file
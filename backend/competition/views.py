@@ -1,4 +1,7 @@
 from django.shortcuts import get_object_or_404
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
 
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
@@ -6,22 +9,43 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
 
 from .serializers import ContestSerializer
 from problem.serializers import ProblemSerializer, SubmissionSerializer
 from problem.models import Problem, Submission
+from problem.conditional import ConditionalListMixin, conditional_response, make_etag
+from problem.pagination import KeysetPagination
 
 from .models import Contest, ContestGenre, Participation, ContestProblem
+from .standings import leaderboard, participant_count, rank_of
+from .live import open_stream, sse_stream
+from .context import get_contest_context, load_contest
+from .prewarm import get_bundle
+from .registration import RegistrationError, parse_registrants, register, register_users
+from .listing import ContestListMixin, contest_rows, contest_values
+from .problemset import (
+    ProblemSetError,
+    attach_problems,
+    parse_problem_entries,
+    remove_problem,
+    reorder_problems,
+)
 
 from django.utils import timezone
-from django.db.models import F, ExpressionWrapper, DateTimeField
 from datetime import timedelta
 
 import logging
-from problem.llm_evaluation import llm_evaluate
+import re
+from django.db import transaction
+from problem.evaluation_queue import enqueue
+from problem.throttling import SubmissionThrottle, evaluation_delay, submission_buckets
+from .scoring import record_submission
 
 logger = logging.getLogger(__name__)
 
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
 class ContestCreateView(APIView):
     """
     API endpoint for creating a new contest
@@ -155,15 +179,31 @@ class ContestDeleteView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ContestPagination(PageNumberPagination):
+class ContestPagination(KeysetPagination):
     """
-    Custom pagination class for contests
+    Custom pagination class for contests: cursors on each listing's
+    ordering, or page numbers for clients that still send ?page=
     """
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class FutureContestsView(ListAPIView):
+def future_contests(now):
+    """Contests that have not started yet, latest start first"""
+    return Contest.objects.filter(starting_time__gt=now).order_by('-starting_time', '-id')
+
+
+def active_contests(now):
+    """Contests that have started but not ended yet, latest end first"""
+    return Contest.objects.filter(starting_time__lte=now, end_time__gte=now).order_by('-end_time', '-id')
+
+
+def completed_contests(now):
+    """Contests that have ended, most recent first"""
+    return Contest.objects.filter(end_time__lt=now).order_by('-end_time', '-id')
+
+
+class FutureContestsView(ConditionalListMixin, ContestListMixin, ListAPIView):
     """
     API endpoint for retrieving all future contests
     (contests that have not started yet),
@@ -172,15 +212,12 @@ class FutureContestsView(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ContestSerializer
     pagination_class = ContestPagination
+    ordering = ('-starting_time', '-id')
 
     def get_queryset(self):
-        now = timezone.now()
-        # Get all future contests
-        return Contest.objects.filter(
-            starting_time__gt=now  # Contest has not started yet
-        ).order_by('-starting_time')  # Sort by starting time in decreasing order
+        return future_contests(timezone.now())
 
-class ActiveContestsView(ListAPIView):
+class ActiveContestsView(ConditionalListMixin, ContestListMixin, ListAPIView):
     """
     API endpoint for retrieving active contests
     (contests that have started but not ended yet),
@@ -189,23 +226,13 @@ class ActiveContestsView(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ContestSerializer
     pagination_class = ContestPagination
+    ordering = ('-end_time', '-id')
 
     def get_queryset(self):
-        now = timezone.now()
-        print(now)
-        # Use database functions to add duration directly to starting_time
-        return Contest.objects.annotate(
-            end_time=ExpressionWrapper(
-                F('starting_time') + F('duration'),
-                output_field=DateTimeField()
-            )
-        ).filter(
-            starting_time__lte=now,  # Contest has started
-            end_time__gte=now        # Contest has not ended
-        ).order_by('-end_time')  # Sort by ending time in decreasing order
+        return active_contests(timezone.now())
 
 
-class CompletedContestsView(ListAPIView):
+class CompletedContestsView(ConditionalListMixin, ContestListMixin, ListAPIView):
     """
     API endpoint for retrieving completed contests
     (contests that have ended), sorted by end time (most recent first).
@@ -213,21 +240,57 @@ class CompletedContestsView(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ContestSerializer
     pagination_class = ContestPagination
+    ordering = ('-end_time', '-id')
 
     def get_queryset(self):
+        return completed_contests(timezone.now())
+
+
+class ContestStatusView(APIView):
+    """
+    API endpoint for the first contests of every status in one request
+
+    Method: GET
+
+    Query Parameters:
+    - limit: Contests returned per status (default 10, at most 100)
+
+    Example Response:
+    {
+        "future": [{"id": 9, "name": "...", ...}, ...],
+        "active": [...],
+        "completed": [...]
+    }
+
+    The lists are ordered like the future, active and completed listings,
+    which page further through each status.
+
+    Returns:
+    - 200 OK: Contests by status
+    - 400 Bad Request: Invalid limit
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 10
+    max_limit = 100
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"detail": "limit must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The same instant for all three, so no contest appears twice or falls between lists
         now = timezone.now()
-        # Use the same approach for completed contests
-        return Contest.objects.annotate(
-            end_time=ExpressionWrapper(
-                F('starting_time') + F('duration'),
-                output_field=DateTimeField()
-            )
-        ).filter(
-            end_time__lt=now  # Contest has ended
-        ).order_by('-end_time')  # Sort by end time, most recent first
-        
-        # logger.info(f'Found {queryset.count()} completed contests')
-        # return queryset
+        return Response({
+            name: contest_rows(contest_values(queryset)[:limit])
+            for name, queryset in [
+                ('future', future_contests(now)),
+                ('active', active_contests(now)),
+                ('completed', completed_contests(now)),
+            ]
+        })
 
 class ContestRegistrationView(APIView):
     """
@@ -238,52 +301,95 @@ class ContestRegistrationView(APIView):
     URL Parameter:
     - pk: Contest ID
     
+    Registering is idempotent: repeated or concurrent requests all succeed.
+
     Returns:
-    - 201 Created: Successfully registered for the contest
-    - 400 Bad Request: Registration failed (already registered or invalid contest)
+    - 201 Created: Registered for the contest (now or before)
     - 403 Forbidden: Contest registration not allowed (e.g. contest already started)
     - 404 Not Found: Contest with provided ID doesn't exist
     """
     permission_classes = [IsAuthenticated]
     
     def post(self, request, pk):
-        # Get the contest or return 404 if not found
-        contest = get_object_or_404(Contest, pk=pk)
+        # The cached contest context spares a query
+        cached = load_contest(pk)
+        if cached is None:
+            raise Http404("No Contest matches the given query.")
+        contest, _ = cached
         
         # Check if the contest has already started
-        now = timezone.now()
-        if contest.starting_time <= now:
+        if contest.starting_time <= timezone.now():
             return Response(
                 {"detail": "Cannot register for a contest that has already started."},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Check if user is already registered
-        if Participation.objects.filter(user=request.user, contest=contest).exists():
-            return Response(
-                {"detail": "You are already registered for this contest."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Create the participation record
-        try:
-            Participation.objects.create(
-                user=request.user,
-                contest=contest
-            )
+        register(contest.id, request.user.pk)
+        return Response(
+            {"detail": f"Registered for contest: {contest.name}"},
+            status=status.HTTP_201_CREATED
+        )
+
+class ContestBulkRegistrationView(APIView):
+    """
+    API endpoint for registering many users for a contest at once.
+    Only the creator of the contest can use it, before the contest starts.
+
+    Method: POST
+
+    URL Parameter:
+    - pk: Contest ID
+
+    Expected Input JSON, either:
+    {
+        "user_ids": [4, 7, 12]
+    }
+    or:
+    {
+        "usernames": ["alice", "bob"]
+    }
+
+    Users already registered are skipped.
+
+    Returns:
+    - 200 OK: {"registered": <newly registered>, "already_registered": <count>, "unknown": [<unmatched entries>]}
+    - 400 Bad Request: Invalid list, or contest already started
+    - 403 Forbidden: User is not the creator of the contest
+    - 404 Not Found: Contest with provided ID doesn't exist
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        contest = get_object_or_404(Contest, pk=pk)
+        if contest.creator != request.user:
             return Response(
-                {"detail": f"Successfully registered for contest: {contest.name}"},
-                status=status.HTTP_201_CREATED
+                {"detail": "You do not have permission to register users for this contest."},
+                status=status.HTTP_403_FORBIDDEN
             )
-        except Exception as e:
+        if contest.starting_time <= timezone.now():
             return Response(
-                {"detail": f"Registration failed: {str(e)}"},
+                {"detail": "Cannot register users for a contest that has already started."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        try:
+            user_ids, unknown = parse_registrants(request.data)
+        except RegistrationError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        added = register_users(contest.id, user_ids)
+        return Response(
+            {"registered": added, "already_registered": len(user_ids) - added, "unknown": unknown},
+            status=status.HTTP_200_OK
+        )
+
 class ContestProblemPagination(PageNumberPagination):
     """
-    Custom pagination class for contest problems
+    Custom pagination class for contest problems.
+
+    Stays page-numbered rather than keyset (see problem/pagination.py): the
+    pages are slices of the cached contest manifest, so there is no COUNT
+    or OFFSET query to avoid.
     """
     page_size = 10
     page_size_query_param = 'page_size'
@@ -300,29 +406,27 @@ class ContestProblemsView(ListAPIView):
     pagination_class = ContestProblemPagination
 
     def get_queryset(self):
-        # Get the contest ID from the URL
-        contest_id = self.kwargs.get('pk')
-        contest = get_object_or_404(Contest, pk=contest_id)
-        
-        # Check if the user is registered for this contest
-        is_registered = Participation.objects.filter(user=self.request.user, contest=contest).exists()
-        if not is_registered:
-            return Problem.objects.none()  # Return empty queryset if user is not registered
-        
-        # Check if the contest has started
-        now = timezone.now()
-        if contest.starting_time > now:
-            return Problem.objects.none()  # Return empty queryset if contest hasn't started
-        
-        # Filter problems for the given contest
-        return ContestProblem.objects.filter(contest_id=contest_id).order_by('order').values_list('problem', flat=True)
+        context = get_contest_context(self.request, self.kwargs.get('pk'))
+
+        # Problems are only shown to registered users once the contest has started
+        if not context.is_registered or not context.has_started:
+            return []
+        return context.problems()
 
     def list(self, request, *args, **kwargs):
-        # Get the queryset of problem IDs
-        problem_ids = self.get_queryset()
-        # Fetch the actual Problem objects
-        queryset = Problem.objects.filter(id__in=problem_ids)
-        # Paginate the queryset
+        queryset = self.get_queryset()
+        return conditional_response(request, self.manifest_etag(request), lambda: self.build_response(queryset))
+
+    def manifest_etag(self, request):
+        # Built from the cached manifest, so it costs no extra query
+        context = get_contest_context(request, self.kwargs.get('pk'))
+        if not context.is_registered or not context.has_started:
+            return None
+        return make_etag(request, [
+            (contest_problem.updated_at, contest_problem.problem.updated_at) for contest_problem in context.manifest
+        ])
+
+    def build_response(self, queryset):
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -334,6 +438,29 @@ class AddProblemsToContestView(APIView):
     """
     API endpoint for adding problems to a contest.
     Problems can only be added if the contest has not yet started.
+
+    Method: POST
+
+    Expected Input JSON, either:
+    {
+        "problem_ids": [4, 7]
+    }
+    or, with optional points (default 100) and position per problem:
+    {
+        "problems": [
+            {"problem_id": 4, "points": 200},
+            {"problem_id": 7, "order": 1}
+        ]
+    }
+
+    All problems are validated first and attached in one transaction.
+    Problems already in the contest keep their place unless an order is
+    given, and get the new points if any.
+
+    Returns:
+    - 200 OK: Problems attached; "problem_ids" lists the contest's problems in order
+    - 400 Bad Request: Invalid input, unknown problem or contest already started
+    - 403 Forbidden: User is not the creator of the contest
     """
     permission_classes = [IsAuthenticated]
 
@@ -356,35 +483,66 @@ class AddProblemsToContestView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get the list of problem IDs from the request data
-        problem_ids = request.data.get('problem_ids', [])
-        if not isinstance(problem_ids, list) or not problem_ids:
+        try:
+            entries = parse_problem_entries(request.data)
+            problem_ids = attach_problems(contest.id, entries)
+        except ProblemSetError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            {
+                "detail": f"Successfully added problems to contest: {contest.name}",
+                "added_problems": [problem_id for problem_id, _, _ in entries],
+                "problem_ids": problem_ids,
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class ReorderContestProblemsView(APIView):
+    """
+    API endpoint for reordering all problems of a contest at once.
+    Problems can only be reordered if the contest has not yet started.
+
+    Method: POST
+
+    Expected Input JSON:
+    {
+        "problem_ids": [7, 4, 9]  # Every problem of the contest, in the new order
+    }
+
+    Returns:
+    - 200 OK: Problems reordered
+    - 400 Bad Request: The list is not a permutation of the contest's problems, or contest already started
+    - 403 Forbidden: User is not the creator of the contest
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        contest = get_object_or_404(Contest, pk=pk)
+        if contest.creator != request.user:
             return Response(
-                {"detail": "A list of problem IDs is required."},
+                {"detail": "You do not have permission to modify this contest."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if contest.starting_time <= timezone.now():
+            return Response(
+                {"detail": "You cannot reorder problems of a contest that has already started."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Add problems to the contest
-        added_problems = []
-        for problem_id in problem_ids:
-            problem = Problem.objects.filter(id=problem_id).first()
-            if not problem:
-                return Response(
-                    {"detail": f"Problem with ID {problem_id} does not exist."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            # Create or update the ContestProblem entry
-            contest_problem, created = ContestProblem.objects.get_or_create(
-                contest=contest,
-                problem=problem,
-                defaults={'points': 100, 'order': ContestProblem.objects.filter(contest=contest).count() + 1}
+        problem_ids = request.data.get('problem_ids')
+        if not isinstance(problem_ids, list) or not all(isinstance(problem_id, int) for problem_id in problem_ids):
+            return Response(
+                {"detail": "problem_ids must be a list of problem IDs."},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            added_problems.append(problem.id)
+        try:
+            reorder_problems(contest.id, problem_ids)
+        except ProblemSetError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(
-            {"detail": f"Successfully added problems to contest: {contest.name}", "added_problems": added_problems},
-            status=status.HTTP_200_OK
-        )
+        return Response({"problem_ids": problem_ids}, status=status.HTTP_200_OK)
     
 class RemoveProblemFromContestView(APIView):
     """
@@ -442,8 +600,8 @@ class RemoveProblemFromContestView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Delete the ContestProblem entry
-        contest_problem.delete()
+        # Delete the ContestProblem entry and close the gap in the numbering
+        remove_problem(contest_problem)
 
         return Response(
             {"detail": f"Problem with ID {problem_id} has been removed from contest '{contest.name}'."},
@@ -460,24 +618,25 @@ class ContestDetailView(APIView):
     - pk: Contest ID
     
     Returns:
-    - 200 OK: Contest details
+    - 200 OK: Contest details, with an ETag
+    - 304 Not Modified: Unchanged since the ETag in If-None-Match
     - 404 Not Found: Contest with provided ID doesn't exist
     """
     permission_classes = [IsAuthenticated]
     
     def get(self, request, pk):
         # Get the contest or return 404 if not found
-        contest = get_object_or_404(Contest, pk=pk)
-        
-        # Check if the user is registered for this contest
-        is_registered = Participation.objects.filter(user=request.user, contest=contest).exists()
-        
+        context = get_contest_context(request, pk)
+        etag = make_etag(request, context.contest.updated_at, context.is_registered)
+        return conditional_response(request, etag, lambda: self.build_response(context))
+
+    def build_response(self, context):
         # Serialize the contest data
-        serializer = ContestSerializer(contest)
+        serializer = ContestSerializer(context.contest)
         data = serializer.data
         
         # Add registration status to the response
-        data['is_registered'] = is_registered
+        data['is_registered'] = context.is_registered
         
         return Response(data)
 
@@ -534,64 +693,96 @@ class ContestProblemByOrderView(APIView):
     - order: Problem order number (1-based)
     
     Returns:
-    - 200 OK: Problem details
+    - 200 OK: Problem details, with an ETag
+    - 304 Not Modified: Unchanged since the ETag in If-None-Match
     - 404 Not Found: Problem not found or user not registered
     """
     permission_classes = [IsAuthenticated]
     
     def get(self, request, contest_id, order):
         # Get the contest or return 404 if not found
-        contest = get_object_or_404(Contest, pk=contest_id)
+        context = get_contest_context(request, contest_id)
         
         # Check if user is registered
-        if not Participation.objects.filter(user=request.user, contest=contest).exists():
+        if not context.is_registered:
             return Response(
                 {"detail": "You must be registered for this contest to view problems."},
                 status=status.HTTP_403_FORBIDDEN
             )
         
         # Check if the contest has started
-        now = timezone.now()
-        if contest.starting_time > now:
+        if not context.has_started:
             return Response(
                 {"detail": "Contest has not started yet."},
                 status=status.HTTP_403_FORBIDDEN
             )
         
         # Get the problem by its order
-        contest_problem = ContestProblem.objects.filter(
-            contest=contest
-        ).order_by('order').first()
-
-        if not contest_problem:
-            return Response(
-                {"detail": "Problem not found."},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Get all problems to determine the current problem's order
-        contest_problems = ContestProblem.objects.filter(contest=contest).order_by('order')
-        problem_list = list(contest_problems)
-        current_problem = None
-        
-        # Find the problem with the specified order
-        for i, cp in enumerate(problem_list, 1):
-            if i == order:
-                current_problem = cp
-                break
-        
+        current_problem = context.problem(order)
         if not current_problem:
             return Response(
                 {"detail": "Problem not found."},
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        etag = make_etag(request, current_problem.updated_at, current_problem.problem.updated_at)
+        return conditional_response(request, etag, lambda: self.build_response(current_problem))
+
+    def build_response(self, current_problem):
         # Serialize the problem
         serializer = ProblemSerializer(current_problem.problem)
         data = serializer.data
-        data['order'] = order  # Add the order number to the response
+        data['order'] = current_problem.order  # Add the order number to the response
         return Response(data)
 
+class ContestProblemBundleView(APIView):
+    """
+    API endpoint for retrieving every problem of a contest in one request,
+    as pre-rendered by competition/prewarm.py
+
+    Method: GET
+
+    URL Parameters:
+    - pk: Contest ID
+
+    Returns:
+    - 200 OK: {"contest_id": ..., "problems": [...]}, each problem as returned by
+      ContestProblemByOrderView plus its points; gzip-encoded if the client accepts it
+    - 304 Not Modified: Unchanged since the ETag in If-None-Match
+    - 403 Forbidden: User not registered, or contest not started yet
+    - 404 Not Found: Contest not found
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        context = get_contest_context(request, pk)
+        if not context.is_registered:
+            return Response(
+                {"detail": "You must be registered for this contest to view problems."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if not context.has_started:
+            return Response(
+                {"detail": "Contest has not started yet."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        bundle = get_bundle(pk)
+        if bundle is None:
+            raise Http404("No Contest matches the given query.")
+        compressed = bool(ACCEPTS_GZIP.search(request.headers.get('Accept-Encoding', '')))
+        etag = make_etag(request, bundle.version, compressed)
+        response = conditional_response(request, etag, lambda: self.build_response(bundle, compressed))
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+    def build_response(self, bundle, compressed):
+        if not compressed:
+            return HttpResponse(bundle.content, content_type='application/json')
+        response = HttpResponse(bundle.compressed, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+        return response
+
 class ContestProblemSubmitView(APIView):
     """
     API endpoint for submitting an answer to a contest problem
@@ -605,90 +796,228 @@ class ContestProblemSubmitView(APIView):
     Request Body:
     - answer: The submitted answer
     
+    The answer is evaluated asynchronously; poll /problem/submission/<submission_id>/
+    for the verdict. Submissions are rate limited per participant and
+    problem, and per participant over the contest (see problem/throttling.py).
+    
     Returns:
-    - 200 OK: Submission successful
+    - 202 Accepted: Submission queued for evaluation
     - 403 Forbidden: User not registered or contest not active
     - 404 Not Found: Problem not found
+    - 429 Too Many Requests: Rate limited or evaluations overloaded; retry after the Retry-After header
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [SubmissionThrottle]
+
+    def submission_buckets(self, request):
+        context = get_contest_context(request, self.kwargs['contest_id'])
+        current_problem = context.problem(self.kwargs['order'])
+        # Refusals below take no tokens
+        if not context.is_registered or not context.is_active or not current_problem:
+            return []
+        return submission_buckets(request.user.pk, current_problem.problem, context.contest, current_problem)
     
     def post(self, request, contest_id, order):
         # Get the contest or return 404 if not found
-        contest = get_object_or_404(Contest, pk=contest_id)
+        context = get_contest_context(request, contest_id)
         
         # Check if user is registered
-        participation = Participation.objects.filter(user=request.user, contest=contest).first()
-        if not participation:
+        if not context.is_registered:
             return Response(
                 {"detail": "You must be registered for this contest to submit answers."},
                 status=status.HTTP_403_FORBIDDEN
             )
         
         # Check if the contest is active
-        now = timezone.now()
-        if contest.starting_time > now:
+        if not context.has_started:
             return Response(
                 {"detail": "Contest has not started yet."},
                 status=status.HTTP_403_FORBIDDEN
             )
-        
-        # Use the duration field directly without converting to minutes
-        contest_end = contest.starting_time + contest.duration
-        if now > contest_end:
+        if context.has_ended:
             return Response(
                 {"detail": "Contest has ended."},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Get all problems to determine the current problem's order
-        contest_problems = ContestProblem.objects.filter(contest=contest).order_by('order')
-        problem_list = list(contest_problems)
-        current_problem = None
-        
-        # Find the problem with the specified order
-        for i, cp in enumerate(problem_list, 1):
-            if i == order:
-                current_problem = cp
-                break
-        
+        # Get the problem by its order
+        current_problem = context.problem(order)
         if not current_problem:
             return Response(
                 {"detail": "Problem not found."},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Get the problem and compare answers
-        current_problem = problem_list[order - 1].problem
+        # Store the submission and queue it for evaluation; points are
+        # awarded by the evaluator once the answer has been scored
         submitted_answer = request.data.get('answer', '').strip()
-        
-        # Get LLM evaluation
-        score, remarks = llm_evaluate(
-            current_problem.question,
-            current_problem.answer,
-            submitted_answer
-        )
-        
-        # Determine if the answer is correct based on score threshold
-        is_correct = score >= 80  # You can adjust this threshold
-        
-        # Create submission record
-        submission = Submission.objects.create(
-            user=request.user,
-            problem=current_problem,
-            content=submitted_answer,
-            evaluation_status='Correct' if is_correct else 'Wrong',
-            score=score,
-            remarks=remarks
-        )
-        
-        # Update participation stats if correct
-        if is_correct:
-            participation.score += problem_list[order - 1].points
-            participation.save()
-        
+        with transaction.atomic():
+            submission = Submission.objects.create(
+                user=request.user,
+                problem=current_problem.problem,
+                contest_id=contest_id,
+                content=submitted_answer,
+            )
+            record_submission(context.participation_id)
+            enqueue(submission, delay=evaluation_delay())
+
         return Response({
-            "correct": is_correct,
-            "points_awarded": problem_list[order - 1].points if is_correct else 0,
-            "score": score,
-            "remarks": remarks
-        })
\ No newline at end of file
+            "submission_id": submission.id,
+            "evaluation_status": submission.evaluation_status,
+            "points": current_problem.points,
+        }, status=status.HTTP_202_ACCEPTED)
+
+class ContestLeaderboardView(APIView):
+    """
+    API endpoint for the standings of a contest
+
+    Method: GET
+
+    URL Parameter:
+    - pk: Contest ID
+
+    Query Parameters:
+    - page: Page number (default 1)
+    - page_size: Participants per page (default 50, at most 200)
+
+    Ranks come from the contest's in-memory standings index (see
+    competition/standings_index.py), so deep pages cost the same as the first.
+
+    Example Response:
+    {
+        "count": 1250,
+        "next": "http://.../contest/3/leaderboard/?page=2",
+        "previous": null,
+        "results": [
+            {"rank": 1, "user_id": 7, "username": "alice", "score": 300,
+             "last_submission_time": "2025-04-15T09:41:12Z", "submissions_count": 4},
+            ...
+        ]
+    }
+
+    Returns:
+    - 200 OK: Page of the standings
+    - 400 Bad Request: Invalid page or page_size
+    - 404 Not Found: Contest with provided ID doesn't exist
+    """
+    permission_classes = [IsAuthenticated]
+    default_page_size = 50
+    max_page_size = 200
+
+    def get(self, request, pk):
+        get_object_or_404(Contest, pk=pk)
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = min(int(request.query_params.get('page_size', self.default_page_size)), self.max_page_size)
+        except ValueError:
+            return Response({"detail": "page and page_size must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if page < 1 or page_size < 1:
+            return Response({"detail": "page and page_size must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+
+        count = participant_count(pk)
+        first_rank = (page - 1) * page_size + 1
+        url = request.build_absolute_uri()
+        return Response({
+            "count": count,
+            "next": replace_query_param(url, 'page', page + 1) if first_rank + page_size <= count else None,
+            "previous": replace_query_param(url, 'page', page - 1) if page > 1 else None,
+            "results": leaderboard(pk, first_rank, first_rank + page_size - 1),
+        })
+
+
+class ContestLeaderboardAroundMeView(APIView):
+    """
+    API endpoint for the part of the standings around the requesting user
+
+    Method: GET
+
+    URL Parameter:
+    - pk: Contest ID
+
+    Query Parameters:
+    - radius: Participants shown above and below the user (default 10, at most 100)
+
+    Example Response:
+    {
+        "rank": 42,
+        "count": 1250,
+        "results": [{"rank": 32, ...}, ..., {"rank": 52, ...}]
+    }
+
+    Returns:
+    - 200 OK: The user's rank and the surrounding rows
+    - 400 Bad Request: Invalid radius
+    - 404 Not Found: Contest doesn't exist or the user is not registered for it
+    """
+    permission_classes = [IsAuthenticated]
+    default_radius = 10
+    max_radius = 100
+
+    def get(self, request, pk):
+        get_object_or_404(Contest, pk=pk)
+        try:
+            radius = min(int(request.query_params.get('radius', self.default_radius)), self.max_radius)
+        except ValueError:
+            return Response({"detail": "radius must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if radius < 0:
+            return Response({"detail": "radius must not be negative."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rank = rank_of(pk, request.user)
+        if rank is None:
+            return Response(
+                {"detail": "You are not registered for this contest."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({
+            "rank": rank,
+            "count": participant_count(pk),
+            "results": leaderboard(pk, max(1, rank - radius), rank + radius),
+        })
+
+
+class ContestLiveView(View):
+    """
+    Server-sent event stream of a contest
+
+    Method: GET
+
+    URL Parameter:
+    - pk: Contest ID
+
+    Query Parameters:
+    - token: JWT access token, for clients that cannot send the
+      Authorization header (e.g. the browser's EventSource)
+
+    Events:
+    - standings: {"type": "standings", "changed": [{"rank": 3, "user_id": 7,
+      "username": "alice", "score": 300}, ...], "left_top": [12]}
+      Rows of the top LIVE_STANDINGS_TOP that changed, coalesced every
+      LIVE_STANDINGS_INTERVAL seconds
+    - verdict: {"type": "verdict", "submission_id": 81, "problem_id": 5,
+      "contest_id": 3, "evaluation_status": "Correct", "score": 92.0}
+      Results of the requesting user's own submissions
+    - lagged: events were dropped; refetch the leaderboard
+
+    The same events are sent as JSON messages to WebSocket clients of the
+    same path (see competition/live.py). Needs the ASGI server.
+
+    Returns:
+    - 200 OK: The event stream
+    - 401 Unauthorized: Missing or invalid token
+    - 404 Not Found: Contest with provided ID doesn't exist
+    """
+
+    async def get(self, request, pk):
+        token = request.GET.get('token')
+        header = request.headers.get('Authorization', '')
+        if not token and header.startswith('Bearer '):
+            token = header[len('Bearer '):]
+        user, refusal = await open_stream(token, pk)
+        if user is None:
+            detail = "Authentication credentials were not provided or are invalid." if refusal == 401 else "Not found."
+            return JsonResponse({"detail": detail}, status=refusal)
+
+        response = StreamingHttpResponse(sse_stream(pk, user.id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
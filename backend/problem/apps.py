@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProblemConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "problem"
+
+    def ready(self):
+        from . import evaluation_cache, judge, signals, vector_scorer  # noqa: F401
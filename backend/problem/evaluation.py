@@ -0,0 +1,32 @@
+from django.conf import settings
+
+from .evaluation_tiers import run_pipeline
+from .judge import judge
+
+
+def evaluate_submission(submission):
+    """
+    Evaluate a submission against the answer of its problem.
+
+    Returns a (score, remarks, evaluation_status) tuple. The remarks name the
+    evaluation tier that decided the result; code problems with test cases
+    are run by the judge instead. Problems marked for manual
+    evaluation (eval_type 2), or whose tiers are all inconclusive, keep the
+    'Unknown' status.
+    """
+    problem = submission.problem
+
+    if problem.eval_type == 2:
+        return 0, "This problem is not evaluated automatically.", 'Unknown'
+
+    if problem.eval_type == 0 and problem.test_cases.exists():
+        verdict = judge(problem, submission.content)
+        return (100 if verdict.accepted else 0), f"[judge] {verdict.remarks()}", 'Correct' if verdict.accepted else 'Wrong'
+
+    result = run_pipeline(problem, submission.content)
+    if result is None:
+        return 0, "No evaluation tier could decide on this answer; it will be reviewed manually.", 'Unknown'
+
+    score, remarks, tier = result
+    evaluation_status = 'Correct' if score >= settings.EVALUATION_PASS_SCORE else 'Wrong'
+    return score, f"[{tier}] {remarks}", evaluation_status
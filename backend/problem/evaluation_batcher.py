@@ -0,0 +1,111 @@
+"""
+Micro-batching of LLM evaluations.
+
+Evaluations of the same problem (same question and reference answer) that
+arrive within EVALUATION_BATCH_WINDOW seconds of each other are grouped and
+scored with a single model call, up to EVALUATION_BATCH_MAX_SIZE answers per
+call. Callers keep the ``llm_evaluate`` contract through
+``batched_llm_evaluate``, which blocks until its own answer's result is in.
+
+Batches only form when several evaluations run concurrently in the same
+process, e.g. with EVALUATION_WORKERS evaluator threads.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+
+from .llm_evaluation import llm_evaluate, llm_evaluate_batch
+
+
+class _Group:
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.items = []
+
+
+class EvaluationBatcher:
+    """
+    Groups answers by (question, correct_answer) and hands each group to
+    ``evaluate_batch(question, correct_answer, answers)`` once it is full or
+    its window has passed.
+    """
+
+    def __init__(self, evaluate_batch, window, max_size, max_workers):
+        self.window = window
+        self.max_size = max_size
+        self._evaluate_batch = evaluate_batch
+        self._groups = {}
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="evaluation-batch")
+        self._flusher = None
+
+    def submit(self, question, correct_answer, submitted_answer):
+        """Queue an answer for evaluation; returns a Future of its (score, remarks)"""
+        future = Future()
+        key = (question, correct_answer)
+        with self._cond:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="evaluation-batcher", daemon=True)
+                self._flusher.start()
+
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _Group(time.monotonic() + self.window)
+            group.items.append((submitted_answer, future))
+
+            if len(group.items) >= self.max_size:
+                del self._groups[key]
+                self._dispatch(key, group.items)
+            elif len(group.items) == 1:
+                self._cond.notify()
+        return future
+
+    def _flush_loop(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                for key in [key for key, group in self._groups.items() if group.deadline <= now]:
+                    self._dispatch(key, self._groups.pop(key).items)
+                timeout = min((group.deadline for group in self._groups.values()), default=None)
+                self._cond.wait(None if timeout is None else timeout - now)
+
+    def _dispatch(self, key, items):
+        self._executor.submit(self._run_batch, key, items)
+
+    def _run_batch(self, key, items):
+        question, correct_answer = key
+        try:
+            results = self._evaluate_batch(question, correct_answer, [answer for answer, _ in items])
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(items, results):
+            future.set_result(result)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = EvaluationBatcher(
+                    evaluate_batch=llm_evaluate_batch,
+                    window=settings.EVALUATION_BATCH_WINDOW,
+                    max_size=settings.EVALUATION_BATCH_MAX_SIZE,
+                    max_workers=settings.LLM_MAX_CONCURRENCY,
+                )
+    return _batcher
+
+
+def batched_llm_evaluate(question, correct_answer, submitted_answer):
+    """Same contract as ``llm_evaluate``, but may share a model call with concurrent evaluations"""
+    if settings.EVALUATION_BATCH_MAX_SIZE <= 1:
+        return llm_evaluate(question, correct_answer, submitted_answer)
+    return get_batcher().submit(question, correct_answer, submitted_answer).result()
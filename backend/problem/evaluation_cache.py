@@ -0,0 +1,208 @@
+"""
+Content-addressed cache of evaluation results.
+
+Results are keyed by the problem, a hash of its reference answer and a hash
+of the normalized submitted answer, so identical (or trivially different)
+answers to the same problem are only sent to the model once. Lookups go
+through a bounded in-process LRU tier first and the EvaluationCacheEntry
+table second. Because the reference answer is part of the key, editing
+``Problem.answer`` makes the old entries unreachable; they are also deleted
+when the problem is saved.
+
+Misses are single-flighted (see problem/single_flight.py): concurrent
+evaluations of the same key, in this process or in other worker processes,
+wait for one shared evaluation instead of each calling the model.
+"""
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import EvaluationCacheEntry, Problem
+from .single_flight import SingleFlight, acquire_lease, release_lease
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize_for_cache(text):
+    """
+    Lowercase, drop punctuation and collapse whitespace.
+
+    Punctuation touching a digit is kept, so "-5" and "5" or "3.14" and
+    "314" do not collapse into the same key.
+    """
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    chars = []
+    for i, ch in enumerate(text):
+        if unicodedata.category(ch).startswith('P'):
+            before = text[i - 1] if i > 0 else ''
+            after = text[i + 1] if i + 1 < len(text) else ''
+            if not (before.isdigit() or after.isdigit()):
+                ch = ' '
+        chars.append(ch)
+    return _whitespace.sub(' ', ''.join(chars)).strip()
+
+
+def digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def cache_key(problem, submitted_answer):
+    """(problem id, reference answer hash, normalized submitted answer hash)"""
+    return (problem.id, digest(problem.answer), digest(normalize_for_cache(submitted_answer)))
+
+
+class LRUCache:
+    """A small thread-safe LRU mapping"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_memory = LRUCache(settings.EVALUATION_CACHE_SIZE)
+_flight = SingleFlight()
+_stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'coalesced': 0, 'lease_waits': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def cache_stats():
+    """
+    Counters of this process: hits and misses, evaluations shared with a
+    concurrent caller ('coalesced') and polls for an evaluation running in
+    another process ('lease_waits'), plus the current size of the LRU tier.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['memory_size'] = len(_memory)
+    stats['in_flight'] = _flight.in_flight()
+    return stats
+
+
+def _find(key):
+    """Return (result, tier) for a key, with tier 'memory' or 'db', or (None, None)"""
+    result = _memory.get(key)
+    if result is not None:
+        return result, 'memory'
+
+    problem_id, answer_hash, submission_hash = key
+    entry = EvaluationCacheEntry.objects.filter(
+        problem_id=problem_id, answer_hash=answer_hash, submission_hash=submission_hash
+    ).values_list('score', 'remarks').first()
+    if entry is not None:
+        _memory.put(key, entry)
+        return entry, 'db'
+    return None, None
+
+
+def lookup(key):
+    """Return the cached (score, remarks) for a key, or None"""
+    result, tier = _find(key)
+    _count(f'{tier}_hits' if tier else 'misses')
+    return result
+
+
+def store(key, score, remarks):
+    problem_id, answer_hash, submission_hash = key
+    try:
+        with transaction.atomic():
+            EvaluationCacheEntry.objects.create(
+                problem_id=problem_id,
+                answer_hash=answer_hash,
+                submission_hash=submission_hash,
+                score=score,
+                remarks=remarks,
+            )
+    except IntegrityError:
+        # Another worker stored the same answer first
+        pass
+    _memory.put(key, (score, remarks))
+
+
+def cached_evaluate(problem, submitted_answer, evaluate):
+    """
+    Return the (score, remarks) for an answer, calling ``evaluate()`` only on a cache miss.
+    """
+    key = cache_key(problem, submitted_answer)
+    result = lookup(key)
+    if result is not None:
+        return result
+
+    result, shared = _flight.do(key, lambda: _evaluate_once(key, evaluate))
+    if shared:
+        _count('coalesced')
+    return result
+
+
+def _evaluate_once(key, evaluate):
+    """Evaluate a missing key under its cross-process lease, or wait for the process holding it"""
+    while True:
+        owner = acquire_lease(key)
+        # The holder may have stored the result just before releasing its lease
+        result, _ = _find(key)
+        if result is not None:
+            if owner:
+                release_lease(key, owner)
+            return result
+        if owner:
+            break
+        _count('lease_waits')
+        time.sleep(settings.EVALUATION_SINGLE_FLIGHT_POLL)
+
+    try:
+        score, remarks = evaluate()
+        store(key, score, remarks)
+        return score, remarks
+    finally:
+        release_lease(key, owner)
+
+
+@receiver(post_save, sender=Problem)
+def invalidate_problem_entries(sender, instance, created, **kwargs):
+    """Drop cached results that were computed against a previous reference answer"""
+    if created:
+        return
+    answer_hash = digest(instance.answer)
+    EvaluationCacheEntry.objects.filter(problem_id=instance.id).exclude(answer_hash=answer_hash).delete()
+    _memory.discard_where(lambda key: key[0] == instance.id and key[1] != answer_hash)
@@ -0,0 +1,194 @@
+"""
+Database-backed evaluation queue.
+
+Submissions are stored with the 'Unknown' status and an EvaluationTask row.
+A pool of evaluator workers (see the ``run_evaluators`` management command)
+claims tasks with an atomic conditional update, so several worker processes
+can drain the same queue without an external broker. A claimed task holds a
+lease; if its worker dies, the task becomes claimable again once the lease
+expires.
+"""
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .evaluation import evaluate_submission
+from .llm_client import EvaluationDeferred
+from .models import EvaluationTask, Submission
+from .signals import submission_evaluated
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(submission, delay=None):
+    """Queue a saved submission for evaluation, optionally after a delay"""
+    available_at = timezone.now()
+    if delay:
+        available_at += delay
+    return EvaluationTask.objects.create(submission=submission, available_at=available_at)
+
+
+def _claimable(now):
+    return Q(status='Pending', available_at__lte=now) | Q(status='Running', locked_until__lt=now)
+
+
+def claim_next(worker_id):
+    """
+    Claim the oldest available task for the given worker.
+
+    Returns the claimed task, or None if the queue is empty.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=settings.EVALUATION_LEASE_SECONDS)
+
+    candidates = list(
+        EvaluationTask.objects.filter(_claimable(now))
+        .order_by('available_at', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for task_id in candidates:
+        # Only one worker can win the conditional update for a given task
+        claimed = EvaluationTask.objects.filter(_claimable(now), pk=task_id).update(
+            status='Running',
+            locked_by=worker_id,
+            locked_until=now + lease,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return EvaluationTask.objects.select_related('submission__problem').get(pk=task_id)
+    return None
+
+
+def run_task(task):
+    """Evaluate the submission of a claimed task and store the result"""
+    submission = task.submission
+    try:
+        score, remarks, evaluation_status = evaluate_submission(submission)
+    except EvaluationDeferred as e:
+        logger.info("Deferring evaluation of submission %s: %s", submission.id, e)
+        _defer(task, e)
+        return False
+    except Exception as e:
+        logger.exception("Evaluation of submission %s failed", submission.id)
+        _fail(task, e)
+        return False
+
+    with transaction.atomic():
+        # Another worker may have taken over the task after our lease expired
+        finished = EvaluationTask.objects.filter(
+            pk=task.pk, status='Running', locked_by=task.locked_by
+        ).update(status='Done', locked_until=None, last_error='')
+        if not finished:
+            logger.warning("Lost the lease on evaluation task %s", task.pk)
+            return False
+
+        Submission.objects.filter(pk=submission.pk).update(
+            score=score, remarks=remarks, evaluation_status=evaluation_status
+        )
+        submission.score = score
+        submission.remarks = remarks
+        submission.evaluation_status = evaluation_status
+        submission_evaluated.send(sender=Submission, submission=submission)
+    return True
+
+
+def _defer(task, deferred):
+    """Put a task back in the queue without counting the attempt, e.g. while the model provider is down"""
+    with transaction.atomic():
+        EvaluationTask.objects.filter(pk=task.pk, locked_by=task.locked_by).update(
+            status='Pending',
+            available_at=timezone.now() + timedelta(seconds=deferred.retry_after),
+            attempts=F('attempts') - 1,
+            locked_by='',
+            locked_until=None,
+            last_error=str(deferred),
+        )
+        Submission.objects.filter(pk=task.submission_id).update(
+            remarks="Evaluation deferred: the evaluation service is temporarily unavailable."
+        )
+
+
+def _fail(task, error):
+    """Schedule a retry for a failed task, or give up after too many attempts"""
+    if task.attempts >= settings.EVALUATION_MAX_ATTEMPTS:
+        with transaction.atomic():
+            EvaluationTask.objects.filter(pk=task.pk, locked_by=task.locked_by).update(
+                status='Failed', locked_until=None, last_error=str(error)
+            )
+            Submission.objects.filter(pk=task.submission_id).update(
+                remarks="Automatic evaluation failed. The submission will be reviewed manually."
+            )
+        return
+
+    retry_at = timezone.now() + timedelta(seconds=settings.EVALUATION_RETRY_DELAY * task.attempts)
+    EvaluationTask.objects.filter(pk=task.pk, locked_by=task.locked_by).update(
+        status='Pending', available_at=retry_at, locked_by='', locked_until=None, last_error=str(error)
+    )
+
+
+class EvaluatorPool:
+    """
+    A pool of worker threads draining the evaluation queue.
+
+    Each thread uses its own database connection. With ``drain=True`` the
+    workers exit as soon as the queue is empty instead of polling for more.
+    """
+
+    def __init__(self, workers=None, poll_interval=None, drain=False):
+        self.workers = workers or settings.EVALUATION_WORKERS
+        self.poll_interval = poll_interval if poll_interval is not None else settings.EVALUATION_POLL_INTERVAL
+        self.drain = drain
+        self._stop = threading.Event()
+        self._threads = []
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, args=(f"{self._prefix}:{i}",), name=f"evaluator-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def is_alive(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _work(self, worker_id):
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                task = claim_next(worker_id)
+                if task is None:
+                    if self.drain:
+                        break
+                    self._stop.wait(self.poll_interval)
+                    continue
+                try:
+                    run_task(task)
+                except Exception:
+                    # The task stays leased and is retried once the lease expires
+                    logger.exception("Storing the result of evaluation task %s failed", task.pk)
+        finally:
+            connection.close()
+
+
+def backlog_count():
+    """Number of tasks a worker could claim now or is evaluating; deferred tasks are not counted"""
+    now = timezone.now()
+    return EvaluationTask.objects.filter(
+        Q(status='Pending', available_at__lte=now) | Q(status='Running')
+    ).count()
@@ -0,0 +1,201 @@
+"""
+Tiered evaluation pipeline.
+
+A submission is passed through a list of tiers, cheapest first. Each tier
+either returns a conclusive (score, remarks) or None to escalate to the next
+tier, so the LLM is only called when the deterministic checks cannot decide.
+
+The tiers and their thresholds are configured per problem through
+``Problem.evaluation_config``, e.g.::
+
+    {
+        "tiers": ["exact", "numeric", "llm"],
+        "numeric_abs_tolerance": 0.01,
+        "numeric_rel_tolerance": 0,
+        "similarity_accept": 0.9,
+        "similarity_reject": 0.1,
+        "semantic_accept": 0.9,
+        "semantic_reject": 0.05,
+        "semantic_fallback": true
+    }
+
+Missing keys fall back to EVALUATION_TIERS and the defaults below.
+"""
+import re
+from difflib import SequenceMatcher
+
+from django.conf import settings
+
+from . import vector_scorer
+from .evaluation_batcher import batched_llm_evaluate
+from .evaluation_cache import cached_evaluate, normalize_for_cache
+from .llm_client import EvaluationDeferred
+
+DEFAULT_OPTIONS = {
+    "numeric_abs_tolerance": 1e-9,
+    "numeric_rel_tolerance": 1e-6,
+    "similarity_accept": 0.9,
+    "similarity_reject": None,
+    "semantic_accept": 0.9,
+    "semantic_reject": None,
+    "semantic_fallback": False,
+}
+
+_number = re.compile(r"^[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?$")
+
+
+class Tier:
+    name = None
+
+    def evaluate(self, problem, answer, options):
+        """Return a (score, remarks) tuple, or None if the tier cannot decide"""
+        raise NotImplementedError
+
+
+class ExactMatchTier(Tier):
+    """Accepts answers equal to the reference after normalizing whitespace, case and punctuation"""
+    name = "exact"
+
+    def evaluate(self, problem, answer, options):
+        if normalize_for_cache(answer) == normalize_for_cache(problem.answer):
+            return 100, "The answer matches the reference answer."
+        return None
+
+
+def parse_number(text):
+    text = (text or '').strip().replace(',', '').replace('_', '')
+    if text.endswith('%'):
+        text = text[:-1].strip()
+    if not _number.match(text):
+        return None
+    return float(text)
+
+
+class NumericTier(Tier):
+    """Compares numeric answers with an absolute and relative tolerance"""
+    name = "numeric"
+
+    def evaluate(self, problem, answer, options):
+        expected = parse_number(problem.answer)
+        given = parse_number(answer)
+        if expected is None or given is None:
+            return None
+        tolerance = max(options["numeric_abs_tolerance"], options["numeric_rel_tolerance"] * abs(expected))
+        if abs(given - expected) <= tolerance:
+            return 100, "The numeric answer is within tolerance of the reference value."
+        return 0, "The numeric answer does not match the reference value."
+
+
+def similarities(reference, answer):
+    """Token-set (Jaccard) similarity and edit-distance ratio of two answers, each in [0, 1]"""
+    reference = normalize_for_cache(reference)
+    answer = normalize_for_cache(answer)
+    if not reference or not answer:
+        return 0.0, 0.0
+    expected_tokens = set(reference.split())
+    given_tokens = set(answer.split())
+    jaccard = len(expected_tokens & given_tokens) / len(expected_tokens | given_tokens)
+    return jaccard, SequenceMatcher(None, reference, answer).ratio()
+
+
+class SimilarityTier(Tier):
+    """
+    Accepts near-identical answers and, if configured, rejects clearly
+    unrelated ones. Both measures must agree: "X is not Y" is close to
+    "X is Y" by edit distance but not by token set.
+    """
+    name = "similarity"
+
+    def evaluate(self, problem, answer, options):
+        jaccard, ratio = similarities(problem.answer, answer)
+        if min(jaccard, ratio) >= options["similarity_accept"]:
+            value = min(jaccard, ratio)
+            return round(100 * value), f"The answer is {value:.0%} similar to the reference answer."
+        reject = options["similarity_reject"]
+        if reject is not None and max(jaccard, ratio) <= reject:
+            value = max(jaccard, ratio)
+            return 0, f"The answer is only {value:.0%} similar to the reference answer."
+        return None
+
+
+class SemanticTier(Tier):
+    """
+    Scores text problems (eval_type 1) by cosine similarity of hashed n-gram
+    vectors (see problem/vector_scorer.py). Confident matches are accepted,
+    confident mismatches rejected if configured, anything else escalates.
+    """
+    name = "semantic"
+
+    def evaluate(self, problem, answer, options):
+        if problem.eval_type != 1:
+            return None
+        value = vector_scorer.score(problem, answer)
+        if value >= options["semantic_accept"]:
+            return round(100 * value), f"The answer is semantically close ({value:.2f}) to the reference answer."
+        reject = options["semantic_reject"]
+        if reject is not None and value <= reject:
+            return 0, f"The answer is semantically unrelated ({value:.2f}) to the reference answer."
+        return None
+
+
+class LLMTier(Tier):
+    """
+    Scores the answer with the language model (cached and batched). With
+    the ``semantic_fallback`` option, text problems are scored by the local
+    vector scorer while the model provider is unavailable instead of being
+    deferred.
+    """
+    name = "llm"
+
+    def evaluate(self, problem, answer, options):
+        try:
+            return cached_evaluate(
+                problem,
+                answer,
+                lambda: batched_llm_evaluate(problem.title + "\n" + problem.question, problem.answer, answer)
+            )
+        except EvaluationDeferred:
+            if not options["semantic_fallback"] or problem.eval_type != 1:
+                raise
+            value = max(vector_scorer.score(problem, answer), 0)
+            return round(100 * value), (
+                f"Scored offline by semantic similarity ({value:.2f}) while the evaluation service was unavailable."
+            )
+
+
+TIERS = {
+    tier.name: tier
+    for tier in (ExactMatchTier(), NumericTier(), SimilarityTier(), SemanticTier(), LLMTier())
+}
+
+
+def get_pipeline(problem):
+    """The tiers and options configured for a problem"""
+    config = problem.evaluation_config or {}
+    names = config.get("tiers") or settings.EVALUATION_TIERS
+    options = {key: config.get(key, default) for key, default in DEFAULT_OPTIONS.items()}
+    return [TIERS[name] for name in names], options
+
+
+def uses_vector_scorer(problem):
+    """Whether evaluating answers to the problem may call the vector scorer"""
+    if problem.eval_type != 1:
+        return False
+    tiers, options = get_pipeline(problem)
+    return TIERS["semantic"] in tiers or (TIERS["llm"] in tiers and options["semantic_fallback"])
+
+
+def run_pipeline(problem, answer):
+    """
+    Run the problem's tiers in order.
+
+    Returns (score, remarks, tier name) from the first conclusive tier, or
+    None if every tier escalated.
+    """
+    tiers, options = get_pipeline(problem)
+    for tier in tiers:
+        result = tier.evaluate(problem, answer, options)
+        if result is not None:
+            score, remarks = result
+            return score, remarks, tier.name
+    return None
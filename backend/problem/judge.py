@@ -0,0 +1,361 @@
+"""
+Code judge for code problems (eval_type 0).
+
+Submissions are Python 3 programs reading standard input and writing
+standard output. Each test case runs in its own interpreter process with
+POSIX resource limits (CPU time, address space, file size, open files,
+processes) and a wall-clock timeout, in a fresh session so the whole
+process group can be killed.
+
+No containers are needed. Before the program starts, the launcher moves it
+into a private mount namespace where every JUDGE_HIDDEN_PATHS directory
+(the project tree with its settings and database, and JUDGE_DATA_ROOT with
+the expected outputs) is covered by an empty read-only file system. When
+the judge runs as root, the program also runs as JUDGE_SANDBOX_USER;
+otherwise the namespace is created inside a user namespace. Programs run with the
+JUDGE_PYTHON interpreter, which the sandbox user must be able to run. If the
+namespace cannot be set up the submission is not run and ``SandboxError``
+is raised, so evaluation is retried later.
+
+The program starts in an empty directory and only gets its input as
+standard input and its output files as open descriptors. Expected outputs
+are opened by the judge process alone, which compares them after the
+program has exited.
+
+Test cases run in parallel, up to JUDGE_WORKERS processes at a time, and
+judging stops at the first failing case.
+
+Test case files are passed to the program as its standard input and its
+output is written to a file, which is then compared with the expected
+output line by line through memory maps, so neither is ever held in memory
+as a whole. Submissions are compiled once per distinct source through the
+artifact cache in problem/judge_cache.py.
+"""
+import mmap
+import os
+import pwd
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import zip_longest
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .judge_cache import CompilationFailed, get_artifact
+from .models import ProblemTestCase, get_judge_storage
+
+ACCEPTED = 'Accepted'
+WRONG_ANSWER = 'Wrong Answer'
+TIME_LIMIT_EXCEEDED = 'Time Limit Exceeded'
+MEMORY_LIMIT_EXCEEDED = 'Memory Limit Exceeded'
+RUNTIME_ERROR = 'Runtime Error'
+COMPILATION_ERROR = 'Compilation Error'
+
+# Exit status of a launcher that could not isolate the program
+SANDBOX_FAILED = 120
+_SANDBOX_MARKER = b'judge sandbox: '
+
+
+class SandboxError(RuntimeError):
+    """The program could not be isolated, so it was not run"""
+
+
+class JudgeResult:
+    def __init__(self, verdict, passed, total, failed_case=None, detail=''):
+        self.verdict = verdict
+        self.passed = passed
+        self.total = total
+        self.failed_case = failed_case
+        self.detail = detail
+
+    @property
+    def accepted(self):
+        return self.verdict == ACCEPTED
+
+    def remarks(self):
+        if self.accepted:
+            return f"{ACCEPTED}: passed all {self.total} test cases."
+        if self.failed_case is None:
+            return f"{self.verdict}: {self.detail}".strip()
+        message = f"{self.verdict} on test case {self.failed_case}."
+        if self.detail:
+            message += f"\n{self.detail}"
+        return message
+
+
+def _lines(path):
+    """Yield the lines of a file without trailing whitespace, read through a memory map"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for line in iter(data.readline, b''):
+                yield line.rstrip()
+
+
+def outputs_match(actual_path, expected_path):
+    """Compare two output files line by line, ignoring trailing whitespace and trailing blank lines"""
+    for actual, expected in zip_longest(_lines(actual_path), _lines(expected_path)):
+        # Past the end of one file, only blank lines may remain in the other
+        if actual != expected and (actual or expected):
+            return False
+    return True
+
+
+# Applies the resource limits, isolates the program and then replaces itself
+# with the submission. This is done in the child rather than through
+# preexec_fn, which is not safe to use from the judge's worker threads.
+_LAUNCHER = """
+import ctypes, os, resource, sys
+cpu, memory, output, processes, uid, gid = (int(value) for value in sys.argv[1:7])
+python, script, hidden = sys.argv[7], sys.argv[8], sys.argv[9:]
+
+def fail(message):
+    os.write(2, b'judge sandbox: ' + message.encode() + b'\\n')
+    os._exit(%d)
+
+def check(result, action):
+    if result != 0:
+        fail(action + ': ' + os.strerror(ctypes.get_errno()))
+
+resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+resource.setrlimit(resource.RLIMIT_FSIZE, (output, output))
+resource.setrlimit(resource.RLIMIT_NOFILE, (32, 32))
+resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+resource.setrlimit(resource.RLIMIT_NPROC, (processes, processes))
+root = os.geteuid() == 0
+if hidden:
+    libc = ctypes.CDLL(None, use_errno=True)
+    if root:
+        check(libc.unshare(0x00020000), 'unshare')  # CLONE_NEWNS
+    else:
+        # Unprivileged: map our own ids into a user namespace, which allows
+        # mounting; the capabilities are gone again after execv
+        outer_uid, outer_gid = os.getuid(), os.getgid()
+        check(libc.unshare(0x10000000 | 0x00020000), 'unshare')  # CLONE_NEWUSER | CLONE_NEWNS
+        try:
+            for name, value in (('setgroups', 'deny'), ('uid_map', f'{outer_uid} {outer_uid} 1'),
+                                ('gid_map', f'{outer_gid} {outer_gid} 1')):
+                with open(f'/proc/self/{name}', 'w') as f:
+                    f.write(value)
+        except OSError as e:
+            fail(f'id map: {e.strerror}')
+    # Keep the mounts below out of the host's namespace: MS_REC | MS_PRIVATE
+    check(libc.mount(b'none', b'/', None, (1 << 14) | (1 << 18), None), 'mount /')
+    for path in hidden:
+        # Empty tmpfs, MS_RDONLY | MS_NOSUID | MS_NODEV | MS_NOEXEC
+        check(libc.mount(b'tmpfs', path.encode(), b'tmpfs', 1 | 2 | 4 | 8, b'size=4k'), 'mount ' + path)
+if root:
+    os.setgroups([])
+    os.setgid(gid)
+    os.setuid(uid)
+try:
+    os.execv(python, [python, '-I', '-S', script])
+except OSError as e:
+    fail(f'cannot run {python}: {e.strerror}')
+""" % SANDBOX_FAILED
+
+
+def _sandbox_ids():
+    """uid and gid of JUDGE_SANDBOX_USER, which programs run as when the judge runs as root"""
+    if os.geteuid() != 0:
+        return os.getuid(), os.getgid()
+    try:
+        account = pwd.getpwnam(settings.JUDGE_SANDBOX_USER)
+    except (KeyError, TypeError):
+        raise SandboxError(f"JUDGE_SANDBOX_USER {settings.JUDGE_SANDBOX_USER!r} does not exist.")
+    if account.pw_uid == 0:
+        raise SandboxError("JUDGE_SANDBOX_USER must not be root.")
+    return account.pw_uid, account.pw_gid
+
+
+def _command(script, time_limit, memory_limit):
+    cpu = max(1, int(time_limit + 0.999))
+    memory = memory_limit * 1024 * 1024
+    uid, gid = _sandbox_ids()
+    hidden = [str(path) for path in settings.JUDGE_HIDDEN_PATHS if os.path.isdir(path)]
+    return [
+        sys.executable, '-I', '-S', '-c', _LAUNCHER,
+        str(cpu), str(memory), str(settings.JUDGE_OUTPUT_LIMIT), str(settings.JUDGE_PROCESS_LIMIT),
+        str(uid), str(gid), str(settings.JUDGE_PYTHON), script, *hidden,
+    ]
+
+
+class _Run:
+    """Runs test cases of one submission and can kill all of its processes"""
+
+    def __init__(self, workdir, cwd, script, time_limit, memory_limit):
+        self.workdir = workdir
+        self.cwd = cwd
+        self.script = script
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.cancelled = threading.Event()
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    def kill_all(self):
+        self.cancelled.set()
+        with self._lock:
+            for process in self._processes:
+                _kill(process)
+
+    def run_case(self, number, input_path, expected_path):
+        """Return None if the case passed, otherwise a (verdict, detail) tuple"""
+        if self.cancelled.is_set():
+            return None
+        stdout_path = os.path.join(self.workdir, f"{number}.out")
+        stderr_path = os.path.join(self.workdir, f"{number}.err")
+        try:
+            with open(input_path, 'rb') as stdin, open(stdout_path, 'wb', opener=_private) as stdout, \
+                    open(stderr_path, 'wb', opener=_private) as stderr:
+                process = subprocess.Popen(
+                    _command(self.script, self.time_limit, self.memory_limit),
+                    stdin=stdin,
+                    stdout=stdout,
+                    stderr=stderr,
+                    cwd=self.cwd,
+                    env={'PATH': '/usr/bin:/bin', 'PYTHONDONTWRITEBYTECODE': '1'},
+                    start_new_session=True,
+                )
+            with self._lock:
+                self._processes.add(process)
+                if self.cancelled.is_set():
+                    # Started while kill_all was running
+                    _kill(process)
+            try:
+                process.wait(timeout=self.time_limit * settings.JUDGE_WALL_TIME_FACTOR + 1)
+            except subprocess.TimeoutExpired:
+                _kill(process)
+                process.wait()
+                return TIME_LIMIT_EXCEEDED, ''
+            finally:
+                with self._lock:
+                    self._processes.discard(process)
+
+            if self.cancelled.is_set():
+                return None
+            return _verdict(process.returncode, stdout_path, stderr_path, expected_path)
+        finally:
+            for path in (stdout_path, stderr_path):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+
+def _private(path, flags):
+    return os.open(path, flags, 0o600)
+
+
+def _kill(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _verdict(returncode, stdout_path, stderr_path, expected_path):
+    if returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+        return TIME_LIMIT_EXCEEDED, ''
+    if returncode == -signal.SIGXFSZ:
+        return RUNTIME_ERROR, "Output limit exceeded."
+    if returncode == SANDBOX_FAILED:
+        with open(stderr_path, 'rb') as f:
+            message = f.read(1000)
+        if message.startswith(_SANDBOX_MARKER):
+            raise SandboxError(message[len(_SANDBOX_MARKER):].decode(errors='replace').strip())
+    if returncode != 0:
+        stderr = _tail(stderr_path)
+        if 'MemoryError' in stderr:
+            return MEMORY_LIMIT_EXCEEDED, ''
+        return RUNTIME_ERROR, stderr
+    if not outputs_match(stdout_path, expected_path):
+        return WRONG_ANSWER, ''
+    return None
+
+
+def _tail(path, limit=500):
+    """The last ``limit`` bytes of a file, decoded"""
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - limit))
+        text = f.read().decode(errors='replace').strip()
+    return text if size <= limit else '...' + text
+
+
+def judge(problem, source):
+    """Run a Python submission against the problem's test cases"""
+    storage = get_judge_storage()
+    cases = [
+        (storage.path(input_name), storage.path(output_name))
+        for input_name, output_name in problem.test_cases.values_list('input_file', 'output_file')
+    ]
+    if not cases:
+        return JudgeResult(RUNTIME_ERROR, 0, 0, detail="The problem has no test cases.")
+
+    try:
+        artifact = get_artifact(source)
+    except CompilationFailed as e:
+        return JudgeResult(COMPILATION_ERROR, 0, len(cases), detail=str(e))
+
+    workdir = tempfile.mkdtemp(prefix='judge-')
+    try:
+        # Run a private copy, so a program rewriting its own script cannot
+        # corrupt the shared artifact. The program may open its script and
+        # enter an empty directory, but not list the work directory or read
+        # the output files kept there.
+        script = os.path.join(workdir, 'solution.pyc')
+        shutil.copyfile(artifact, script)
+        os.chmod(script, 0o644)
+        cwd = os.path.join(workdir, 'run')
+        os.mkdir(cwd, 0o555)
+        os.chmod(workdir, 0o711)
+        run = _Run(workdir, cwd, script, problem.time_limit, problem.memory_limit)
+        return _run_cases(run, cases)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run_cases(run, cases):
+    passed = 0
+    failure = None
+    with ThreadPoolExecutor(max_workers=settings.JUDGE_WORKERS) as executor:
+        futures = {
+            executor.submit(run.run_case, number, input_path, expected_path): number
+            for number, (input_path, expected_path) in enumerate(cases, 1)
+        }
+        pending = set(futures)
+        while pending and failure is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=futures.get):
+                outcome = future.result()
+                if outcome is None:
+                    passed += 1
+                elif failure is None:
+                    failure = (futures[future], outcome)
+        if failure is not None:
+            # Early exit: drop queued cases and kill the ones still running
+            for future in pending:
+                future.cancel()
+            run.kill_all()
+
+    if failure is None:
+        return JudgeResult(ACCEPTED, passed, len(cases))
+    number, (verdict, detail) = failure
+    return JudgeResult(verdict, passed, len(cases), failed_case=number, detail=detail)
+
+
+@receiver(post_delete, sender=ProblemTestCase)
+def delete_test_case_files(sender, instance, **kwargs):
+    """Remove a deleted test case's files once the deletion is committed"""
+    def delete_files():
+        instance.input_file.delete(save=False)
+        instance.output_file.delete(save=False)
+    transaction.on_commit(delete_files)
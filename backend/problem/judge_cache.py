@@ -0,0 +1,129 @@
+"""
+Compiled artifact cache for the code judge.
+
+Submissions are compiled to bytecode once and stored under
+JUDGE_DATA_ROOT/artifacts as ``<sha256 of the source>.pyc``, so identical
+resubmissions and rejudges skip compilation. Compilation errors are cached
+as ``.err`` files the same way.
+
+Artifacts are touched on every hit; when the directory grows beyond
+JUDGE_ARTIFACT_CACHE_BYTES the least recently used files are evicted.
+Files are written to a temporary name and renamed into place, so
+concurrent workers (threads or processes) never see a partial artifact.
+"""
+import hashlib
+import os
+import py_compile
+import tempfile
+import threading
+
+from django.conf import settings
+
+
+class CompilationFailed(Exception):
+    pass
+
+
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_lock = threading.Lock()
+
+
+def artifact_dir():
+    path = settings.JUDGE_DATA_ROOT / 'artifacts'
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def source_hash(source):
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        # Evicted by another worker
+        return False
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def get_artifact(source):
+    """
+    Return the path of the submission's compiled bytecode, compiling it on a
+    miss. Raises CompilationFailed with the compiler's message.
+    """
+    root = artifact_dir()
+    key = source_hash(source)
+    compiled = root / f"{key}.pyc"
+    error = root / f"{key}.err"
+
+    if _touch(compiled):
+        _count("hits")
+        return compiled
+    if _touch(error):
+        _count("hits")
+        raise CompilationFailed(error.read_text())
+
+    _count("misses")
+    fd, source_path = tempfile.mkstemp(dir=root, prefix='.tmp-', suffix='.py')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(source)
+        # py_compile writes the .pyc atomically; UNCHECKED_HASH keeps it
+        # runnable after the temporary source is removed.
+        py_compile.compile(
+            source_path, cfile=str(compiled), dfile='solution.py', doraise=True,
+            invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+        )
+    except py_compile.PyCompileError as e:
+        message = str(e.exc_value) if e.exc_value is not None else e.msg
+        _write_atomic(error, message.encode('utf-8'))
+        evict()
+        raise CompilationFailed(message)
+    finally:
+        os.unlink(source_path)
+    evict()
+    return compiled
+
+
+def evict(limit=None):
+    """Delete least recently used artifacts until the cache fits in ``limit`` bytes"""
+    limit = settings.JUDGE_ARTIFACT_CACHE_BYTES if limit is None else limit
+    entries = []
+    total = 0
+    with os.scandir(artifact_dir()) as it:
+        for entry in it:
+            if entry.name.startswith('.tmp-') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    if total <= limit:
+        return
+    entries.sort()
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        try:
+            os.unlink(path)
+            _count("evictions")
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def cache_stats():
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,67 @@
+"""
+Read path for problem and submission listings.
+
+List endpoints build their rows from ``values()`` projections instead of
+model serializers: one query for the page and one for the genres of all
+its problems, however many rows there are. The rows have the same shape
+as ProblemSerializer and SubmissionSerializer produce, and dates and
+durations are formatted by the same DRF fields.
+"""
+from collections import defaultdict
+
+from django.db.models import F
+from rest_framework import serializers
+
+from .models import Problem, Submission
+
+datetime_field = serializers.DateTimeField()
+
+PROBLEM_FIELDS = ('id', 'title', 'question', 'answer', 'eval_type', 'evaluation_config',
+                  'time_limit', 'memory_limit', 'submission_rate_limit', 'created_at')
+
+
+def problem_values(problems):
+    """Project a Problem queryset onto the fields of a listing row"""
+    return problems.values(*PROBLEM_FIELDS)
+
+
+def problem_rows(values):
+    """Listing rows, with their genres, for rows of problem_values()"""
+    values = list(values)
+    genres = defaultdict(list)
+    if values:
+        for problem_id, genre_id, name in (
+            Problem.genre.through.objects.filter(problem_id__in=[row['id'] for row in values])
+            .order_by('problemgenre_id')
+            .values_list('problem_id', 'problemgenre_id', 'problemgenre__name')
+        ):
+            genres[problem_id].append({'id': genre_id, 'name': name})
+    return [
+        {
+            'id': row['id'],
+            'title': row['title'],
+            'question': row['question'],
+            'answer': row['answer'],
+            'genre': genres[row['id']],
+            'eval_type': row['eval_type'],
+            'evaluation_config': row['evaluation_config'],
+            'time_limit': row['time_limit'],
+            'memory_limit': row['memory_limit'],
+            'submission_rate_limit': row['submission_rate_limit'],
+            'created_at': datetime_field.to_representation(row['created_at']),
+        }
+        for row in values
+    ]
+
+
+def submission_values(submissions):
+    """Project a Submission queryset onto the fields of a listing row"""
+    return submissions.values(
+        'id', 'user', 'problem', 'contest', 'content', 'score', 'evaluation_status', 'remarks', 'created_at',
+        problem_title=F('problem__title'),
+    )
+
+
+def submission_rows(values):
+    """Listing rows for rows of submission_values()"""
+    return [dict(row, created_at=datetime_field.to_representation(row['created_at'])) for row in values]
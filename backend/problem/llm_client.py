@@ -0,0 +1,247 @@
+"""
+Process-wide manager for the model client.
+
+A single client is created per process and shared by every evaluation, so
+its HTTP connection pool (and TLS sessions) are reused. Every model round
+trip goes through the manager, which
+
+- waits for a token from a token bucket (LLM_REQUESTS_PER_SECOND / LLM_BURST),
+- holds one of LLM_MAX_CONCURRENCY slots while the request is in flight,
+- retries transient failures with jittered exponential backoff,
+- trips a circuit breaker after LLM_BREAKER_THRESHOLD consecutive failures.
+
+While the breaker is open, calls fail fast with EvaluationDeferred and the
+evaluation queue reschedules the submission instead of failing it.
+"""
+import logging
+import random
+import threading
+import time
+
+import httpx
+from django.conf import settings
+from google.genai import errors
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluationDeferred(Exception):
+    """The model provider is unavailable; evaluate again after ``retry_after`` seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Model provider unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second, holding at most ``capacity``"""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Take a token if one is available; otherwise return the seconds until one is"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after ``threshold`` consecutive failures. Once ``reset_timeout``
+    seconds have passed, a single trial call is let through (half-open);
+    its outcome closes the breaker or opens it again.
+    """
+
+    def __init__(self, threshold, reset_timeout, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        """Raise EvaluationDeferred unless a call may go through"""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return
+            retry_after = max(self.reset_timeout - (self._clock() - self._opened_at), 1)
+        raise EvaluationDeferred(retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.threshold:
+                if self._opened_at is None:
+                    logger.warning("Opening the LLM circuit breaker after %s failures", self._failures)
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+
+def is_retryable(error):
+    """Rate limiting, server errors and transport problems are worth retrying"""
+    if isinstance(error, errors.APIError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class LLMClientManager:
+    def __init__(self, client_factory, requests_per_second, burst, max_concurrency,
+                 max_retries, retry_base_delay, retry_max_delay, breaker_threshold, breaker_reset):
+        self._client_factory = client_factory
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.client = ManagedClient(self)
+
+    @property
+    def raw_client(self):
+        """The shared underlying client, created on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+        return self._client
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    def call(self, fn):
+        """Run ``fn(client)`` as one rate-limited, retried, breaker-guarded model round trip"""
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            self.bucket.acquire()
+            try:
+                with self.slots:
+                    result = fn(self.raw_client)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The provider answered; the request itself was bad
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                logger.info("Retrying model request in %.2fs after: %s", delay, e)
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+
+class ManagedClient:
+    """Client facade whose model calls go through an LLMClientManager"""
+
+    def __init__(self, manager):
+        self.models = _ManagedModels(manager)
+        self.chats = _ManagedChats(manager)
+
+
+class _ManagedModels:
+    def __init__(self, manager):
+        self._manager = manager
+
+    def generate_content(self, **kwargs):
+        return self._manager.call(lambda client: client.models.generate_content(**kwargs))
+
+
+class _ManagedChats:
+    def __init__(self, manager):
+        self._manager = manager
+
+    def create(self, **kwargs):
+        return _ManagedChat(self._manager, self._manager.raw_client.chats.create(**kwargs))
+
+
+class _ManagedChat:
+    def __init__(self, manager, chat):
+        self._manager = manager
+        self._chat = chat
+
+    def send_message(self, message):
+        return self._manager.call(lambda client: self._chat.send_message(message))
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    """Return the process-wide LLMClientManager configured from settings"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                from .llm_evaluation import create_client
+                _manager = LLMClientManager(
+                    client_factory=create_client,
+                    requests_per_second=settings.LLM_REQUESTS_PER_SECOND,
+                    burst=settings.LLM_BURST,
+                    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+                    max_retries=settings.LLM_MAX_RETRIES,
+                    retry_base_delay=settings.LLM_RETRY_BASE_DELAY,
+                    retry_max_delay=settings.LLM_RETRY_MAX_DELAY,
+                    breaker_threshold=settings.LLM_BREAKER_THRESHOLD,
+                    breaker_reset=settings.LLM_BREAKER_RESET_SECONDS,
+                )
+    return _manager
+
+
+def reset_manager():
+    """Drop the process-wide manager so the next call rebuilds it from settings"""
+    global _manager
+    with _manager_lock:
+        _manager = None
@@ -1,34 +1,225 @@
 from google import genai
+from google.genai import types
+from django.conf import settings
 from dotenv import load_dotenv
+import json
+import logging
 import os
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+MODEL = "gemini-2.0-flash"
 
-def llm_evaluate(question,correct_answer, submitted_answer):
-    client = genai.Client(api_key=GEMINI_API_KEY)
+logger = logging.getLogger(__name__)
 
-    chat=client.chats.create(model="gemini-2.0-flash")
-    
-    system_prompt= f"""
-        You are an evaluation assistant. You'll be evaluating submitted answers against correct answers for a question.
-        Understand the question and the meaning of the correct answer.
-        Do not use/expect information that is not present in the question or the current answer.
+SYSTEM_PROMPT = """
+    You are an evaluation assistant. You'll be evaluating submitted answers against correct answers for a question.
+    Understand the question and the meaning of the correct answer.
+    Do not use/expect information that is not present in the question or the current answer.
+"""
+
+# Response schema for the single-request ("structured") evaluation mode
+EVALUATION_SCHEMA = types.Schema(
+    type=types.Type.OBJECT,
+    properties={
+        "score": types.Schema(type=types.Type.INTEGER, minimum=0, maximum=100),
+        "remarks": types.Schema(type=types.Type.STRING),
+    },
+    required=["score", "remarks"],
+)
+
+# Response schema for evaluating several answers to one question in a single request
+BATCH_EVALUATION_SCHEMA = types.Schema(
+    type=types.Type.ARRAY,
+    items=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "index": types.Schema(type=types.Type.INTEGER),
+            "score": types.Schema(type=types.Type.INTEGER, minimum=0, maximum=100),
+            "remarks": types.Schema(type=types.Type.STRING),
+        },
+        required=["index", "score", "remarks"],
+    ),
+)
+
+
+class InvalidEvaluation(ValueError):
+    """The model returned a response that does not match the evaluation schema"""
+
+
+def _setting(name, default):
+    # Allows running this module as a script without Django settings
+    return getattr(settings, name, default) if settings.configured else default
+
+
+def create_client():
+    """Create a model client for the configured LLM_BACKEND ('gemini' or 'fake')"""
+    if _setting('LLM_BACKEND', 'gemini') == 'fake':
+        from .llm_fake import FakeClient
+        return FakeClient()
+    base_url = _setting('LLM_BASE_URL', None)
+    http_options = types.HttpOptions(base_url=base_url) if base_url else None
+    return genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+
+
+def get_client():
+    """
+    Return the shared, rate-limited client of this process
+    (see problem/llm_client.py)
+    """
+    if not settings.configured:
+        return create_client()
+    from .llm_client import get_manager
+    return get_manager().client
+
+
+def llm_evaluate(question, correct_answer, submitted_answer, client=None):
+    """
+    Evaluate a submitted answer, returning a (score, remarks) tuple.
+
+    LLM_EVALUATION_MODE selects between the 'structured' single-request
+    protocol and the 'legacy' three-message chat.
+    """
+    client = client or get_client()
+    if _setting('LLM_EVALUATION_MODE', 'structured') == 'structured':
+        try:
+            return llm_evaluate_structured(question, correct_answer, submitted_answer, client)
+        except InvalidEvaluation as e:
+            logger.warning("Structured evaluation returned an invalid response (%s), using the chat protocol", e)
+    return llm_evaluate_chat(question, correct_answer, submitted_answer, client)
+
+
+def build_structured_prompt(question, correct_answer, submitted_answer):
+    return f"""
+    You are given a question and its answer.
+    Evaluate the submitted answer based on its correctness and relevence with respect to the actual answer.
+    Return remarks in a paragraph of 20-100 words describing the quality of the submitted answer, missing information, well presented information and other relevent metrics.
+    Assign a score between 0 and 100, where 0 means the answer is completely wrong and 100 means the answer is completely correct. The score must be a whole number.
+    Question: {question}
+    Correct Answer: {correct_answer}
+    Submitted Answer: {submitted_answer}
+    """
+
+
+def _load_json(text):
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError) as e:
+        raise InvalidEvaluation(f"response is not JSON: {e}")
+
+
+def _validate_result(data):
+    if not isinstance(data, dict):
+        raise InvalidEvaluation("result is not an object")
+
+    score = data.get("score")
+    remarks = data.get("remarks")
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or score != int(score):
+        raise InvalidEvaluation(f"score is not a whole number: {score!r}")
+    if not 0 <= score <= 100:
+        raise InvalidEvaluation(f"score out of range: {score!r}")
+    if not isinstance(remarks, str) or not remarks.strip():
+        raise InvalidEvaluation("remarks are missing")
+    return int(score), remarks.strip()
+
+
+def parse_structured_response(text):
+    """Validate a JSON evaluation response and return (score, remarks)"""
+    return _validate_result(_load_json(text))
+
+
+def parse_batch_response(text, count):
+    """Validate a JSON batch evaluation response and return (score, remarks) per submitted answer, in order"""
+    data = _load_json(text)
+    if not isinstance(data, list):
+        raise InvalidEvaluation("response is not an array")
+
+    results = {}
+    for item in data:
+        index = item.get("index") if isinstance(item, dict) else None
+        if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < count or index in results:
+            raise InvalidEvaluation(f"unexpected index: {index!r}")
+        results[index] = _validate_result(item)
+    if len(results) != count:
+        raise InvalidEvaluation(f"expected {count} results, got {len(results)}")
+    return [results[i] for i in range(count)]
+
+
+def llm_evaluate_structured(question, correct_answer, submitted_answer, client=None):
+    """Ask for the score and remarks in one schema-constrained request"""
+    client = client or get_client()
+    response = client.models.generate_content(
+        model=MODEL,
+        contents=build_structured_prompt(question, correct_answer, submitted_answer),
+        config=types.GenerateContentConfig(
+            system_instruction=SYSTEM_PROMPT,
+            response_mime_type="application/json",
+            response_schema=EVALUATION_SCHEMA,
+        ),
+    )
+    return parse_structured_response(response.text)
+
+
+def build_batch_prompt(question, correct_answer, submitted_answers):
+    submissions = json.dumps([{"index": i, "answer": answer} for i, answer in enumerate(submitted_answers)])
+    return f"""
+    You are given a question, its answer and several independently submitted answers.
+    Evaluate each submitted answer on its own, based on its correctness and relevence with respect to the actual answer.
+    For each submitted answer return its index, remarks in a paragraph of 20-100 words describing the quality of the submitted answer, missing information, well presented information and other relevent metrics,
+    and a score between 0 and 100, where 0 means the answer is completely wrong and 100 means the answer is completely correct. The score must be a whole number.
+    Question: {question}
+    Correct Answer: {correct_answer}
+    Submitted Answers (JSON): {submissions}
+    """
+
+
+def llm_evaluate_batch(question, correct_answer, submitted_answers, client=None):
     """
+    Evaluate several answers to the same question in one request.
+
+    Returns a list of (score, remarks) tuples in the order of
+    ``submitted_answers``. If the response fails validation, or the legacy
+    chat protocol is configured, each answer is evaluated on its own instead.
+    """
+    client = client or get_client()
+    if len(submitted_answers) == 1 or _setting('LLM_EVALUATION_MODE', 'structured') != 'structured':
+        return [llm_evaluate(question, correct_answer, answer, client) for answer in submitted_answers]
+
+    response = client.models.generate_content(
+        model=MODEL,
+        contents=build_batch_prompt(question, correct_answer, submitted_answers),
+        config=types.GenerateContentConfig(
+            system_instruction=SYSTEM_PROMPT,
+            response_mime_type="application/json",
+            response_schema=BATCH_EVALUATION_SCHEMA,
+        ),
+    )
+    try:
+        return parse_batch_response(response.text, len(submitted_answers))
+    except InvalidEvaluation as e:
+        logger.warning("Batch evaluation returned an invalid response (%s), evaluating answers one by one", e)
+        return [llm_evaluate(question, correct_answer, answer, client) for answer in submitted_answers]
+
+
+def llm_evaluate_chat(question, correct_answer, submitted_answer, client=None):
+    """Legacy protocol: system prompt, remarks prompt and score prompt in one chat"""
+    client = client or get_client()
+
+    chat=client.chats.create(model=MODEL)
 
 
     remark_prompt = f"""
-    You are given a question and its answer. 
+    You are given a question and its answer.
     Evaluate the submitted answer based on its correctness and relevence with respect to the actual answer.
     Return remarks in a paragraph of 20-100 words describing the quality of the submitted answer, missing information, well presented information and other relevent metrics.
-    Return only the remarks in the response.     
+    Return only the remarks in the response.
     Question: {question}
     Correct Answer: {correct_answer}
     Submitted Answer: {submitted_answer}
     """
 
 
-    chat.send_message(system_prompt)
+    chat.send_message(SYSTEM_PROMPT)
 
     response = chat.send_message(remark_prompt)
     remarks = response.text
@@ -43,8 +234,6 @@ def llm_evaluate(question,correct_answer, submitted_answer):
     response = chat.send_message(score_prompt)
     score = response.text
     score = int(score)
-    print(score)
-    print(remarks)
     return score,remarks
 
 if __name__=="__main__":
@@ -54,4 +243,4 @@ if __name__=="__main__":
 
     score, remarks = llm_evaluate(question, correct_answer, submitted_answer)
     print(f"Score: {score}")
-    print(f"Remarks: {remarks}")
\ No newline at end of file
+    print(f"Remarks: {remarks}")
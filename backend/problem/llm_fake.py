@@ -0,0 +1,109 @@
+"""
+Offline stand-in for the google-genai client.
+
+Implements the small part of the client surface used by llm_evaluation
+(``client.models.generate_content`` and ``client.chats.create().send_message``)
+so evaluation can run without network access. Select it with
+``LLM_BACKEND = 'fake'`` or pass a FakeClient to llm_evaluate directly.
+
+Answers are scored by word overlap with the correct answer. A list of canned
+``responses`` can be given to script the exact replies instead.
+"""
+import json
+import re
+
+_fields = re.compile(r"Correct Answer:(?P<correct>.*?)\n\s*Submitted Answer:(?P<submitted>.*)", re.S)
+_words = re.compile(r"\w+")
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def overlap_score(correct_answer, submitted_answer):
+    """Share of the correct answer's words present in the submitted answer, as 0-100"""
+    expected = set(_words.findall(correct_answer.lower()))
+    given = set(_words.findall(submitted_answer.lower()))
+    if not expected:
+        return 100 if not given else 0
+    return round(100 * len(expected & given) / len(expected))
+
+
+def _evaluate_batch_prompt(prompt):
+    head, submissions = prompt.split("Submitted Answers (JSON):", 1)
+    match = re.search(r"Correct Answer:(.*)", head, re.S)
+    correct = match.group(1).strip() if match else ""
+    results = []
+    for item in json.loads(submissions):
+        score = overlap_score(correct, item["answer"])
+        results.append({
+            "index": item["index"],
+            "score": score,
+            "remarks": f"The submitted answer covers {score}% of the key terms of the correct answer.",
+        })
+    return results
+
+
+def _evaluate_prompt(prompt):
+    match = _fields.search(prompt)
+    if not match:
+        return 0, "The submitted answer could not be found in the request."
+    correct = match.group('correct').strip()
+    submitted = match.group('submitted').strip()
+    score = overlap_score(correct, submitted)
+    return score, f"The submitted answer covers {score}% of the key terms of the correct answer."
+
+
+class _Models:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        self._client.calls += 1
+        scripted = self._client._next_scripted()
+        if scripted is not None:
+            return FakeResponse(scripted)
+        if "Submitted Answers (JSON):" in contents:
+            return FakeResponse(json.dumps(_evaluate_batch_prompt(contents)))
+        score, remarks = _evaluate_prompt(contents)
+        return FakeResponse(json.dumps({"score": score, "remarks": remarks}))
+
+
+class _Chat:
+    def __init__(self, client):
+        self._client = client
+        self._score = None
+
+    def send_message(self, message):
+        self._client.calls += 1
+        scripted = self._client._next_scripted()
+        if scripted is not None:
+            return FakeResponse(scripted)
+        if "Submitted Answer:" in message:
+            self._score, remarks = _evaluate_prompt(message)
+            return FakeResponse(remarks)
+        if self._score is not None:
+            return FakeResponse(str(self._score))
+        return FakeResponse("Understood.")
+
+
+class _Chats:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, model):
+        return _Chat(self._client)
+
+
+class FakeClient:
+    """Drop-in replacement for ``genai.Client`` that never leaves the process"""
+
+    def __init__(self, responses=None):
+        self.responses = list(responses or [])
+        self.calls = 0
+        self.models = _Models(self)
+        self.chats = _Chats(self)
+
+    def _next_scripted(self):
+        return self.responses.pop(0) if self.responses else None
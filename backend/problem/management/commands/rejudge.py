@@ -0,0 +1,98 @@
+import signal
+import threading
+import time
+from datetime import datetime, time as day_start
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from problem.models import RejudgeJob
+from problem.rejudge import Rejudge
+
+
+def _parse_moment(value):
+    """Parse an ISO date or datetime into an aware datetime"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date: {value}")
+        moment = datetime.combine(day, day_start.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment.isoformat()
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-evaluate existing submissions of a problem, a contest or a date range, "
+        "e.g. after a problem's answer was corrected. Interrupted runs can be resumed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--problem', type=int, action='append', help="Problem id (can be repeated)")
+        parser.add_argument('--contest', type=int, help="Contest id")
+        parser.add_argument('--since', help="Only submissions made at or after this ISO date/datetime")
+        parser.add_argument('--until', help="Only submissions made before this ISO date/datetime")
+        parser.add_argument('--concurrency', type=int, default=settings.EVALUATION_WORKERS,
+                            help="Submissions evaluated at the same time (defaults to EVALUATION_WORKERS)")
+        parser.add_argument('--chunk-size', type=int, default=200, help="Submissions loaded and written back per batch")
+        parser.add_argument('--resume', type=int, metavar='JOB_ID', help="Resume an interrupted rejudge job")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--concurrency and --chunk-size must be positive")
+
+        if options['resume']:
+            job = RejudgeJob.objects.filter(pk=options['resume']).first()
+            if job is None:
+                raise CommandError(f"Rejudge job {options['resume']} does not exist")
+            if job.status == 'Done':
+                raise CommandError(f"Rejudge job {job.id} is already done")
+            job.status = 'Running'
+            job.save(update_fields=['status', 'updated_at'])
+        else:
+            filters = {
+                'problems': options['problem'] or [],
+                'contest': options['contest'],
+                'since': _parse_moment(options['since']) if options['since'] else None,
+                'until': _parse_moment(options['until']) if options['until'] else None,
+            }
+            if not any(filters.values()):
+                raise CommandError("Give at least one of --problem, --contest, --since, --until, or --resume")
+            job = RejudgeJob.objects.create(filters=filters)
+
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping after the current chunk...")
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        started = time.monotonic()
+        processed_before = job.processed
+
+        def progress(job, rate):
+            percent = 100 * job.processed / job.total if job.total else 100
+            self.stdout.write(
+                f"{job.processed}/{job.total} ({percent:.1f}%) - {rate:.1f} submissions/s, "
+                f"{job.changed} changed, {job.requeued} requeued"
+            )
+
+        self.stdout.write(f"Rejudge job {job.id}: {job.filters}")
+        job = Rejudge(job, options['concurrency'], options['chunk_size'], stop, progress).run()
+
+        elapsed = time.monotonic() - started
+        done = job.processed - processed_before
+        summary = (
+            f"Rejudged {done} submissions in {elapsed:.1f}s ({done / max(elapsed, 1e-9):.1f}/s): "
+            f"{job.changed} changed, {job.requeued} requeued"
+        )
+        if job.status == 'Done':
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            self.stdout.write(self.style.WARNING(f"{summary}. Resume with: manage.py rejudge --resume {job.id}"))
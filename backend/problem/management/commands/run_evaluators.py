@@ -0,0 +1,29 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from problem.evaluation_queue import EvaluatorPool
+
+
+class Command(BaseCommand):
+    help = "Run a pool of evaluator workers that drain the submission evaluation queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help="Number of worker threads (defaults to EVALUATION_WORKERS)")
+        parser.add_argument('--drain', action='store_true', help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        pool = EvaluatorPool(workers=options['workers'], drain=options['drain'])
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping evaluator workers...")
+            pool.stop()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        pool.start()
+        self.stdout.write(self.style.SUCCESS(f"Started {pool.workers} evaluator workers"))
+        # Join in short slices so signals are handled promptly
+        while pool.is_alive():
+            pool.join(timeout=1)
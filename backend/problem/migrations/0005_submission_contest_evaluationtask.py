@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-16 20:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0004_alter_contest_duration'),
+        ('problem', '0004_submission_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='contest',
+            field=models.ForeignKey(blank=True, help_text='Contest the submission was made in, if any', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='competition.contest'),
+        ),
+        migrations.CreateModel(
+            name='EvaluationTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed')], default='Pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time a worker may pick up the task')),
+                ('locked_by', models.CharField(blank=True, default='', help_text='Worker currently holding the task', max_length=100)),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Lease expiry, after which another worker may retry the task', null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='evaluation_task', to='problem.submission')),
+            ],
+            options={
+                'ordering': ['available_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='problem_eva_status_f7ae89_idx')],
+            },
+        ),
+    ]
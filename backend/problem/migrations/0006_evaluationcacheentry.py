@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-16 20:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0005_submission_contest_evaluationtask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvaluationCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer_hash', models.CharField(help_text='SHA-256 of the reference answer the result was computed against', max_length=64)),
+                ('submission_hash', models.CharField(help_text='SHA-256 of the normalized submitted answer', max_length=64)),
+                ('score', models.FloatField()),
+                ('remarks', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='evaluation_cache_entries', to='problem.problem')),
+            ],
+            options={
+                'unique_together': {('problem', 'answer_hash', 'submission_hash')},
+            },
+        ),
+    ]
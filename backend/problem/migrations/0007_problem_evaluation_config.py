@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-16 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0006_evaluationcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='evaluation_config',
+            field=models.JSONField(blank=True, default=dict, help_text='Evaluation tiers and thresholds, see problem/evaluation_tiers.py'),
+        ),
+    ]
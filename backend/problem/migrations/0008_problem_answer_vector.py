@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-16 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0007_problem_evaluation_config'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='answer_vector',
+            field=models.BinaryField(blank=True, help_text='Hashed n-gram vector of the answer, see problem/vector_scorer.py', null=True),
+        ),
+    ]
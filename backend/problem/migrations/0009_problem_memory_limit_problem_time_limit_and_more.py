@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-16 20:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0008_problem_answer_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='memory_limit',
+            field=models.PositiveIntegerField(default=256, help_text='Memory limit per test case in MB (code problems)'),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='time_limit',
+            field=models.FloatField(default=2.0, help_text='CPU time limit per test case in seconds (code problems)'),
+        ),
+        migrations.CreateModel(
+            name='ProblemTestCase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('input_data', models.TextField(blank=True, help_text='Data fed to the program on standard input')),
+                ('expected_output', models.TextField(help_text='Expected standard output')),
+                ('order', models.PositiveIntegerField(default=0, help_text='Order in which the test case is run')),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_cases', to='problem.problem')),
+            ],
+            options={
+                'ordering': ['order', 'id'],
+            },
+        ),
+    ]
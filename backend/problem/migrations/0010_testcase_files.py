@@ -0,0 +1,59 @@
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+import problem.models
+
+
+def move_data_to_files(apps, schema_editor):
+    ProblemTestCase = apps.get_model('problem', 'ProblemTestCase')
+    for test_case in ProblemTestCase.objects.all():
+        test_case.input_file.save('input.txt', ContentFile(test_case.input_data.encode()), save=False)
+        test_case.output_file.save('output.txt', ContentFile(test_case.expected_output.encode()), save=False)
+        test_case.save(update_fields=['input_file', 'output_file'])
+
+
+def move_files_to_data(apps, schema_editor):
+    ProblemTestCase = apps.get_model('problem', 'ProblemTestCase')
+    for test_case in ProblemTestCase.objects.all():
+        with test_case.input_file.open('rb') as f:
+            test_case.input_data = f.read().decode()
+        with test_case.output_file.open('rb') as f:
+            test_case.expected_output = f.read().decode()
+        test_case.save(update_fields=['input_data', 'expected_output'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0009_problem_memory_limit_problem_time_limit_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problemtestcase',
+            name='input_file',
+            field=models.FileField(default='', help_text='Data fed to the program on standard input', storage=problem.models.get_judge_storage, upload_to=problem.models.test_case_path),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='problemtestcase',
+            name='output_file',
+            field=models.FileField(default='', help_text='Expected standard output', storage=problem.models.get_judge_storage, upload_to=problem.models.test_case_path),
+            preserve_default=False,
+        ),
+        migrations.RunPython(move_data_to_files, move_files_to_data),
+        # A default lets the column be restored when migrating backwards
+        migrations.AlterField(
+            model_name='problemtestcase',
+            name='expected_output',
+            field=models.TextField(default='', help_text='Expected standard output'),
+        ),
+        migrations.RemoveField(
+            model_name='problemtestcase',
+            name='input_data',
+        ),
+        migrations.RemoveField(
+            model_name='problemtestcase',
+            name='expected_output',
+        ),
+    ]
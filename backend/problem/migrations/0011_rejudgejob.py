@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-16 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0010_testcase_files'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RejudgeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filters', models.JSONField(help_text='Problem, contest and date range the job was started with')),
+                ('status', models.CharField(choices=[('Running', 'Running'), ('Interrupted', 'Interrupted'), ('Done', 'Done')], default='Running', max_length=12)),
+                ('last_submission_id', models.BigIntegerField(default=0, help_text='Highest submission id already rejudged')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('changed', models.PositiveIntegerField(default=0)),
+                ('requeued', models.PositiveIntegerField(default=0, help_text='Submissions handed to the evaluation queue after an error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-16 21:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0011_rejudgejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvaluationLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer_hash', models.CharField(max_length=64)),
+                ('submission_hash', models.CharField(max_length=64)),
+                ('owner', models.CharField(help_text='Random token of the holder', max_length=32)),
+                ('expires_at', models.DateTimeField(help_text='After this, another process may take over the evaluation')),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='evaluation_leases', to='problem.problem')),
+            ],
+            options={
+                'unique_together': {('problem', 'answer_hash', 'submission_hash')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0012_evaluationlease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Version stamp for ETags, see problem/conditional.py'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0013_problem_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='submission_rate_limit',
+            field=models.PositiveIntegerField(blank=True, help_text='Submissions per user per minute; empty for SUBMISSION_PROBLEM_RATE_LIMIT, 0 for no limit', null=True),
+        ),
+        migrations.CreateModel(
+            name='SubmissionBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='What is limited, e.g. user 7 on problem 12', max_length=100, unique=True)),
+                ('tokens', models.FloatField(help_text='Tokens left at refilled_at')),
+                ('refilled_at', models.FloatField(help_text='Unix time of the last refill')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refilled_at'], name='problem_sub_refille_fc7509_idx')],
+            },
+        ),
+    ]
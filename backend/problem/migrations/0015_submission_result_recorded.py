@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:15
+
+from django.db import migrations, models
+
+
+def mark_recorded(apps, schema_editor):
+    """Contest submissions evaluated so far were counted as attempts already"""
+    Submission = apps.get_model('problem', 'Submission')
+    Submission.objects.filter(contest__isnull=False).exclude(
+        evaluation_task__status__in=['Pending', 'Running', 'Failed']
+    ).update(result_recorded=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problem', '0014_submission_throttling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='result_recorded',
+            field=models.BooleanField(default=False, help_text='Whether the contest results count this submission as an attempt (see competition/scoring.py)'),
+        ),
+        migrations.RunPython(mark_recorded, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
 
 class ProblemGenre(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -14,8 +18,14 @@ class Problem(models.Model):
     answer = models.TextField(help_text="Correct answer for the question")
     genre = models.ManyToManyField(ProblemGenre, related_name='problem')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Version stamp for ETags, see problem/conditional.py")
     eval_type=models.IntegerField(default=0, help_text="Evaluation type: 0 for code, 1 for text, 2 for no auto eval")
+    answer_vector = models.BinaryField(null=True, blank=True, editable=False, help_text="Hashed n-gram vector of the answer, see problem/vector_scorer.py")
+    evaluation_config = models.JSONField(default=dict, blank=True, help_text="Evaluation tiers and thresholds, see problem/evaluation_tiers.py")
     creator=models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='created_problems')
+    time_limit = models.FloatField(default=2.0, help_text="CPU time limit per test case in seconds (code problems)")
+    memory_limit = models.PositiveIntegerField(default=256, help_text="Memory limit per test case in MB (code problems)")
+    submission_rate_limit = models.PositiveIntegerField(null=True, blank=True, help_text="Submissions per user per minute; empty for SUBMISSION_PROBLEM_RATE_LIMIT, 0 for no limit")
     
     def __str__(self):
         """String representation of the Question object."""
@@ -24,6 +34,33 @@ class Problem(models.Model):
     class Meta:
         ordering = ['-created_at']
 
+def get_judge_storage():
+    """Storage for test case files, kept on local disk so the judge can memory-map them"""
+    return FileSystemStorage(location=settings.JUDGE_DATA_ROOT / 'testcases')
+
+
+def test_case_path(instance, filename):
+    return f"{instance.problem_id}/{uuid.uuid4().hex}-{filename}"
+
+
+class ProblemTestCase(models.Model):
+    """
+    Input and expected output used to judge submissions to a code problem.
+    Both are stored as files on disk rather than in the database, so large
+    cases never have to be loaded into memory.
+    """
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name="test_cases")
+    input_file = models.FileField(storage=get_judge_storage, upload_to=test_case_path, help_text="Data fed to the program on standard input")
+    output_file = models.FileField(storage=get_judge_storage, upload_to=test_case_path, help_text="Expected standard output")
+    order = models.PositiveIntegerField(default=0, help_text="Order in which the test case is run")
+
+    class Meta:
+        ordering = ['order', 'id']
+
+    def __str__(self):
+        return f"Test case {self.order} of {self.problem.title}"
+
+
 class Submission(models.Model):
     STATUS_CHOICES = [
         ('Correct', 'Correct'),
@@ -33,11 +70,126 @@ class Submission(models.Model):
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="submissions")
     problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name="submissions")
+    contest = models.ForeignKey('competition.Contest', on_delete=models.SET_NULL, null=True, blank=True, related_name="submissions", help_text="Contest the submission was made in, if any")
     content = models.TextField(help_text="The submitted solution/content")
     score=models.FloatField(default=0, help_text="Score of the submission")  # New field added
     evaluation_status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Unknown')
     remarks = models.TextField(blank=True, null=True, help_text="Additional remarks about the submission")  # New field added
+    result_recorded = models.BooleanField(default=False, help_text="Whether the contest results count this submission as an attempt (see competition/scoring.py)")
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Submission by {self.user.username} for {self.problem.title} - {self.evaluation_status}"
\ No newline at end of file
+        return f"Submission by {self.user.username} for {self.problem.title} - {self.evaluation_status}"
+
+
+class EvaluationTask(models.Model):
+    """
+    Queued evaluation of a submission, drained by the evaluator workers
+    """
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Running', 'Running'),
+        ('Done', 'Done'),
+        ('Failed', 'Failed'),
+    ]
+
+    submission = models.OneToOneField(Submission, on_delete=models.CASCADE, related_name="evaluation_task")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Earliest time a worker may pick up the task")
+    locked_by = models.CharField(max_length=100, blank=True, default='', help_text="Worker currently holding the task")
+    locked_until = models.DateTimeField(null=True, blank=True, help_text="Lease expiry, after which another worker may retry the task")
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['available_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"Evaluation of submission {self.submission_id} - {self.status}"
+
+
+
+class EvaluationCacheEntry(models.Model):
+    """
+    Stored evaluation result for a normalized answer to a problem
+    (see problem/evaluation_cache.py)
+    """
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name="evaluation_cache_entries")
+    answer_hash = models.CharField(max_length=64, help_text="SHA-256 of the reference answer the result was computed against")
+    submission_hash = models.CharField(max_length=64, help_text="SHA-256 of the normalized submitted answer")
+    score = models.FloatField()
+    remarks = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['problem', 'answer_hash', 'submission_hash']
+
+    def __str__(self):
+        return f"Cached evaluation for {self.problem_id} ({self.submission_hash[:12]})"
+
+
+class RejudgeJob(models.Model):
+    """
+    Progress of a ``rejudge`` run. Submissions are processed in ascending id
+    order and the checkpoint is committed after every chunk, so an
+    interrupted run can be resumed where it stopped.
+    """
+    STATUS_CHOICES = [
+        ('Running', 'Running'),
+        ('Interrupted', 'Interrupted'),
+        ('Done', 'Done'),
+    ]
+
+    filters = models.JSONField(help_text="Problem, contest and date range the job was started with")
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='Running')
+    last_submission_id = models.BigIntegerField(default=0, help_text="Highest submission id already rejudged")
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    requeued = models.PositiveIntegerField(default=0, help_text="Submissions handed to the evaluation queue after an error")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Rejudge job {self.id} - {self.status} ({self.processed}/{self.total})"
+
+
+class EvaluationLease(models.Model):
+    """
+    Claim of one process on evaluating a cache key (see problem/single_flight.py).
+    Other processes wait for the result instead of evaluating the same answer.
+    """
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name="evaluation_leases")
+    answer_hash = models.CharField(max_length=64)
+    submission_hash = models.CharField(max_length=64)
+    owner = models.CharField(max_length=32, help_text="Random token of the holder")
+    expires_at = models.DateTimeField(help_text="After this, another process may take over the evaluation")
+
+    class Meta:
+        unique_together = ['problem', 'answer_hash', 'submission_hash']
+
+    def __str__(self):
+        return f"Evaluation lease on {self.problem_id} ({self.submission_hash[:12]})"
+
+
+class SubmissionBucket(models.Model):
+    """
+    Token bucket limiting the submissions of one user (see problem/throttling.py).
+    Shared by every process through the database.
+    """
+    key = models.CharField(max_length=100, unique=True, help_text="What is limited, e.g. user 7 on problem 12")
+    tokens = models.FloatField(help_text="Tokens left at refilled_at")
+    refilled_at = models.FloatField(help_text="Unix time of the last refill")
+
+    class Meta:
+        indexes = [
+            # Pruning buckets that have been full for a while
+            models.Index(fields=['refilled_at']),
+        ]
+
+    def __str__(self):
+        return f"Submission bucket {self.key} ({self.tokens:.1f} tokens)"
@@ -0,0 +1,180 @@
+"""
+Keyset pagination for list endpoints.
+
+Pages are selected with a WHERE on the view's compound sort key, e.g.
+``(starting_time, id)``, instead of an OFFSET, so every page costs the
+same index range scan however deep it is. The position is passed as an
+opaque ``cursor`` query parameter; the response links to the next and
+previous pages.
+
+No COUNT(*) is run unless the client asks with ``count=true``, and then
+the total is an approximation cached for PAGINATION_COUNT_CACHE_SECONDS.
+
+Requests with a ``page`` parameter are still served by page number, as
+before, while clients move over to cursors.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on the view's ``ordering``, a tuple of model fields
+    (prefixed with '-' for descending) that must end in a unique field.
+    Rows may be model instances or ``values()`` dicts holding the fields.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    legacy_page_query_param = 'page'
+    invalid_cursor_message = "Invalid cursor."
+
+    def __init__(self):
+        self.legacy = None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def is_legacy(self, request):
+        return (
+            self.legacy_page_query_param in request.query_params
+            and self.cursor_query_param not in request.query_params
+        )
+
+    def _legacy_paginator(self):
+        paginator = PageNumberPagination()
+        paginator.page_size = self.page_size
+        paginator.page_size_query_param = self.page_size_query_param
+        paginator.max_page_size = self.max_page_size
+        return paginator
+
+    # Cursors
+
+    def _fields(self, view):
+        return [(name.lstrip('-'), name.startswith('-')) for name in view.ordering]
+
+    def _encode(self, keys, backwards):
+        keys = [key.isoformat() if isinstance(key, (date, datetime)) else key for key in keys]
+        data = json.dumps({'k': keys, 'b': int(backwards)}, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def _decode(self, cursor, model, fields):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            keys = data['k']
+            if len(keys) != len(fields):
+                raise ValueError
+            values = [model._meta.get_field(name).to_python(key) for (name, _), key in zip(fields, keys)]
+            return values, bool(data.get('b'))
+        except (binascii.Error, ValueError, TypeError, KeyError, AttributeError) as e:
+            raise NotFound(self.invalid_cursor_message) from e
+
+    def _position(self, request, model, fields):
+        """(key values, scanning backwards) of the request's cursor; (None, False) for the first page"""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        return self._decode(cursor, model, fields)
+
+    def _after(self, fields, values, backwards):
+        """Rows strictly after the key in the scan direction"""
+        condition = Q()
+        for i, ((name, descending), value) in enumerate(zip(fields, values)):
+            lookup = 'lt' if descending != backwards else 'gt'
+            step = Q(**{f"{name}__{lookup}": value})
+            for earlier, earlier_value in zip(fields[:i], values[:i]):
+                step &= Q(**{earlier[0]: earlier_value})
+            condition |= step
+        return condition
+
+    def _key(self, row, fields):
+        if isinstance(row, dict):
+            return [row[name] for name, _ in fields]
+        return [getattr(row, name) for name, _ in fields]
+
+    def page_slice(self, queryset, request, view):
+        """
+        The rows of the requested page plus one, which tells whether there
+        is another page, ordered in the scan direction. None for page-number
+        requests.
+        """
+        if self.is_legacy(request):
+            return None
+        fields = self._fields(view)
+        values, backwards = self._position(request, queryset.model, fields)
+        if values is not None:
+            queryset = queryset.filter(self._after(fields, values, backwards))
+        ordering = [
+            f"{'-' if descending != backwards else ''}{name}" for name, descending in fields
+        ]
+        return queryset.order_by(*ordering)[:self.get_page_size(request) + 1]
+
+    # Pagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if self.is_legacy(request):
+            self.legacy = self._legacy_paginator()
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        self.legacy = None
+        fields = self._fields(view)
+        page_size = self.get_page_size(request)
+        values, backwards = self._position(request, queryset.model, fields)
+        rows = list(self.page_slice(queryset, request, view))
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+
+        url = request.build_absolute_uri()
+        self.next_link = self.previous_link = None
+        if rows and (has_more or backwards):
+            self.next_link = replace_query_param(url, self.cursor_query_param, self._encode(self._key(rows[-1], fields), False))
+        if rows and ((has_more and backwards) or (values is not None and not backwards)):
+            self.previous_link = replace_query_param(url, self.cursor_query_param, self._encode(self._key(rows[0], fields), True))
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = approximate_count(queryset, self._count_key(request, view))
+        return rows
+
+    def _count_key(self, request, view):
+        """
+        The listing a count belongs to: the view and its filters, without the
+        position parameters. Filters on the current time (e.g. active contests)
+        change the SQL on every request but share one cached count.
+        """
+        ignored = {self.cursor_query_param, self.count_query_param, self.page_size_query_param, self.legacy_page_query_param}
+        params = sorted((name, value) for name, value in request.query_params.items() if name not in ignored)
+        return f"{type(view).__name__}:{request.path}:{params}"
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        body = {"next": self.next_link, "previous": self.previous_link, "results": data}
+        if self.count is not None:
+            body = {"count": self.count, **body}
+        return Response(body)
+
+
+def approximate_count(queryset, key):
+    """Row count of a queryset, cached under ``key`` for PAGINATION_COUNT_CACHE_SECONDS"""
+    key = f"pagination:count:{hashlib.sha256(key.encode()).hexdigest()}"
+    return cache.get_or_set(key, queryset.count, settings.PAGINATION_COUNT_CACHE_SECONDS)
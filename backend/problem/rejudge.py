@@ -0,0 +1,154 @@
+"""
+Bulk re-evaluation of existing submissions (see the ``rejudge`` management
+command).
+
+Submissions are streamed in ascending id order, one chunk at a time, and
+evaluated concurrently on a bounded thread pool. Changed results are written
+back with a single ``bulk_update`` per chunk and announced with the
+``submissions_rejudged`` signal (contest scores and ranks are recomputed by
+its receiver), in the same transaction that advances the job's checkpoint,
+so a resumed job neither skips nor repeats work.
+
+Text answers to the same problem within a chunk are scored by the vector
+scorer with one matrix product (``vector_scorer.prime``) before the chunk
+is evaluated.
+
+Worker threads close their database connections after every submission,
+so a finished run leaves none open.
+
+Submissions still waiting in the evaluation queue are left to the queue.
+Submissions whose evaluation raises (e.g. while the model provider is
+unavailable) keep their previous result and are handed to the evaluation
+queue instead.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import vector_scorer
+from .evaluation import evaluate_submission
+from .evaluation_tiers import uses_vector_scorer
+from .llm_client import EvaluationDeferred
+from .models import EvaluationTask, RejudgeJob, Submission
+from .signals import submissions_rejudged
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = ['score', 'remarks', 'evaluation_status']
+
+
+def submissions_for(filters):
+    """Submissions matching a job's filters, excluding those still queued for evaluation"""
+    queryset = Submission.objects.exclude(evaluation_task__status__in=['Pending', 'Running'])
+    if filters.get('problems'):
+        queryset = queryset.filter(problem_id__in=filters['problems'])
+    if filters.get('contest'):
+        queryset = queryset.filter(contest_id=filters['contest'])
+    if filters.get('since'):
+        queryset = queryset.filter(created_at__gte=filters['since'])
+    if filters.get('until'):
+        queryset = queryset.filter(created_at__lt=filters['until'])
+    return queryset
+
+
+def _evaluate(submission):
+    close_old_connections()
+    try:
+        return evaluate_submission(submission)
+    except EvaluationDeferred as e:
+        logger.info("Rejudging submission %s deferred: %s", submission.id, e)
+    except Exception:
+        logger.exception("Rejudging submission %s failed", submission.id)
+    finally:
+        # Pool threads outlive the run; don't leave their connections behind
+        connections.close_all()
+    return None
+
+
+def _requeue(submissions):
+    """Hand submissions that could not be rejudged to the evaluation queue"""
+    now = timezone.now()
+    for submission in submissions:
+        EvaluationTask.objects.update_or_create(
+            submission=submission,
+            defaults={'status': 'Pending', 'available_at': now, 'attempts': 0,
+                      'locked_by': '', 'locked_until': None, 'last_error': ''},
+        )
+
+
+class Rejudge:
+    """
+    Runs a RejudgeJob. ``progress(job, rate)`` is called after every chunk
+    with the submissions per second of that chunk; setting ``stop`` (a
+    threading.Event) ends the run after the current chunk.
+    """
+
+    def __init__(self, job, concurrency, chunk_size, stop, progress=None):
+        self.job = job
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.stop = stop
+        self.progress = progress
+
+    def run(self):
+        job = self.job
+        queryset = submissions_for(job.filters).select_related('problem').order_by('id')
+        if not job.total:
+            job.total = queryset.count()
+            job.save(update_fields=['total', 'updated_at'])
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="rejudge") as executor:
+            while not self.stop.is_set():
+                chunk = list(queryset.filter(id__gt=job.last_submission_id)[:self.chunk_size])
+                if not chunk:
+                    break
+                started = time.monotonic()
+                self._process_chunk(executor, chunk)
+                if self.progress:
+                    self.progress(job, len(chunk) / max(time.monotonic() - started, 1e-9))
+
+        job.status = 'Interrupted' if self.stop.is_set() else 'Done'
+        job.save(update_fields=['status', 'updated_at'])
+        return job
+
+    def _process_chunk(self, executor, chunk):
+        # One Problem instance per problem, so per-problem work such as the
+        # reference vector is shared by the chunk's submissions
+        problems, answers = {}, {}
+        for submission in chunk:
+            submission.problem = problems.setdefault(submission.problem_id, submission.problem)
+            answers.setdefault(submission.problem_id, []).append(submission.content)
+        for problem_id, problem_answers in answers.items():
+            if len(problem_answers) > 1 and uses_vector_scorer(problems[problem_id]):
+                vector_scorer.prime(problems[problem_id], problem_answers)
+
+        changed, failed = [], []
+        for submission, result in zip(chunk, executor.map(_evaluate, chunk)):
+            if result is None:
+                failed.append(submission)
+                continue
+            score, remarks, evaluation_status = result
+            if (score, remarks, evaluation_status) != (submission.score, submission.remarks, submission.evaluation_status):
+                submission.score = score
+                submission.remarks = remarks
+                submission.evaluation_status = evaluation_status
+                changed.append(submission)
+
+        with transaction.atomic():
+            Submission.objects.bulk_update(changed, RESULT_FIELDS)
+            if changed:
+                submissions_rejudged.send(sender=Submission, submissions=changed)
+            _requeue(failed)
+            RejudgeJob.objects.filter(pk=self.job.pk).update(
+                last_submission_id=chunk[-1].id,
+                processed=F('processed') + len(chunk),
+                changed=F('changed') + len(changed),
+                requeued=F('requeued') + len(failed),
+                updated_at=timezone.now(),
+            )
+        self.job.refresh_from_db()
+
@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import Problem, ProblemGenre, Submission
+from django.core.files.base import ContentFile
+from .models import Problem, ProblemGenre, ProblemTestCase, Submission
+from .evaluation_tiers import DEFAULT_OPTIONS, TIERS
 
 
 class ProblemGenreSerializer(serializers.ModelSerializer):
@@ -20,8 +22,20 @@ class ProblemSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Problem
-        fields = ['id', 'title', 'question', 'answer', 'genre', 'genre_ids', 'created_at']
+        fields = ['id', 'title', 'question', 'answer', 'genre', 'genre_ids', 'eval_type', 'evaluation_config',
+                  'time_limit', 'memory_limit', 'submission_rate_limit', 'created_at']
         read_only_fields = ['id', 'created_at']
+
+    def validate_evaluation_config(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("evaluation_config must be an object.")
+        unknown = set(value) - set(DEFAULT_OPTIONS) - {'tiers'}
+        if unknown:
+            raise serializers.ValidationError(f"Unknown options: {', '.join(sorted(unknown))}")
+        tiers = value.get('tiers', [])
+        if not isinstance(tiers, list) or any(tier not in TIERS for tier in tiers):
+            raise serializers.ValidationError(f"tiers must be a list of: {', '.join(TIERS)}")
+        return value
         
     def create(self, validated_data):
         genre_data = validated_data.pop('genre', [])
@@ -45,10 +59,41 @@ class ProblemSerializer(serializers.ModelSerializer):
         return instance
     
     
+class ProblemTestCaseSerializer(serializers.ModelSerializer):
+    """
+    Test case contents are sent inline (input_data, expected_output) or
+    uploaded as files (input_file, output_file). They are stored on disk and
+    only their sizes are returned.
+    """
+    input_data = serializers.CharField(write_only=True, required=False, allow_blank=True, trim_whitespace=False)
+    expected_output = serializers.CharField(write_only=True, required=False, allow_blank=True, trim_whitespace=False)
+    input_file = serializers.FileField(write_only=True, required=False)
+    output_file = serializers.FileField(write_only=True, required=False)
+    input_size = serializers.IntegerField(source='input_file.size', read_only=True)
+    output_size = serializers.IntegerField(source='output_file.size', read_only=True)
+
+    class Meta:
+        model = ProblemTestCase
+        fields = ['id', 'input_data', 'expected_output', 'input_file', 'output_file',
+                  'input_size', 'output_size', 'order']
+        read_only_fields = ['id']
+
+    def validate(self, attrs):
+        input_data = attrs.pop('input_data', '')
+        expected_output = attrs.pop('expected_output', None)
+        if 'input_file' not in attrs:
+            attrs['input_file'] = ContentFile(input_data.encode(), name='input.txt')
+        if 'output_file' not in attrs:
+            if expected_output is None:
+                raise serializers.ValidationError({"expected_output": "Provide expected_output or upload output_file."})
+            attrs['output_file'] = ContentFile(expected_output.encode(), name='output.txt')
+        return attrs
+
+
 class SubmissionSerializer(serializers.ModelSerializer):
     problem_title = serializers.ReadOnlyField(source='problem.title')
 
     class Meta:
         model = Submission
-        fields = ['id', 'user', 'problem', 'problem_title', 'content', 'evaluation_status', 'remarks', 'created_at']
-        read_only_fields = ['id', 'user', 'created_at']
\ No newline at end of file
+        fields = ['id', 'user', 'problem', 'problem_title', 'contest', 'content', 'score', 'evaluation_status', 'remarks', 'created_at']
+        read_only_fields = ['id', 'user', 'contest', 'score', 'evaluation_status', 'remarks', 'created_at']
\ No newline at end of file
@@ -0,0 +1,23 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .models import Problem
+
+# Sent by the evaluator workers once the result of a submission has been stored.
+# Receivers get the updated ``submission`` and run inside the same transaction.
+submission_evaluated = Signal()
+
+# Sent by rejudge runs after writing back a chunk of changed results with one
+# bulk update. Receivers get the ``submissions`` and run inside the same
+# transaction, which also advances the rejudge checkpoint.
+submissions_rejudged = Signal()
+
+
+@receiver(m2m_changed, sender=Problem.genre.through)
+def touch_problem(sender, instance, action, pk_set, **kwargs):
+    """Bump the version stamps of problems whose genres changed, which save() does not see"""
+    if not action.startswith('post_'):
+        return
+    problem_ids = [instance.pk] if isinstance(instance, Problem) else list(pk_set or ())
+    Problem.objects.filter(pk__in=problem_ids).update(updated_at=timezone.now())
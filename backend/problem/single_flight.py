@@ -0,0 +1,85 @@
+"""
+Single-flight coalescing of identical evaluations.
+
+Within a process, ``SingleFlight.do`` lets the first caller for a key run
+the work while concurrent callers with the same key wait for, and share,
+its result. Across processes, the running process holds an
+EvaluationLease row for the key; other processes poll for the cached
+result until the lease is released, and take the evaluation over if the
+lease expires without a result (e.g. the holder crashed).
+"""
+import threading
+import uuid
+from concurrent.futures import Future
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import EvaluationLease
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one call"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Return ``(fn(), shared)``. If a call with the same key is already
+        running, wait for its result (or exception) instead of calling ``fn``;
+        ``shared`` tells whether the result came from another caller.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+def _lease_filter(key):
+    problem_id, answer_hash, submission_hash = key
+    return {'problem_id': problem_id, 'answer_hash': answer_hash, 'submission_hash': submission_hash}
+
+
+def acquire_lease(key):
+    """Try to claim the evaluation of a key for this process; returns the owner token, or None if held elsewhere"""
+    owner = uuid.uuid4().hex
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.EVALUATION_SINGLE_FLIGHT_LEASE)
+    try:
+        with transaction.atomic():
+            EvaluationLease.objects.create(owner=owner, expires_at=expires_at, **_lease_filter(key))
+        return owner
+    except IntegrityError:
+        pass
+    # Take over a lease whose holder did not finish in time
+    taken = EvaluationLease.objects.filter(expires_at__lt=now, **_lease_filter(key)).update(
+        owner=owner, expires_at=expires_at
+    )
+    return owner if taken else None
+
+
+def release_lease(key, owner):
+    EvaluationLease.objects.filter(owner=owner, **_lease_filter(key)).delete()
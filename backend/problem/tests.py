@@ -1,3 +1,633 @@
-from django.test import TestCase
+import json
+import os
+import pwd
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from google import genai
+from google.genai import errors, types
+from rest_framework.test import APIClient
+
+from . import evaluation_cache, vector_scorer
+from .evaluation_cache import LRUCache, cache_key, cached_evaluate
+from .evaluation_queue import claim_next, enqueue, run_task
+from .evaluation_tiers import LLMTier, run_pipeline
+from .judge import ACCEPTED, MEMORY_LIMIT_EXCEEDED, RUNTIME_ERROR, TIME_LIMIT_EXCEEDED, WRONG_ANSWER, judge
+from .llm_client import CircuitBreaker, EvaluationDeferred, LLMClientManager, TokenBucket
+from .llm_evaluation import InvalidEvaluation, llm_evaluate, llm_evaluate_batch, llm_evaluate_structured
+from .llm_fake import FakeClient
+from .models import (
+    EvaluationTask, Problem, ProblemGenre, ProblemTestCase, RejudgeJob, Submission, SubmissionBucket,
+    get_judge_storage,
+)
+from .rejudge import Rejudge
+from .single_flight import SingleFlight, acquire_lease, release_lease
+from .throttling import take_token
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    """Answers generateContent requests with the next scripted (status, text) pair"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        server = self.server
+        with server.lock:
+            server.requests.append(self.client_address)
+            status, text = server.script.pop(0) if server.script else server.default
+        if status == 200:
+            body = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+        else:
+            body = {"error": {"code": status, "message": text, "status": "UNAVAILABLE"}}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class LLMClientManagerTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubGeminiHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.script = []
+        self.server.default = (200, json.dumps({"score": 90, "remarks": "Correct and complete."}))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def make_manager(self, **overrides):
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        options = dict(
+            client_factory=lambda: genai.Client(api_key='test', http_options=types.HttpOptions(base_url=base_url)),
+            requests_per_second=1000,
+            burst=1000,
+            max_concurrency=4,
+            max_retries=3,
+            retry_base_delay=0,
+            retry_max_delay=0,
+            breaker_threshold=5,
+            breaker_reset=60,
+        )
+        options.update(overrides)
+        return LLMClientManager(**options)
+
+    def evaluate(self, manager):
+        return llm_evaluate_structured("Capital of France?", "Paris", "paris", client=manager.client)
+
+    def test_reuses_one_connection(self):
+        manager = self.make_manager()
+        self.assertEqual(self.evaluate(manager), (90, "Correct and complete."))
+        self.assertEqual(self.evaluate(manager), (90, "Correct and complete."))
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(len(set(self.server.requests)), 1)
+
+    def test_retries_transient_errors(self):
+        self.server.script = [(503, "overloaded"), (429, "slow down")]
+        manager = self.make_manager()
+        self.assertEqual(self.evaluate(manager)[0], 90)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(manager.breaker.state, 'closed')
+
+    def test_does_not_retry_client_errors(self):
+        self.server.script = [(400, "bad request")]
+        manager = self.make_manager()
+        with self.assertRaises(errors.ClientError):
+            self.evaluate(manager)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_breaker_defers_while_provider_is_failing(self):
+        self.server.default = (500, "down")
+        manager = self.make_manager(max_retries=1, breaker_threshold=2)
+        with self.assertRaises(errors.ServerError):
+            self.evaluate(manager)
+        self.assertEqual(manager.breaker.state, 'open')
+        with self.assertRaises(EvaluationDeferred):
+            self.evaluate(manager)
+        self.assertEqual(len(self.server.requests), 2)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitPrimitiveTests(SimpleTestCase):
+    def test_token_bucket_refills_at_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertAlmostEqual(bucket.try_acquire(), 0.5)
+        clock.now = 0.5
+        self.assertEqual(bucket.try_acquire(), 0)
+
+    def test_breaker_half_open_allows_one_trial(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        with self.assertRaises(EvaluationDeferred):
+            breaker.before_call()
+        clock.now = 10
+        breaker.before_call()
+        with self.assertRaises(EvaluationDeferred):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints must cost the same number of queries however many rows they return"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='author', password='x')
+        self.genres = [ProblemGenre.objects.create(name=name) for name in ("graphs", "math")]
+        self.problem = self.add_problem()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_problem(self):
+        problem = Problem.objects.create(title="P", question="?", answer="42", eval_type=1, creator=self.user)
+        problem.genre.set(self.genres)
+        return problem
+
+    def query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, url, add_row):
+        add_row()
+        few = self.query_count(url)
+        for _ in range(5):
+            add_row()
+        self.assertEqual(self.query_count(url), few)
+
+    def test_problem_list(self):
+        self.assert_constant_queries("/problem/list/", self.add_problem)
+
+    def test_submission_list(self):
+        def add_submission():
+            Submission.objects.create(user=self.user, problem=self.problem, content="42")
+
+        self.assert_constant_queries(f"/problem/submission/list/{self.problem.id}/", add_submission)
+
+    def test_submission_pages_newest_first(self):
+        ids = [Submission.objects.create(user=self.user, problem=self.problem, content="42").id for _ in range(3)]
+        url = f"/problem/submission/list/{self.problem.id}/"
+        data = self.client.get(url, {'page': 1, 'page_size': 2}).json()
+        self.assertEqual(([row['id'] for row in data['results']], data['count']), (ids[:0:-1], 3))
+        data = self.client.get(url, {'page': 2, 'page_size': 2}).json()
+        self.assertEqual([row['id'] for row in data['results']], ids[:1])
+
+
+class SubmissionThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='author', password='x')
+        self.problem = Problem.objects.create(
+            title="P", question="?", answer="42", eval_type=1, creator=self.user, submission_rate_limit=2
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/problem/submission/create/{self.problem.id}/"
+
+    def test_bucket_empties_and_reports_wait(self):
+        self.assertEqual(take_token("test", 2), 0)
+        self.assertEqual(take_token("test", 2), 0)
+        self.assertAlmostEqual(take_token("test", 2), 30, delta=1)
+        self.assertEqual(take_token("unlimited", 0), 0)
+
+    def test_problem_limit(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post(self.url, {"content": "42"}).status_code, 202)
+        response = self.client.post(self.url, {"content": "42"})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(Submission.objects.filter(problem=self.problem).count(), 2)
+
+    @override_settings(SUBMISSION_RATE_LIMIT=1)
+    def test_refused_submission_keeps_problem_tokens(self):
+        self.assertEqual(self.client.post(self.url, {"content": "42"}).status_code, 202)
+        # Refused by the per-user bucket; the per-problem token is given back
+        self.assertEqual(self.client.post(self.url, {"content": "42"}).status_code, 429)
+        tokens = SubmissionBucket.objects.get(key=f"user:{self.user.id}:problem:{self.problem.id}").tokens
+        self.assertAlmostEqual(tokens, 1, delta=0.1)
+
+    @override_settings(SUBMISSION_SHED_BACKLOG=1, SUBMISSION_SHED_RETRY_AFTER=15)
+    def test_backlog_rejects(self):
+        self.assertEqual(self.client.post(self.url, {"content": "42"}).status_code, 202)
+        cache.clear()
+        response = self.client.post(self.url, {"content": "42"})
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '15'))
+
+    @override_settings(SUBMISSION_SHED_BACKLOG=1, SUBMISSION_SHED_MODE='defer', SUBMISSION_SHED_DEFER_SECONDS=60)
+    def test_backlog_defers(self):
+        first = self.client.post(self.url, {"content": "42"}).json()
+        cache.clear()
+        second = self.client.post(self.url, {"content": "42"}).json()
+        first_task, second_task = (EvaluationTask.objects.get(submission_id=data['id']) for data in (first, second))
+        self.assertGreaterEqual((second_task.available_at - first_task.available_at).total_seconds(), 59)
+
+
+class EvaluationQueueTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='author', password='x')
+        self.problem = Problem.objects.create(title="P", question="?", answer="42", eval_type=1, creator=self.user)
+        self.submission = Submission.objects.create(user=self.user, problem=self.problem, content="42")
+        enqueue(self.submission)
+
+    def test_claim_then_complete(self):
+        task = claim_next('worker-1')
+        self.assertEqual((task.submission_id, task.status, task.attempts), (self.submission.id, 'Running', 1))
+        self.assertIsNone(claim_next('worker-2'))
+
+        self.assertTrue(run_task(task))
+        task.refresh_from_db()
+        self.submission.refresh_from_db()
+        self.assertEqual(task.status, 'Done')
+        self.assertEqual((self.submission.evaluation_status, self.submission.score), ('Correct', 100))
+
+    def test_expired_lease_is_reclaimed(self):
+        stale = claim_next('worker-1')
+        EvaluationTask.objects.filter(pk=stale.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        task = claim_next('worker-2')
+        self.assertEqual((task.pk, task.locked_by, task.attempts), (stale.pk, 'worker-2', 2))
+        # The first worker lost its lease and must not store a result
+        self.assertFalse(run_task(stale))
+        self.assertTrue(run_task(task))
+
+    @override_settings(EVALUATION_MAX_ATTEMPTS=2, EVALUATION_RETRY_DELAY=0)
+    def test_fails_after_max_attempts(self):
+        with mock.patch('problem.evaluation_queue.evaluate_submission', side_effect=RuntimeError("boom")), \
+                self.assertLogs('problem.evaluation_queue', 'ERROR'):
+            task = claim_next('worker-1')
+            self.assertFalse(run_task(task))
+            self.assertEqual(EvaluationTask.objects.get(pk=task.pk).status, 'Pending')
+
+            task = claim_next('worker-1')
+            self.assertFalse(run_task(task))
+
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts, task.last_error), ('Failed', 2, "boom"))
+        self.assertIsNone(claim_next('worker-1'))
+
+
+class EvaluationCacheTests(TestCase):
+    def setUp(self):
+        evaluation_cache._memory.clear()
+        self.user = get_user_model().objects.create_user(username='author', password='x')
+        self.problem = Problem.objects.create(title="P", question="Capital of France?", answer="Paris", eval_type=1, creator=self.user)
+        self.calls = []
+
+    def evaluate(self, answer):
+        def model():
+            self.calls.append(answer)
+            return 90, "Correct."
+        return cached_evaluate(self.problem, answer, model)
+
+    def test_identical_answer_hits(self):
+        self.assertEqual(self.evaluate("It is Paris."), (90, "Correct."))
+        self.assertEqual(self.evaluate("it is  paris"), (90, "Correct."))
+        # Served by the database tier once the in-process tier is gone
+        evaluation_cache._memory.clear()
+        self.assertEqual(self.evaluate("It is Paris"), (90, "Correct."))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_changed_reference_answer_misses(self):
+        self.evaluate("Paris")
+        self.problem.answer = "Paris, France"
+        self.problem.save()
+        self.evaluate("Paris")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_lru_evicts_least_recently_used(self):
+        lru = LRUCache(2)
+        lru.put('a', 1)
+        lru.put('b', 2)
+        lru.get('a')
+        lru.put('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+
+
+class SingleFlightTests(TestCase):
+    def test_concurrent_calls_share_one_evaluation(self):
+        follower_waiting = threading.Event()
+        release = threading.Event()
+
+        class ObservedFuture(Future):
+            def result(self, timeout=None):
+                follower_waiting.set()
+                return super().result(timeout)
+
+        calls = []
+
+        def evaluate():
+            calls.append(1)
+            release.wait(5)
+            return 90, "Correct."
+
+        flight = SingleFlight()
+        results = []
+        with mock.patch('problem.single_flight.Future', ObservedFuture):
+            leader = threading.Thread(target=lambda: results.append(flight.do('key', evaluate)))
+            leader.start()
+            while not calls:
+                time.sleep(0.001)
+            follower = threading.Thread(target=lambda: results.append(flight.do('key', evaluate)))
+            follower.start()
+            follower_waiting.wait(5)
+            release.set()
+            leader.join()
+            follower.join()
+        self.assertEqual(len(calls), 1)
+        self.assertCountEqual(results, [((90, "Correct."), False), ((90, "Correct."), True)])
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_waits_for_the_lease_holder_instead_of_evaluating(self):
+        user = get_user_model().objects.create_user(username='author', password='x')
+        problem = Problem.objects.create(title="P", question="?", answer="Paris", eval_type=1, creator=user)
+        evaluation_cache._memory.clear()
+        key = cache_key(problem, "paris")
+        owner = acquire_lease(key)
+
+        def holder_finishes(seconds):
+            # The other process stores its result and releases the lease
+            evaluation_cache.store(key, 90, "Correct.")
+            release_lease(key, owner)
+
+        evaluate = mock.Mock(return_value=(0, "Wrong."))
+        with mock.patch('problem.evaluation_cache.time.sleep', side_effect=holder_finishes) as sleep:
+            self.assertEqual(cached_evaluate(problem, "paris", evaluate), (90, "Correct."))
+        evaluate.assert_not_called()
+        sleep.assert_called_once()
+
+
+@override_settings(LLM_EVALUATION_MODE='structured')
+class StructuredEvaluationTests(SimpleTestCase):
+    question = "Name the capital and the country."
+    correct = "Paris France"
+
+    def test_scores_with_the_fake_model(self):
+        client = FakeClient()
+        score, remarks = llm_evaluate_structured(self.question, self.correct, "It is Paris", client=client)
+        self.assertEqual(score, 50)
+        self.assertIn("50%", remarks)
+        self.assertEqual(client.calls, 1)
+
+    def test_accepts_a_valid_response(self):
+        client = FakeClient([json.dumps({"score": 75, "remarks": "  Mostly right.  "})])
+        self.assertEqual(llm_evaluate_structured(self.question, self.correct, "Paris", client=client), (75, "Mostly right."))
+
+    def test_rejects_malformed_responses(self):
+        for text in (
+            "Score: 80",
+            json.dumps([]),
+            json.dumps({"score": 150, "remarks": "Too high."}),
+            json.dumps({"score": 80.5, "remarks": "Not whole."}),
+            json.dumps({"score": True, "remarks": "Not a number."}),
+            json.dumps({"score": 80, "remarks": " "}),
+            json.dumps({"remarks": "No score."}),
+        ):
+            with self.subTest(text=text), self.assertRaises(InvalidEvaluation):
+                llm_evaluate_structured(self.question, self.correct, "Paris", client=FakeClient([text]))
+
+    def test_falls_back_to_the_chat_protocol(self):
+        client = FakeClient(["not json"])
+        with self.assertLogs('problem.llm_evaluation', 'WARNING'):
+            score, remarks = llm_evaluate(self.question, self.correct, "Paris France", client=client)
+        self.assertEqual(score, 100)
+        # One structured request, then the three chat messages
+        self.assertEqual(client.calls, 4)
+
+    def test_batch_falls_back_to_single_evaluations(self):
+        client = FakeClient([json.dumps([{"index": 0, "score": 90, "remarks": "Good."}])])
+        with self.assertLogs('problem.llm_evaluation', 'WARNING'):
+            results = llm_evaluate_batch(self.question, self.correct, ["Paris", "France"], client=client)
+        self.assertEqual([score for score, _ in results], [50, 50])
+
+
+class EvaluationTierTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='author', password='x')
+
+    def problem(self, answer, **config):
+        return Problem.objects.create(
+            title="P", question="?", answer=answer, eval_type=1, creator=self.user, evaluation_config=config
+        )
+
+    def test_cheap_tiers_short_circuit(self):
+        problem = self.problem("The mitochondria", tiers=["exact", "numeric", "llm"])
+        with mock.patch.object(LLMTier, 'evaluate') as llm:
+            self.assertEqual(run_pipeline(problem, "the  Mitochondria!")[::2], (100, "exact"))
+            llm.assert_not_called()
+
+    def test_numeric_tolerance(self):
+        problem = self.problem("3.14159", tiers=["numeric"], numeric_abs_tolerance=0.01)
+        self.assertEqual(run_pipeline(problem, "3.14")[::2], (100, "numeric"))
+        self.assertEqual(run_pipeline(problem, "3.2")[::2], (0, "numeric"))
+        self.assertIsNone(run_pipeline(problem, "pi"))
+
+    def test_escalates_to_the_next_tier(self):
+        problem = self.problem("Water boils at one hundred degrees", tiers=["exact", "similarity", "llm"])
+        with mock.patch.object(LLMTier, 'evaluate', return_value=(70, "Partly right.")) as llm:
+            self.assertEqual(run_pipeline(problem, "It freezes at zero"), (70, "Partly right.", "llm"))
+            llm.assert_called_once()
+
+    def test_semantic_tier(self):
+        problem = self.problem(
+            "Photosynthesis turns light energy into chemical energy",
+            tiers=["semantic"], semantic_accept=0.8, semantic_reject=0.1,
+        )
+        self.assertEqual(run_pipeline(problem, "photosynthesis turns light energy into chemical energy")[::2], (100, "semantic"))
+        self.assertEqual(run_pipeline(problem, "Qwerty zxcv")[::2], (0, "semantic"))
+
+    def test_rejudge_scores_a_chunk_with_one_batch(self):
+        problem = self.problem(
+            "Photosynthesis turns light energy into chemical energy",
+            tiers=["semantic"], semantic_accept=0.8, semantic_reject=0.1,
+        )
+        answers = ["photosynthesis turns light energy into chemical energy", "Qwerty zxcv", "Qwerty zxcv"]
+        for answer in answers:
+            Submission.objects.create(user=self.user, problem=problem, content=answer)
+        job = RejudgeJob.objects.create(filters={'problems': [problem.id]})
+        with mock.patch.object(vector_scorer, 'score_batch', wraps=vector_scorer.score_batch) as score_batch:
+            Rejudge(job, concurrency=2, chunk_size=10, stop=threading.Event()).run()
+        score_batch.assert_called_once()
+        self.assertEqual(
+            list(Submission.objects.order_by('id').values_list('score', 'evaluation_status')),
+            [(100, 'Correct'), (0, 'Wrong'), (0, 'Wrong')],
+        )
+
+
+class VectorScorerTests(SimpleTestCase):
+    def test_similar_answers_score_higher(self):
+        answer = "The heart pumps blood through the body"
+        problem = Problem(answer=answer, answer_vector=vector_scorer.encode(*vector_scorer.sparse_vector(answer)))
+        same = vector_scorer.score(problem, "the heart pumps blood through the body")
+        close = vector_scorer.score(problem, "The heart pumps the blood around the body")
+        unrelated = vector_scorer.score(problem, "Quantum tunnelling in semiconductors")
+        self.assertAlmostEqual(same, 1.0, places=2)
+        self.assertGreater(close, 0.5)
+        self.assertLess(unrelated, 0.2)
+        self.assertGreater(same, close)
+
+    def test_batch_matches_single_scores(self):
+        answer = "The heart pumps blood through the body"
+        problem = Problem(answer=answer, answer_vector=vector_scorer.encode(*vector_scorer.sparse_vector(answer)))
+        answers = [
+            "the heart pumps blood through the body", "The heart pumps the blood around the body",
+            "Quantum tunnelling in semiconductors", "", "blood",
+        ]
+        with mock.patch.object(vector_scorer, 'BATCH_ROWS', 2):
+            batch = vector_scorer.score_batch(problem, answers)
+        self.assertEqual(len(batch), len(answers))
+        for answer, value in zip(answers, batch):
+            self.assertAlmostEqual(float(value), vector_scorer.score(problem, answer), places=5)
+
+    def test_primed_scores_are_reused(self):
+        answer = "The heart pumps blood through the body"
+        problem = Problem(answer=answer, answer_vector=vector_scorer.encode(*vector_scorer.sparse_vector(answer)))
+        expected = vector_scorer.score(problem, "blood")
+        vector_scorer.prime(problem, ["blood", "heart", "blood"])
+        with mock.patch.object(vector_scorer, 'dense_vector') as dense_vector:
+            self.assertAlmostEqual(vector_scorer.score(problem, "blood"), expected, places=5)
+            dense_vector.assert_not_called()
+
+    def test_stored_vector_round_trips(self):
+        indices, weights = vector_scorer.sparse_vector("An answer with a few words")
+        decoded = vector_scorer.decode(vector_scorer.encode(indices, weights))
+        dense = vector_scorer.dense_vector("An answer with a few words")
+        self.assertAlmostEqual(float(decoded @ dense), 1.0, places=2)
+
+
+class JudgeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if os.geteuid() == 0:
+            account = pwd.getpwnam(settings.JUDGE_SANDBOX_USER)
+            try:
+                subprocess.run([settings.JUDGE_PYTHON, '-I', '-S', '-c', ''], user=account.pw_uid,
+                               group=account.pw_gid, extra_groups=[], check=True)
+            except (OSError, subprocess.CalledProcessError):
+                cls.tearDownClass()
+                raise unittest.SkipTest(f"{settings.JUDGE_SANDBOX_USER} cannot run JUDGE_PYTHON {settings.JUDGE_PYTHON}")
+
+    def setUp(self):
+        data_root = tempfile.mkdtemp(prefix='judge-data-')
+        self.addCleanup(shutil.rmtree, data_root, ignore_errors=True)
+        overrides = override_settings(
+            JUDGE_DATA_ROOT=Path(data_root), JUDGE_HIDDEN_PATHS=[settings.BASE_DIR, Path(data_root)], JUDGE_WORKERS=2
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        user = get_user_model().objects.create_user(username='author', password='x')
+        self.problem = Problem.objects.create(
+            title="Sum", question="Add two numbers", answer="", eval_type=0, creator=user, time_limit=1
+        )
+        storage = get_judge_storage()
+        for order, (given, expected) in enumerate([("1 2\n", "3\n"), ("20 22\n", "42\n")]):
+            ProblemTestCase.objects.create(
+                problem=self.problem, order=order,
+                input_file=storage.save(f"{self.problem.id}/in-{order}", ContentFile(given)),
+                output_file=storage.save(f"{self.problem.id}/out-{order}", ContentFile(expected)),
+            )
+        self.expected_path = storage.path(f"{self.problem.id}/out-0")
+
+    def test_accepted(self):
+        result = judge(self.problem, "a, b = map(int, input().split())\nprint(a + b)\n")
+        self.assertEqual((result.verdict, result.passed, result.total), (ACCEPTED, 2, 2))
+
+    def test_wrong_answer(self):
+        result = judge(self.problem, "a, b = map(int, input().split())\nprint(a + b if a == 1 else 0)\n")
+        self.assertEqual((result.verdict, result.failed_case), (WRONG_ANSWER, 2))
+
+    def test_time_limit(self):
+        result = judge(self.problem, "while True:\n    pass\n")
+        self.assertEqual(result.verdict, TIME_LIMIT_EXCEEDED)
+
+    def test_memory_limit(self):
+        result = judge(self.problem, "data = bytearray(1 << 31)\n")
+        self.assertEqual(result.verdict, MEMORY_LIMIT_EXCEEDED)
+
+    def test_runtime_error(self):
+        result = judge(self.problem, "raise ValueError('broken')\n")
+        self.assertEqual(result.verdict, RUNTIME_ERROR)
+        self.assertIn("ValueError: broken", result.detail)
+
+    def test_program_cannot_read_judge_files(self):
+        # Prints 3 only if neither the expected output, the settings nor the
+        # directory of its own input can be read
+        source = f"""
+import os
+input()
+readable = []
+for path in ({self.expected_path!r}, {str(settings.BASE_DIR / 'CompeteHub' / 'settings.py')!r}):
+    try:
+        open(path).close()
+        readable.append(path)
+    except OSError:
+        pass
+try:
+    readable += os.listdir(os.path.dirname(os.readlink('/proc/self/fd/0')))
+except OSError:
+    pass
+print(readable or 3)
+"""
+        result = judge(self.problem, source)
+        self.assertEqual((result.verdict, result.passed, result.failed_case), (WRONG_ANSWER, 1, 2))
+
+
+class ProblemTestCaseViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='author', password='x')
+        self.problem = Problem.objects.create(title="P", question="?", answer="", eval_type=0, creator=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/problem/{self.problem.id}/testcases/"
+        self.storage = ProblemTestCase._meta.get_field('input_file').storage
+        self.addCleanup(shutil.rmtree, self.storage.path(str(self.problem.id)), ignore_errors=True)
+
+    def test_explicit_order_zero_is_kept(self):
+        response = self.client.post(self.url, {"test_cases": [
+            {"input_data": "1\n", "expected_output": "1\n", "order": 0},
+            {"input_data": "2\n", "expected_output": "2\n"},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row['order'] for row in response.json()], [0, 2])
+
+    def test_failed_insert_removes_written_files(self):
+        order = ProblemTestCase._meta.get_field('order')
+        with mock.patch.object(order, 'pre_save', side_effect=IntegrityError("insert failed")), \
+                self.assertRaises(IntegrityError):
+            self.client.post(self.url, {"test_cases": [{"input_data": "1\n", "expected_output": "1\n"}]}, format='json')
+        self.assertFalse(ProblemTestCase.objects.exists())
+        directory = str(self.problem.id)
+        self.assertEqual(self.storage.listdir(directory)[1] if self.storage.exists(directory) else [], [])
@@ -0,0 +1,167 @@
+"""
+Submission throttling and load shedding.
+
+Every submission takes a token from token buckets stored as
+SubmissionBucket rows, so the limits hold across all worker processes:
+
+- one per user and problem, holding ``limit`` tokens refilled at ``limit``
+  per minute, where the limit comes from the contest problem, the problem
+  or SUBMISSION_PROBLEM_RATE_LIMIT, in that order;
+- one per user and contest (or, outside contests, per user), with the
+  contest's limit or SUBMISSION_RATE_LIMIT.
+
+A limit of 0 disables a bucket. A token is taken with one conditional
+UPDATE that refills and decrements the bucket in SQL, so concurrent
+requests can never take the same token. When a bucket denies a
+submission, the tokens already taken from the buckets before it are
+given back, so a refused submission costs nothing.
+
+When SUBMISSION_SHED_BACKLOG or more evaluations are waiting, submissions
+shed load as SUBMISSION_SHED_MODE says: ``'reject'`` refuses submissions
+with 429 and a Retry-After header, ``'defer'`` accepts them and queues
+their evaluation SUBMISSION_SHED_DEFER_SECONDS later (plus jitter).
+
+Submission views list ``SubmissionThrottle`` in their ``throttle_classes``
+and pass ``evaluation_delay()`` to ``enqueue``.
+"""
+import math
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest, Least
+from django.db.models.lookups import GreaterThanOrEqual
+from rest_framework.throttling import BaseThrottle
+
+from .evaluation_queue import backlog_count
+from .models import SubmissionBucket
+
+BACKLOG_CACHE_KEY = "problem:evaluation-backlog"
+
+
+def _float(value):
+    return Value(float(value), output_field=FloatField())
+
+
+def take_token(key, limit):
+    """
+    Take a token from the bucket ``key``, which holds ``limit`` tokens
+    refilled at ``limit`` per minute. Returns 0 on success, otherwise the
+    seconds until a token is available.
+    """
+    if not limit:
+        return 0
+    rate = limit / 60
+    now = time.time()
+    # Clocks of other hosts may run slightly behind; never refill a negative amount
+    elapsed = Greatest(_float(now) - F('refilled_at'), _float(0))
+    available = Least(_float(limit), F('tokens') + elapsed * _float(rate))
+    taken = SubmissionBucket.objects.filter(GreaterThanOrEqual(available, _float(1)), key=key).update(
+        tokens=available - _float(1), refilled_at=_float(now)
+    )
+    if taken:
+        return 0
+
+    try:
+        with transaction.atomic():
+            SubmissionBucket.objects.create(key=key, tokens=limit - 1, refilled_at=now)
+    except IntegrityError:
+        pass
+    else:
+        _prune(now)
+        return 0
+
+    bucket = SubmissionBucket.objects.filter(key=key).values_list('tokens', 'refilled_at').first()
+    if bucket is None:
+        return 0
+    tokens, refilled_at = bucket
+    tokens = min(limit, tokens + max(now - refilled_at, 0) * rate)
+    return max((1 - tokens) / rate, 0.001)
+
+
+def refund_token(key, limit):
+    """Give back a token taken from the bucket ``key`` by a request that was refused after all"""
+    if limit:
+        SubmissionBucket.objects.filter(key=key).update(tokens=Least(F('tokens') + _float(1), _float(limit)))
+
+
+def _prune(now):
+    """Drop buckets unused for an hour; a bucket refills within a minute, so they are as good as new ones"""
+    SubmissionBucket.objects.filter(refilled_at__lt=now - 3600).delete()
+
+
+def problem_limit(problem, contest_problem=None):
+    for limit in (getattr(contest_problem, 'submission_rate_limit', None), problem.submission_rate_limit):
+        if limit is not None:
+            return limit
+    return settings.SUBMISSION_PROBLEM_RATE_LIMIT
+
+
+def contest_limit(contest=None):
+    limit = getattr(contest, 'submission_rate_limit', None)
+    return settings.SUBMISSION_RATE_LIMIT if limit is None else limit
+
+
+def submission_buckets(user_id, problem, contest=None, contest_problem=None):
+    """(key, limit) of the buckets a submission takes tokens from, narrowest first"""
+    if contest is None:
+        return [
+            (f"user:{user_id}:problem:{problem.id}", problem_limit(problem)),
+            (f"user:{user_id}", contest_limit()),
+        ]
+    return [
+        (f"user:{user_id}:contest:{contest.id}:problem:{problem.id}", problem_limit(problem, contest_problem)),
+        (f"user:{user_id}:contest:{contest.id}", contest_limit(contest)),
+    ]
+
+
+def evaluation_backlog():
+    """Evaluations waiting for a worker, cached for SUBMISSION_BACKLOG_CHECK_SECONDS"""
+    return cache.get_or_set(BACKLOG_CACHE_KEY, backlog_count, settings.SUBMISSION_BACKLOG_CHECK_SECONDS)
+
+
+def overloaded():
+    threshold = settings.SUBMISSION_SHED_BACKLOG
+    return bool(threshold) and evaluation_backlog() >= threshold
+
+
+def evaluation_delay():
+    """How long to hold back the evaluation of a new submission: None normally, some time while shedding load by deferral"""
+    if settings.SUBMISSION_SHED_MODE != 'defer' or not overloaded():
+        return None
+    # Spread deferred evaluations out so they do not all come back at once
+    return timedelta(seconds=settings.SUBMISSION_SHED_DEFER_SECONDS * random.uniform(1, 1.5))
+
+
+class SubmissionThrottle(BaseThrottle):
+    """
+    Sheds submissions while the evaluation backlog is over
+    SUBMISSION_SHED_BACKLOG (in 'reject' mode), then applies the submission
+    token buckets. Views provide ``submission_buckets(request)``, returning
+    (key, limit) pairs.
+    """
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        if request.method != 'POST':
+            return True
+        if settings.SUBMISSION_SHED_MODE == 'reject' and overloaded():
+            self.retry_after = settings.SUBMISSION_SHED_RETRY_AFTER
+            return False
+        taken = []
+        for key, limit in view.submission_buckets(request):
+            wait = take_token(key, limit)
+            if wait:
+                for taken_key, taken_limit in taken:
+                    refund_token(taken_key, taken_limit)
+                self.retry_after = wait
+                return False
+            taken.append((key, limit))
+        return True
+
+    def wait(self):
+        return math.ceil(self.retry_after) if self.retry_after else None
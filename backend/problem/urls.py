@@ -1,10 +1,12 @@
 from django.urls import path
-from .views import ProblemCreateView, ProblemListView, SubmissionCreateView, SubmissionListView, ProblemDetailView
+from .views import ProblemCreateView, ProblemListView, SubmissionCreateView, SubmissionListView, SubmissionStatusView, ProblemDetailView, ProblemTestCaseView
 
 urlpatterns=[
     path('create/', ProblemCreateView.as_view(), name='problem-create'),
     path('list/', ProblemListView.as_view(), name='problem-list'),
     path('<int:pk>/', ProblemDetailView.as_view(), name='problem-detail'),
+    path('<int:pk>/testcases/', ProblemTestCaseView.as_view(), name='problem-testcases'),
     path('submission/create/<int:problem_id>/', SubmissionCreateView.as_view(), name='submission-create'),
     path('submission/list/<int:problem_id>/', SubmissionListView.as_view(), name='submission-list'),
+    path('submission/<int:pk>/', SubmissionStatusView.as_view(), name='submission-status'),
 ]
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+Local semantic-similarity scorer.
+
+Answers are turned into hashed n-gram vectors (word unigrams and bigrams
+plus character trigrams, hashed into VECTOR_DIM signed buckets with
+sublinear term frequency) and compared by cosine similarity. No model and
+no network access are needed, so the scorer keeps working while the LLM
+provider is rate-limited.
+
+The reference vector of each problem is computed when the problem is saved
+and stored sparsely in ``Problem.answer_vector`` (uint16 bucket indices
+followed by float16 weights). ``score_batch`` scores any number of answers
+against one problem with a single matrix-vector product; ``prime`` keeps
+such batch scores on a problem instance for later ``score`` calls, which
+is how rejudge scores a chunk's answers to each problem at once.
+"""
+import zlib
+
+import numpy as np
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+from .evaluation_cache import normalize_for_cache
+from .models import Problem
+
+VECTOR_DIM = 1 << 12
+BATCH_ROWS = 4096  # Answers vectorized per matrix block in score_batch
+
+
+def _features(text):
+    words = normalize_for_cache(text).split()
+    features = [f"w:{word}" for word in words]
+    features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    padded = f" {' '.join(words)} "
+    features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return features
+
+
+def sparse_vector(text):
+    """Return (indices, weights) of the L2-normalized hashed feature vector of a text"""
+    counts = {}
+    for feature in _features(text):
+        h = zlib.crc32(feature.encode('utf-8'))
+        index = h % VECTOR_DIM
+        sign = 1.0 if h & 0x80000000 else -1.0
+        counts[index] = counts.get(index, 0.0) + sign
+
+    indices = np.fromiter(counts.keys(), dtype=np.uint16, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    weights = np.sign(values) * (1 + np.log(np.maximum(np.abs(values), 1)))
+    norm = np.linalg.norm(weights)
+    if norm:
+        weights /= norm
+    return indices, weights
+
+
+def dense_vector(text):
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    indices, weights = sparse_vector(text)
+    vector[indices] = weights
+    return vector
+
+
+def encode(indices, weights):
+    return indices.astype('<u2').tobytes() + weights.astype('<f2').tobytes()
+
+
+def decode(data):
+    """Inverse of encode, as a dense float32 vector"""
+    count = len(data) // 4
+    indices = np.frombuffer(data, dtype='<u2', count=count)
+    weights = np.frombuffer(data, dtype='<f2', count=count, offset=2 * count)
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    vector[indices] = weights
+    return vector
+
+
+@receiver(pre_save, sender=Problem)
+def store_answer_vector(sender, instance, **kwargs):
+    """Precompute the reference vector whenever a problem is saved"""
+    instance.answer_vector = encode(*sparse_vector(instance.answer))
+
+
+def reference_vector(problem):
+    """The stored reference vector of a problem, computed and stored if missing"""
+    if problem.answer_vector:
+        return decode(bytes(problem.answer_vector))
+    data = encode(*sparse_vector(problem.answer))
+    Problem.objects.filter(pk=problem.pk).update(answer_vector=data)
+    problem.answer_vector = data
+    return decode(data)
+
+
+def score(problem, answer):
+    """Cosine similarity of one answer to the problem's reference answer, in [-1, 1]"""
+    primed = getattr(problem, '_primed_scores', None)
+    if primed is not None and answer in primed:
+        return primed[answer]
+    return float(dense_vector(answer) @ reference_vector(problem))
+
+
+def score_batch(problem, answers):
+    """Cosine similarities of many answers to one problem, as a float32 array"""
+    reference = reference_vector(problem)
+    scores = np.empty(len(answers), dtype=np.float32)
+    for start in range(0, len(answers), BATCH_ROWS):
+        block = answers[start:start + BATCH_ROWS]
+        rows, cols, weights = [], [], []
+        for row, answer in enumerate(block):
+            indices, values = sparse_vector(answer)
+            rows.append(np.full(len(indices), row, dtype=np.int64))
+            cols.append(indices)
+            weights.append(values)
+        matrix = np.zeros((len(block), VECTOR_DIM), dtype=np.float32)
+        if rows:
+            matrix[np.concatenate(rows), np.concatenate(cols)] = np.concatenate(weights)
+        scores[start:start + len(block)] = matrix @ reference
+    return scores
+
+
+def prime(problem, answers):
+    """Score answers to a problem with ``score_batch`` and keep the results on the instance for ``score``"""
+    answers = list(dict.fromkeys(answers))
+    problem._primed_scores = dict(zip(answers, score_batch(problem, answers).tolist()))
+
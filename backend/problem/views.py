@@ -3,10 +3,14 @@ from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from .models import Problem, ProblemGenre, Submission
-from .serializers import ProblemSerializer, SubmissionSerializer
-from rest_framework.pagination import PageNumberPagination
-from .llm_evaluation import llm_evaluate
+from .models import Problem, ProblemGenre, ProblemTestCase, Submission
+from .serializers import ProblemSerializer, ProblemTestCaseSerializer, SubmissionSerializer
+from .pagination import KeysetPagination
+from django.db import transaction
+from .evaluation_queue import enqueue
+from .throttling import SubmissionThrottle, evaluation_delay, submission_buckets
+from .conditional import conditional_response, make_etag
+from .listing import problem_rows, problem_values, submission_rows, submission_values
 
 
 class ProblemCreateView(APIView):
@@ -51,10 +55,16 @@ class ProblemCreateView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class ProblemPagination(PageNumberPagination):
+class ProblemPagination(KeysetPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+class SubmissionPagination(KeysetPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
     
 class ProblemListView(ListAPIView):
     """
@@ -77,6 +87,7 @@ class ProblemListView(ListAPIView):
     permission_classes = [IsAuthenticated]
     pagination_class = ProblemPagination
     serializer_class = ProblemSerializer
+    ordering = ('-created_at', '-id')
 
     def get(self, request):
         data = request.data.copy()
@@ -87,18 +98,16 @@ class ProblemListView(ListAPIView):
             for genre in genres:
                 queryset = Problem.objects.filter(genre__name__icontains=genre)            
 
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(problem_values(queryset))
+        return self.get_paginated_response(problem_rows(page))
 
 class SubmissionCreateView(APIView):
     """
     API endpoint for creating a new submission for a specific problem.
 
+    The submission is stored with the 'Unknown' status and queued for
+    evaluation; poll the submission status endpoint for the result.
+
     Permissions:
     - Only authenticated users can access this endpoint.
 
@@ -106,43 +115,72 @@ class SubmissionCreateView(APIView):
     {
         "content":"Answer"
     }
+
+    Submissions are rate limited per user and problem, and per user (see
+    problem/throttling.py).
+
+    Response:
+    - 202 Accepted: Returns the queued submission, including its id.
+    - 400 Bad Request: Returns validation errors if the request is invalid.
+    - 404 Not Found: Problem does not exist
+    - 429 Too Many Requests: Rate limited or evaluations overloaded; retry after the Retry-After header
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [SubmissionThrottle]
+
+    def get_problem(self):
+        if not hasattr(self, '_problem'):
+            self._problem = Problem.objects.filter(id=self.kwargs['problem_id']).first()
+        return self._problem
+
+    def submission_buckets(self, request):
+        problem = self.get_problem()
+        return submission_buckets(request.user.pk, problem) if problem else []
 
     def post(self, request, problem_id):
-        try:
-            problem = Problem.objects.get(id=problem_id)
-        except Problem.DoesNotExist:
+        problem = self.get_problem()
+        if problem is None:
             return Response({"error": "Problem not found"}, status=status.HTTP_404_NOT_FOUND)
 
         data = request.data.copy()
-        data['problem'] = problem_id
-
-        # Compare the submitted answer with the problem's answer (case-insensitive)
-        submitted_answer = data.get('content', '').strip().lower()
-        correct_answer = problem.answer.strip().lower()
-  
-        # Set evaluation status based on comparison
-        eval_type= problem.eval_type
-        score=0
-        remarks=1
-        print("Eval type:",eval_type)
-        if eval_type ==1:
-            score=0
-            remarks="Code evaluation not implemented"
-        elif eval_type == 0:
-            score,remarks=llm_evaluate(problem.title+"\n"+problem.question,problem.answer, submitted_answer)
-                
-        data['evaluation_status'] = 'Correct' if submitted_answer == correct_answer else 'Wrong'
-        data['score']=score
-        data['remarks']=remarks
+        data['problem'] = problem.id
 
         serializer = SubmissionSerializer(data=data)
         if serializer.is_valid():
-            serializer.save(user=request.user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            with transaction.atomic():
+                submission = serializer.save(user=request.user)
+                enqueue(submission, delay=evaluation_delay())
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class SubmissionStatusView(APIView):
+    """
+    API endpoint for polling the evaluation status of a submission.
+
+    Permissions:
+    - Only the author of the submission can access this endpoint.
+
+    URL Parameters:
+    - pk: Submission ID
+
+    Response:
+    - 200 OK: Returns the submission, with "pending" set while it is still being evaluated
+    - 404 Not Found: Submission does not exist
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        submission = Submission.objects.select_related('problem', 'evaluation_task').filter(
+            id=pk, user=request.user
+        ).first()
+        if not submission:
+            return Response({"error": "Submission not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        data = SubmissionSerializer(submission).data
+        task = getattr(submission, 'evaluation_task', None)
+        data['pending'] = task is not None and task.status in ('Pending', 'Running')
+        return Response(data)
+
 class SubmissionListView(ListAPIView):
     """
     API endpoint for listing all submissions for a specific problem.
@@ -150,19 +188,30 @@ class SubmissionListView(ListAPIView):
     Permissions:
     - Only authenticated users can access this endpoint.
 
+    Query Parameters:
+    - cursor / page_size: Page through the submissions, newest first (see
+      problem/pagination.py). Without them the whole list is returned,
+      oldest first, as before.
+
     Response:
-    - List of all submissions for the given problem ID.
+    - List of all submissions for the given problem ID, or a page of them.
 
     Example JSON Request:
     No request body is required. The problem ID is passed as a URL parameter.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = SubmissionSerializer
+    pagination_class = SubmissionPagination
+    ordering = ('-created_at', '-id')
 
     def get(self, request, problem_id):
         queryset = Submission.objects.filter(problem_id=problem_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        if not set(request.query_params) & {'cursor', 'page', 'page_size'}:
+            # Clients that don't page yet still get the whole list, oldest first
+            return Response(submission_rows(submission_values(queryset.order_by('id'))))
+        # Page-number requests are sliced from this order too; Submission has no default ordering
+        page = self.paginate_queryset(submission_values(queryset.order_by(*self.ordering)))
+        return self.get_paginated_response(submission_rows(page))
 
 class ProblemDetailView(APIView):
     """
@@ -175,15 +224,106 @@ class ProblemDetailView(APIView):
     - pk: Problem ID
 
     Response:
-    - 200 OK: Returns the problem details
+    - 200 OK: Returns the problem details, with an ETag
+    - 304 Not Modified: The problem is unchanged since the ETag in If-None-Match
     - 404 Not Found: Problem does not exist
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
+        updated_at = Problem.objects.filter(id=pk).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return Response({"error": "Problem not found"}, status=status.HTTP_404_NOT_FOUND)
+        return conditional_response(request, make_etag(request, updated_at), lambda: self.build_response(pk))
+
+    def build_response(self, pk):
         try:
             problem = Problem.objects.get(id=pk)
             serializer = ProblemSerializer(problem)
             return Response(serializer.data)
         except Problem.DoesNotExist:
-            return Response({"error": "Problem not found"}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return Response({"error": "Problem not found"}, status=status.HTTP_404_NOT_FOUND)
+
+
+class ProblemTestCaseView(APIView):
+    """
+    API endpoint for managing the test cases of a code problem.
+
+    Permissions:
+    - Only the creator of the problem can access this endpoint.
+
+    URL Parameters:
+    - pk: Problem ID
+
+    Example JSON Request (POST):
+    {
+        "test_cases": [
+            {"input_data": "1 2\n", "expected_output": "3\n"},
+            {"input_data": "5 7\n", "expected_output": "12\n"}
+        ]
+    }
+
+    Large test cases can instead be uploaded one at a time as multipart form
+    data with ``input_file`` and ``output_file`` (and optionally ``order``).
+
+    Response:
+    - 200 OK (GET): List of the problem's test cases
+    - 201 Created (POST): Returns the created test cases
+    - 400 Bad Request: Invalid test cases
+    - 403 Forbidden: User is not the creator of the problem
+    - 404 Not Found: Problem does not exist
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_problem(self, request, pk):
+        problem = Problem.objects.filter(id=pk).first()
+        if not problem:
+            return None, Response({"error": "Problem not found"}, status=status.HTTP_404_NOT_FOUND)
+        if problem.creator_id != request.user.id:
+            return None, Response(
+                {"error": "Only the creator of the problem can manage its test cases"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return problem, None
+
+    def get(self, request, pk):
+        problem, error = self.get_problem(request, pk)
+        if error:
+            return error
+        serializer = ProblemTestCaseSerializer(problem.test_cases.all(), many=True)
+        return Response(serializer.data)
+
+    def post(self, request, pk):
+        problem, error = self.get_problem(request, pk)
+        if error:
+            return error
+
+        if 'test_cases' in request.data:
+            data = request.data['test_cases']
+        else:
+            data = [request.data]
+        serializer = ProblemTestCaseSerializer(data=data, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        next_order = problem.test_cases.count() + 1
+        test_cases = [
+            ProblemTestCase(
+                problem=problem,
+                order=next_order + i if data.get('order') is None else data['order'],
+                **{key: value for key, value in data.items() if key != 'order'}
+            )
+            for i, data in enumerate(serializer.validated_data)
+        ]
+        try:
+            with transaction.atomic():
+                # The files are written to disk as the rows are inserted
+                ProblemTestCase.objects.bulk_create(test_cases)
+        except Exception:
+            # Remove the files already written for rows that were not stored
+            for test_case in test_cases:
+                for file in (test_case.input_file, test_case.output_file):
+                    if file._committed and file.name:
+                        file.storage.delete(file.name)
+            raise
+        return Response(ProblemTestCaseSerializer(test_cases, many=True).data, status=status.HTTP_201_CREATED)
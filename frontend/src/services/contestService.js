@@ -20,7 +20,8 @@ export const getContestDetails = async (contestId) => {
 export const getActiveContests = async () => {
   try {
     const response = await axios.get(`${API_URL}list/active/`, {
-      headers: getAuthHeader()
+      headers: getAuthHeader(),
+      params: { count: true }
     });
     return response.data;
   } catch (error) {
@@ -31,7 +32,8 @@ export const getActiveContests = async () => {
 export const getUpcomingContests = async () => {
   try {
     const response = await axios.get(`${API_URL}list/future/`, {
-      headers: getAuthHeader()
+      headers: getAuthHeader(),
+      params: { count: true }
     });
     return response.data;
   } catch (error) {
@@ -42,7 +44,8 @@ export const getUpcomingContests = async () => {
 export const getPastContests = async () => {
   try {
     const response = await axios.get(`${API_URL}list/completed/`, {
-      headers: getAuthHeader()
+      headers: getAuthHeader(),
+      params: { count: true }
     });
     return response.data;
   } catch (error) {
@@ -50,6 +53,18 @@ export const getPastContests = async () => {
   }
 };
 
+export const getContestsByStatus = async (limit = 10) => {
+  try {
+    const response = await axios.get(`${API_URL}list/status/`, {
+      headers: getAuthHeader(),
+      params: { limit }
+    });
+    return response.data;
+  } catch (error) {
+    throw error.response?.data || { detail: 'An error occurred while fetching contests' };
+  }
+};
+
 export const registerForContest = async (contestId) => {
   try {
     const response = await axios.post(`${API_URL}register/${contestId}/`, {}, {
@@ -61,6 +76,18 @@ export const registerForContest = async (contestId) => {
   }
 };
 
+// Organizers only; pass { user_ids: [...] } or { usernames: [...] }
+export const bulkRegisterForContest = async (contestId, registrants) => {
+  try {
+    const response = await axios.post(`${API_URL}register/bulk/${contestId}/`, registrants, {
+      headers: getAuthHeader()
+    });
+    return response.data;
+  } catch (error) {
+    throw error.response?.data || { detail: 'An error occurred while registering users for the contest' };
+  }
+};
+
 export const unregisterFromContest = async (contestId) => {
   try {
     const response = await axios.post(`${API_URL}unregister/${contestId}/`, {}, {
@@ -94,6 +121,34 @@ export const getContestProblemByOrder = async (contestId, order) => {
   }
 };
 
+// Every problem of a started contest in one request; the browser handles the gzip encoding
+export const getContestProblemBundle = async (contestId) => {
+  try {
+    const response = await axios.get(`${API_URL}${contestId}/problems/bundle/`, {
+      headers: getAuthHeader()
+    });
+    return response.data;
+  } catch (error) {
+    throw error.response?.data || { detail: 'An error occurred while fetching contest problems' };
+  }
+};
+
+const SUBMISSION_POLL_INTERVAL = 1000;
+
+const waitForEvaluation = async (submissionId) => {
+  // Submissions are evaluated asynchronously, so poll until a verdict is available
+  for (;;) {
+    const response = await axios.get(
+      `http://localhost:8000/problem/submission/${submissionId}/`,
+      { headers: getAuthHeader() }
+    );
+    if (!response.data.pending) {
+      return response.data;
+    }
+    await new Promise((resolve) => setTimeout(resolve, SUBMISSION_POLL_INTERVAL));
+  }
+};
+
 export const submitContestProblem = async (contestId, order, answer) => {
   try {
     const response = await axios.post(
@@ -101,7 +156,14 @@ export const submitContestProblem = async (contestId, order, answer) => {
       { answer },
       { headers: getAuthHeader() }
     );
-    return response.data;
+    const submission = await waitForEvaluation(response.data.submission_id);
+    const correct = submission.evaluation_status === 'Correct';
+    return {
+      correct,
+      points_awarded: correct ? response.data.points : 0,
+      score: submission.score,
+      remarks: submission.remarks,
+    };
   } catch (error) {
     throw error.response?.data || { detail: 'An error occurred while submitting the answer' };
   }
@@ -131,18 +193,63 @@ export const getProblemSubmissions = async (problemId) => {
   }
 };
 
+export const getLeaderboard = async (contestId, page = 1, pageSize = 50) => {
+  try {
+    const response = await axios.get(`${API_URL}${contestId}/leaderboard/`, {
+      headers: getAuthHeader(),
+      params: { page, page_size: pageSize }
+    });
+    return response.data;
+  } catch (error) {
+    throw error.response?.data || { detail: 'An error occurred while fetching the leaderboard' };
+  }
+};
+
+export const getLeaderboardAroundMe = async (contestId, radius = 10) => {
+  try {
+    const response = await axios.get(`${API_URL}${contestId}/leaderboard/me/`, {
+      headers: getAuthHeader(),
+      params: { radius }
+    });
+    return response.data;
+  } catch (error) {
+    throw error.response?.data || { detail: 'An error occurred while fetching your standing' };
+  }
+};
+
+// Opens the contest's live event stream; handlers get the parsed event data
+// of "standings", "verdict" and "lagged" events. Call close() on the result
+// to disconnect.
+export const subscribeToContest = (contestId, { onStandings, onVerdict, onLagged } = {}) => {
+  const token = encodeURIComponent(localStorage.getItem('access_token') || '');
+  const source = new EventSource(`${API_URL}${contestId}/live/?token=${token}`);
+  const handlers = { standings: onStandings, verdict: onVerdict, lagged: onLagged };
+  Object.entries(handlers).forEach(([type, handler]) => {
+    if (handler) {
+      source.addEventListener(type, (event) => handler(JSON.parse(event.data)));
+    }
+  });
+  return source;
+};
+
 const contestService = {
   getContestDetails,
   getActiveContests,
   getUpcomingContests,
   getPastContests,
+  getContestsByStatus,
   registerForContest,
+  bulkRegisterForContest,
   unregisterFromContest,
   getContestProblems,
   getContestProblemByOrder,
+  getContestProblemBundle,
   submitContestProblem,
   createContest,
   getProblemSubmissions,
+  getLeaderboard,
+  getLeaderboardAroundMe,
+  subscribeToContest,
 };
 
 export default contestService; 
\ No newline at end of file